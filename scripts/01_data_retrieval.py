@@ -1,164 +1,334 @@
-import os
-import hashlib
-from pathlib import Path
-
-import pandas as pd
-import kagglehub
-import shutil
-
-def cal_checksum(filepath: Path) -> str:
-    #Returns the SHA-256 checksum for file, used to verify later
-    sha256_hash = hashlib.sha256()
-    with open(filepath, "rb") as f:
-        for i in iter(lambda: f.read(4096), b""):
-            sha256_hash.update(i)
-    return sha256_hash.hexdigest()
-
-def download_kaggle_dataset(target_path: Path, kaggle_id: str, kaggle_file: str | None):
-    """
-    Download a dataset from Kaggle using kagglehub and copy a CSV file
-    into our data/raw folder as target_path.
-
-    If kaggle_file is provided, we *try* to use that name first.
-    If it doesn't exist, we fall back to "any CSV in the download dir".
-    """
-    print(f"Status: Not Found - trying Kaggle API download")
-    print(f"  Kaggle dataset: {kaggle_id}")
-    try:
-        kaggle_dir = Path(kagglehub.dataset_download(kaggle_id))
-
-        # First try the explicit filename (if given)
-        candidates = []
-        if kaggle_file is not None:
-            src = kaggle_dir / kaggle_file
-            if src.exists():
-                candidates = [src]
-            else:
-                print(f"  Warning: expected file '{kaggle_file}' not found in {kaggle_dir}")
-                print(f"  Searching for any .csv files instead...")
-
-        # If no explicit match, search for CSVs in the dataset folder
-        if not candidates:
-            candidates = list(kaggle_dir.rglob("*.csv"))
-
-        if not candidates:
-            print(f"  ERROR: No .csv files found in Kaggle directory: {kaggle_dir}")
-            return False
-
-        # Choose the largest CSV file (usually the main dataset)
-        src = max(candidates, key=lambda p: p.stat().st_size)
-        print(f"  Using '{src.name}' from Kaggle and copying to '{target_path.name}'")
-
-        target_path.parent.mkdir(parents=True, exist_ok=True)
-        shutil.copy2(src, target_path)
-        print(f"  Downloaded to: {target_path}")
-        return True
-
-    except Exception as e:
-        print(f"  ERROR: Kaggle download failed -> {e}")
-        return False
-    
-def verify_data():
-    print("Data Rethirval Verification")
-    
-    data_dir = Path("data/raw")
-    
-    data_sources = {
-        "billboard_hot_100.csv": {
-            "description": "Billboard Hot 100 chart data",
-            "source": "Kaggle dataset - Billboard Hot 100 songs",
-            "url": "https://www.kaggle.com/datasets/dhruvildave/billboard-the-hot-100-songs",
-            "license": "Public Domain / Open Data",
-            "kaggle_id": "dhruvildave/billboard-the-hot-100-songs",
-            "kaggle_file": "billboard_hot_100.csv",
-        },
-        "spotify_songs.csv": {
-            "description": "Spotify Dataset 1921-2020, 600k+ Tracks",
-            "source": "Kaggle dataset - Spotify songs",
-            "url": "https://www.kaggle.com/datasets/yamaerenay/spotify-dataset-19212020-600k-tracks",
-            "license": "CC0: Public Domain",
-            "kaggle_id": "yamaerenay/spotify-dataset-19212020-600k-tracks",
-            "kaggle_file": "spotify_songs.csv",
-        },
-    }
-    
-    results = {}
-
-    for file, info in data_sources.items():
-        filepath = data_dir / file
-        
-        #information print out, so you can verify when running
-        
-        print(f"\n{file}:")
-        print(f"  Description: {info['description']}")
-        print(f"  Source:      {info['source']}")
-        print(f"  URL:         {info['url']}")
-        print(f"  License:     {info['license']}")
-        
-        
-        if not filepath.exists():
-            ok = download_kaggle_dataset(
-                target_path=filepath,
-                kaggle_id=info["kaggle_id"],
-                kaggle_file=info["kaggle_file"],
-            )
-            if not ok or not filepath.exists():
-                print("  Status: Still missing after Kaggle request")
-                results[file] = {"status": "missing"}
-                continue
-        
-        #After this code excutes the file should exist, now we do checksum and get file size to verify in MB
-        
-        checksum = cal_checksum(filepath)
-        size_file = os.path.getsize(filepath) / (1024**2)
-        
-        #Sanity Check with panda to make sure file is correct
-        
-        df = pd.read_csv(filepath)
-
-        print("  Status: ✓ Found")
-        print(f"  SHA-256: {checksum}")
-        print(f"  Size:    {size_file:.2f} MB")
-        print(f"  Rows:    {len(df):,}")
-        print(f"  Columns: {len(df.columns)}")
-        
-        """record this in results to make future refrence this process was sucessful"""
-        
-        results[file] = {
-            "status": "success",
-            "checksum": checksum,
-            "rows": len(df),
-            "columns": len(df.columns),
-            "size_file": size_file,
-        }
-        
-    print("VERIFICATION COMPLETE")
-
-    #File metadata writen out with raw data
-        
-    metadata_path = data_dir / "data_sources.txt"
-    with open(metadata_path, "w") as f:
-        f.write("DATA SOURCES AND CHECKSUMS\n")
-        for file, file_info in data_sources.items():
-            f.write(f"{file}:\n")
-            f.write(f"  Description: {file_info['description']}\n")
-            f.write(f"  Source:      {file_info['source']}\n")
-            f.write(f"  URL:         {file_info['url']}\n")
-            f.write(f"  License:     {file_info['license']}\n")
-            if file in results and results[file]["status"] == "success":
-                r = results[file]
-                f.write(f"  SHA-256:    {r['checksum']}\n")
-                f.write(f"  Size:       {r['size_file']:.2f} MB\n")
-                f.write(f"  Rows:       {r['rows']:,}\n")
-                f.write(f"  Columns:    {r['columns']}\n")
-            f.write("\n")
-
-    print(f"\nMetadata saved to: {metadata_path}")
-
-    return results        
-        
-        
-if __name__ == "__main__":
-    verify_data()
-        
-        
\ No newline at end of file
+import csv
+import json
+import hashlib
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import kagglehub
+import shutil
+
+from storage import STORAGE_VERSION, convert_raw_to_parquet
+
+# Read files in large blocks so hashing and row counting run at disk speed
+CHUNK_SIZE = 8 * 1024**2
+
+# Rows sampled with pandas to record each column's dtype in the manifest
+SCHEMA_SAMPLE_ROWS = 1000
+
+MANIFEST_VERSION = 1
+MANIFEST_FIELDS = ["size_bytes", "mtime_ns", "sha256", "rows", "columns", "schema"]
+
+QUOTE = ord('"')
+NEWLINE = ord("\n")
+RETURN = ord("\r")
+
+def cal_checksum(filepath: Path) -> str:
+    #Returns the SHA-256 checksum for file, used to verify later
+    return scan_file(filepath)["checksum"]
+
+def scan_file(filepath: Path, chunk_size: int = CHUNK_SIZE) -> dict:
+    """
+    Stream a CSV file once and return its SHA-256 checksum, size, row count
+    and column count, without loading it into pandas.
+
+    The same block buffer is reused for every read, so memory stays constant
+    no matter how big the file is. Rows are counted as newlines that are not
+    inside a quoted field (and not blank lines), which is what pd.read_csv counts.
+    """
+    sha256_hash = hashlib.sha256()
+    buffer = bytearray(chunk_size)
+    view = memoryview(buffer)
+
+    header = b""
+    newlines = 0
+    in_quotes = False
+    # The two bytes before the current block (a file starts as if after a blank line)
+    tail = np.array([NEWLINE, NEWLINE], dtype=np.uint8)
+    size = 0
+
+    with open(filepath, "rb", buffering=0) as f:
+        while True:
+            n = f.readinto(buffer)
+            if not n:
+                break
+            block = view[:n]
+            sha256_hash.update(block)
+            size += n
+
+            if len(header) < 65536 and NEWLINE not in header:
+                header += bytes(block[:65536])
+
+            arr = np.frombuffer(block, dtype=np.uint8)
+            is_newline = arr == NEWLINE
+            is_quote = arr == QUOTE
+
+            if not is_quote.any() and not in_quotes:
+                outside = is_newline
+            else:
+                # A newline ends a record only when an even number of quotes came before it
+                quoted = (np.cumsum(is_quote, dtype=np.uint8) & 1).astype(bool) ^ in_quotes
+                outside = is_newline & ~quoted
+                in_quotes = bool(quoted[-1])
+
+            # Skip blank lines (a record terminator right after another one, or after "\r" in CRLF files)
+            extended = np.concatenate([tail, arr])
+            previous, before = extended[1:-1], extended[:-2]
+            blank = (previous == NEWLINE) | ((previous == RETURN) & (before == NEWLINE))
+            ends = outside & ~blank
+            newlines += int(np.count_nonzero(ends))
+            tail = extended[-2:]
+
+    # Count a final record that isn't followed by a newline
+    records = newlines + (1 if size and tail[-1] != NEWLINE else 0)
+
+    first_line = header.split(b"\n", 1)[0].decode("utf-8", errors="replace").rstrip("\r")
+    header_cols = next(csv.reader([first_line])) if first_line else []
+
+    return {
+        "checksum": sha256_hash.hexdigest(),
+        "size_bytes": size,
+        "rows": max(records - 1, 0),
+        "columns": len(header_cols),
+        "header": header_cols,
+    }
+
+def scan_files(filepaths: list, max_workers: int | None = None) -> dict:
+    """Scan several files at the same time (hashing and reads release the GIL)"""
+    if not filepaths:
+        return {}
+    workers = max_workers or len(filepaths)
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        scans = pool.map(scan_file, filepaths)
+        return dict(zip(filepaths, scans))
+
+def read_schema(filepath: Path) -> dict:
+    """Column name -> dtype, inferred from the first few rows of the file"""
+    sample = pd.read_csv(filepath, nrows=SCHEMA_SAMPLE_ROWS)
+    return {col: str(dtype) for col, dtype in sample.dtypes.items()}
+
+def load_manifest(manifest_path: Path) -> dict:
+    """Load the raw-data manifest, or an empty one if it is missing or from an older version"""
+    if manifest_path.exists():
+        try:
+            with open(manifest_path) as f:
+                manifest = json.load(f)
+            if manifest.get("version") == MANIFEST_VERSION:
+                return manifest
+        except (OSError, json.JSONDecodeError):
+            pass
+    return {"version": MANIFEST_VERSION, "files": {}}
+
+def write_if_changed(path: Path, text: str) -> bool:
+    """
+    Write text to path only when it differs from what is already there, so the
+    file's mtime (and Snakemake's view of it) only moves when the content does.
+    """
+    if path.exists() and path.read_text() == text:
+        return False
+    path.write_text(text)
+    return True
+
+def download_kaggle_dataset(target_path: Path, kaggle_id: str, kaggle_file: str | None):
+    """
+    Download a dataset from Kaggle using kagglehub and copy a CSV file
+    into our data/raw folder as target_path.
+
+    If kaggle_file is provided, we *try* to use that name first.
+    If it doesn't exist, we fall back to "any CSV in the download dir".
+    """
+    print(f"Status: Not Found - trying Kaggle API download")
+    print(f"  Kaggle dataset: {kaggle_id}")
+    try:
+        kaggle_dir = Path(kagglehub.dataset_download(kaggle_id))
+
+        # First try the explicit filename (if given)
+        candidates = []
+        if kaggle_file is not None:
+            src = kaggle_dir / kaggle_file
+            if src.exists():
+                candidates = [src]
+            else:
+                print(f"  Warning: expected file '{kaggle_file}' not found in {kaggle_dir}")
+                print(f"  Searching for any .csv files instead...")
+
+        # If no explicit match, search for CSVs in the dataset folder
+        if not candidates:
+            candidates = list(kaggle_dir.rglob("*.csv"))
+
+        if not candidates:
+            print(f"  ERROR: No .csv files found in Kaggle directory: {kaggle_dir}")
+            return False
+
+        # Choose the largest CSV file (usually the main dataset)
+        src = max(candidates, key=lambda p: p.stat().st_size)
+        print(f"  Using '{src.name}' from Kaggle and copying to '{target_path.name}'")
+
+        target_path.parent.mkdir(parents=True, exist_ok=True)
+        shutil.copy2(src, target_path)
+        print(f"  Downloaded to: {target_path}")
+        return True
+
+    except Exception as e:
+        print(f"  ERROR: Kaggle download failed -> {e}")
+        return False
+    
+def verify_data():
+    print("Data Rethirval Verification")
+    
+    data_dir = Path("data/raw")
+    
+    data_sources = {
+        "billboard_hot_100.csv": {
+            "description": "Billboard Hot 100 chart data",
+            "source": "Kaggle dataset - Billboard Hot 100 songs",
+            "url": "https://www.kaggle.com/datasets/dhruvildave/billboard-the-hot-100-songs",
+            "license": "Public Domain / Open Data",
+            "kaggle_id": "dhruvildave/billboard-the-hot-100-songs",
+            "kaggle_file": "billboard_hot_100.csv",
+        },
+        "spotify_songs.csv": {
+            "description": "Spotify Dataset 1921-2020, 600k+ Tracks",
+            "source": "Kaggle dataset - Spotify songs",
+            "url": "https://www.kaggle.com/datasets/yamaerenay/spotify-dataset-19212020-600k-tracks",
+            "license": "CC0: Public Domain",
+            "kaggle_id": "yamaerenay/spotify-dataset-19212020-600k-tracks",
+            "kaggle_file": "spotify_songs.csv",
+        },
+    }
+    
+    results = {}
+    present = []
+
+    # Stored size, mtime, checksum, rows and schema from the last run
+    manifest_path = data_dir / "data_manifest.json"
+    manifest = load_manifest(manifest_path)
+    entries = {}
+
+    for file, info in data_sources.items():
+        filepath = data_dir / file
+        
+        #information print out, so you can verify when running
+        
+        print(f"\n{file}:")
+        print(f"  Description: {info['description']}")
+        print(f"  Source:      {info['source']}")
+        print(f"  URL:         {info['url']}")
+        print(f"  License:     {info['license']}")
+        
+        
+        if not filepath.exists():
+            ok = download_kaggle_dataset(
+                target_path=filepath,
+                kaggle_id=info["kaggle_id"],
+                kaggle_file=info["kaggle_file"],
+            )
+            if not ok or not filepath.exists():
+                print("  Status: Still missing after Kaggle request")
+                results[file] = {"status": "missing"}
+                continue
+
+        #If size and modification time match the manifest, the file hasn't changed so we reuse the stored values
+        stat = filepath.stat()
+        entry = manifest["files"].get(file)
+        if entry and entry["size_bytes"] == stat.st_size and entry["mtime_ns"] == stat.st_mtime_ns:
+            entries[file] = entry
+        else:
+            present.append(filepath)
+        
+    #After this code excutes the files should exist, now we do checksum, file size (in MB), rows and columns in a single pass over each changed file, scanning them at once
+    
+    scans = scan_files(present)
+
+    for filepath, scan in scans.items():
+        stat = filepath.stat()
+        entries[filepath.name] = {
+            "size_bytes": scan["size_bytes"],
+            "mtime_ns": stat.st_mtime_ns,
+            "sha256": scan["checksum"],
+            "rows": scan["rows"],
+            "columns": scan["columns"],
+            "schema": read_schema(filepath),
+        }
+
+    for file in data_sources:
+        if file not in entries:
+            continue
+        entry = entries[file]
+        size_file = entry["size_bytes"] / (1024**2)
+
+        print(f"\n{file}:")
+        if data_dir / file in scans:
+            print("  Status: ✓ Found")
+        else:
+            print("  Status: ✓ Found (unchanged since last run, using manifest)")
+        print(f"  SHA-256: {entry['sha256']}")
+        print(f"  Size:    {size_file:.2f} MB")
+        print(f"  Rows:    {entry['rows']:,}")
+        print(f"  Columns: {entry['columns']}")
+        
+        """record this in results to make future refrence this process was sucessful"""
+        
+        results[file] = {
+            "status": "success",
+            "checksum": entry["sha256"],
+            "rows": entry["rows"],
+            "columns": entry["columns"],
+            "size_file": size_file,
+        }
+        
+    print("VERIFICATION COMPLETE")
+
+    #Keep a typed Parquet copy of each raw file for the later stages, rebuilt only when the CSV or the schema changed
+    schema_changed = manifest.get("storage_version") != STORAGE_VERSION
+    for file in entries:
+        filepath = data_dir / file
+        parquet_path = filepath.with_suffix(".parquet")
+        if filepath in scans or schema_changed or not parquet_path.exists():
+            convert_raw_to_parquet(filepath)
+            print(f"Converted {file} to: {parquet_path}")
+
+    #File metadata writen out with raw data, only touching the files when something actually changed
+        
+    lines = ["DATA SOURCES AND CHECKSUMS\n"]
+    for file, file_info in data_sources.items():
+        lines.append(f"{file}:\n")
+        lines.append(f"  Description: {file_info['description']}\n")
+        lines.append(f"  Source:      {file_info['source']}\n")
+        lines.append(f"  URL:         {file_info['url']}\n")
+        lines.append(f"  License:     {file_info['license']}\n")
+        if file in results and results[file]["status"] == "success":
+            r = results[file]
+            lines.append(f"  SHA-256:    {r['checksum']}\n")
+            lines.append(f"  Size:       {r['size_file']:.2f} MB\n")
+            lines.append(f"  Rows:       {r['rows']:,}\n")
+            lines.append(f"  Columns:    {r['columns']}\n")
+        lines.append("\n")
+
+    metadata_path = data_dir / "data_sources.txt"
+    if write_if_changed(metadata_path, "".join(lines)):
+        print(f"\nMetadata saved to: {metadata_path}")
+    else:
+        print(f"\nMetadata unchanged: {metadata_path}")
+
+    new_manifest = {"version": MANIFEST_VERSION, "storage_version": STORAGE_VERSION, "files": {}}
+    for file, file_info in data_sources.items():
+        if file in entries:
+            entry = entries[file]
+            new_manifest["files"][file] = {
+                "description": file_info["description"],
+                "url": file_info["url"],
+                "license": file_info["license"],
+                **{key: entry[key] for key in MANIFEST_FIELDS},
+            }
+    if write_if_changed(manifest_path, json.dumps(new_manifest, indent=2) + "\n"):
+        print(f"Manifest saved to: {manifest_path}")
+    else:
+        print(f"Manifest unchanged: {manifest_path}")
+
+    return results        
+        
+        
+if __name__ == "__main__":
+    verify_data()
@@ -1,173 +1,701 @@
-import pandas as pd
-import re
-from pathlib import Path
-
-def clean_string(s):
-    """Cleaning the strings to all match"""
-    
-    if pd.isna(s):
-        return ""
-    # Changing Strings to all be or have lowercase, remove special characters, extra spaces
-    s = str(s).lower()
-    s = re.sub(r'[^\w\s]', '', s)
-    s = re.sub(r'\s+', ' ', s)
-    return s.strip()
-
-def integrate_data():
-    
-    """Intergrate the Billboard and Spotify dataset into our coding pipelines"""
-    
-    print("Data Intergration")
-    
-    #Load in the Datasets into Pandas
-    
-    billboard_df = pd.read_csv("data/raw/billboard_hot_100.csv")
-    spotify_df = pd.read_csv("data/raw/spotify_songs.csv")
-    
-    print("\nLoading Datasets")
-    print(f"Billboard records: {len(billboard_df):,}")
-    print(f"Spotify records: {len(spotify_df):,}")
-    
-    #Clean both datasets to work
-    
-    print("\nCleaning datasets")
-
-    def get_col(df, candidates, friendly_name):
-        """
-        Helper that picks the first column name from `candidates`
-        that actually exists in df.columns.
-        """
-        for c in candidates:
-            if c in df.columns:
-                return c
-        raise KeyError(
-            f"Could not find a column for {friendly_name}. "
-            f"Tried: {candidates}. Available columns: {list(df.columns)}"
-        )
-
-    # Billboard: find song + artist columns, regardless of exact casing/name
-    billboard_song_col = get_col(
-        billboard_df,
-        ["Song", "song", "title", "Track Name", "track_name"],
-        "Billboard song",
-    )
-    billboard_artist_col = get_col(
-        billboard_df,
-        ["Artist", "artist", "Artist(s)", "artist_name"],
-        "Billboard artist",
-    )
-
-    billboard_df["song_clean"] = billboard_df[billboard_song_col].apply(clean_string)
-    billboard_df["artist_clean"] = billboard_df[billboard_artist_col].apply(clean_string)
-
-    # Spotify: name is consistent
-    spotify_df["name_clean"] = spotify_df["name"].apply(clean_string)
-
-    artists_clean = []
-    for artist in spotify_df["artists"]:
-        raw = str(artist)
-        raw = raw.replace("[", "").replace("]", "").replace("'", "")
-        artists_clean.append(clean_string(raw))
-
-    spotify_df["artists_clean"] = artists_clean
-
-    print("\nDatasets Cleaned")
-    
-    #Create key matching for datasets, used to help match object between both datasets after cleaning reformattation
-    billboard_df['match_key'] = billboard_df['song_clean'] + '_' + billboard_df['artist_clean']
-    spotify_df['match_key'] = spotify_df['name_clean'] + '_' + spotify_df['artists_clean']
-
-    #Merge Datasets together
-    
-    print("\nMerging Datasets")
-    merged_df = billboard_df.merge(
-        spotify_df,
-        on='match_key',
-        how='inner'
-    )
-    #Print out the merge stats, since not every song on Spotify has Charted on Billboards thus some records won't be shared between each dataset
-    print(f"Total matched records: {len(merged_df):,}")
-    print(f"Match rate of datasets: {len(merged_df)/len(billboard_df)*100:.2f}% ")
-    
-    
-    # Filtering out unnecessary columns between new merged dataset
-    # Kaggle's Billboard chart file uses lowercase / hyphenated names
-    billboard_keep_map = {
-        "date": "Date",
-        "song": "Song",
-        "artist": "Artist",
-        "rank": "Rank",
-        "last-week": "Last Week",
-        "peak-rank": "Peak Position",
-        "weeks-on-board": "Weeks in Charts",
-    }
-
-    # Spotify feature columns we care about
-    spotify_keep = [
-        "duration_ms", "release_date", "year",
-        "acousticness", "danceability", "energy", "instrumentalness",
-        "liveness", "loudness", "speechiness", "tempo", "valence",
-        "mode", "key", "popularity", "explicit",
-    ]
-
-    print("\nFiltering out unnecessary variables from new Merged Dataset")
-
-    # Build list (not set!) of columns to keep
-    keep_cols = list(billboard_keep_map.keys()) + spotify_keep
-
-    # Optional: sanity check / warning if something is missing
-    missing = [c for c in keep_cols if c not in merged_df.columns]
-    if missing:
-        print("  Warning: the following expected columns are missing in merged_df:")
-        for m in missing:
-            print(f"    - {m}")
-        # Keep only the columns that actually exist
-        keep_cols = [c for c in keep_cols if c in merged_df.columns]
-
-    integrated_df = merged_df[keep_cols].copy()
-
-    # Rename Billboard columns to nicer names
-    integrated_df = integrated_df.rename(columns=billboard_keep_map)
-
-    # Convert Date column to datetime
-    integrated_df["Date"] = pd.to_datetime(integrated_df["Date"])
-
-    # Creating Binary Targets for overall song performance
-    integrated_df["reached_top_10"] = (integrated_df["Peak Position"] <= 10).astype(int)
-    integrated_df["reached_top_1"] = (integrated_df["Peak Position"] == 1).astype(int)
-    
-    #Sorting the Dataset with data
-    integrated_df = integrated_df.sort_values('Date')
-
-    #Save new updated Integrated Dataset, al
-    output_path = Path("data/processed/integrated_data.csv")
-    integrated_df.to_csv(output_path, index=False)
-    #Final information of Where Integrated dataset is saved to and Statsical inforamtion of Integrated Dataset
-    print(f"\nIntegrated data saved to: {output_path}")
-    print(f"Final dataset shape: {integrated_df.shape}")
-    print(f"Columns: {list(integrated_df.columns)}")
-    
-    #Creating a Text File highlighting details and summarizing infromation of new Dataset we created for any inquires
-    txt_path = Path("data/processed/integration_summary.txt")
-    
-    with open(txt_path, 'w') as f:
-        f.write("Data Integration Summary\n")
-        
-        f.write(f"Billboard records: {len(billboard_df):,}\n")
-        f.write(f"Spotify records: {len(spotify_df):,}\n")
-        f.write(f"Matched records: {len(merged_df):,}\n")
-        f.write(f"Match rate: {len(merged_df)/len(billboard_df)*100:.2f}%\n")
-        f.write(f"\nFinal dataset shape: {integrated_df.shape}\n")
-        f.write(f"\nColumns in integrated dataset:\n")
-        for col in integrated_df.columns:
-            f.write(f"  - {col}\n")
-        f.write(f"\nTarget variables created:\n")
-        f.write(f"  - reached_top_10: {integrated_df['reached_top_10'].sum():,} songs\n")
-        f.write(f"  - reached_top_1: {integrated_df['reached_top_1'].sum():,} songs\n")
-
-    print(f"Integration summary saved to: {txt_path}")
-
-    return integrated_df
-
-if __name__ == "__main__":
-    integrate_data()
\ No newline at end of file
+import argparse
+import json
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
+import numpy as np
+import pandas as pd
+from pathlib import Path
+
+from storage import (
+    RAW_DIR, PROCESSED_DIR, append_table, iter_table, merge_sorted_runs, plain_types, read_table, table_columns,
+    write_table,
+)
+from schema import compact, memory_mb, memory_report
+from normalization import NormalizationCache, rules_version
+from fuzzy_matching import DEFAULT_THRESHOLD, fuzzy_match
+from artist_index import ArtistIndex, split_artist_list, split_credit
+
+# Columns of the per-song resolution table built by resolve_songs()
+RESOLVED_COLUMNS = ["track", "confidence", "method", "versions"]
+
+# Bump when the matching rules change, so the next incremental run rebuilds instead of appending
+INTEGRATION_VERSION = 1
+
+# What a run leaves behind for the next incremental run: the latest chart week integrated (the
+# watermark) with the running totals, every song resolved so far and the Spotify artist index
+STATE_PATH = PROCESSED_DIR / "integration_state.json"
+RESOLVED_PATH = PROCESSED_DIR / "resolved_songs.parquet"
+INDEX_PATH = PROCESSED_DIR / "artist_index.parquet"
+
+def get_col(columns, candidates, friendly_name):
+    """
+    Helper that picks the first column name from `candidates`
+    that actually exists in `columns`.
+    """
+    for c in candidates:
+        if c in columns:
+            return c
+    raise KeyError(
+        f"Could not find a column for {friendly_name}. "
+        f"Tried: {candidates}. Available columns: {list(columns)}"
+    )
+
+# Kaggle's Billboard chart file uses lowercase / hyphenated names
+billboard_keep_map = {
+    "date": "Date",
+    "song": "Song",
+    "artist": "Artist",
+    "rank": "Rank",
+    "last-week": "Last Week",
+    "peak-rank": "Peak Position",
+    "weeks-on-board": "Weeks in Charts",
+}
+
+# Spotify feature columns we care about
+spotify_keep = [
+    "duration_ms", "release_date", "year",
+    "acousticness", "danceability", "energy", "instrumentalness",
+    "liveness", "loudness", "speechiness", "tempo", "valence",
+    "mode", "key", "popularity", "explicit",
+]
+
+def pick_canonical_tracks(song_ids, spotify_rows, spotify_df, n_songs):
+    """
+    Pick one Spotify track per song out of its candidate (song, row) pairs.
+
+    Tie-breaking rule when a song has several versions: highest popularity,
+    then earliest release_date, then the first row in the Spotify file.
+    Returns the chosen row position per song (-1 if it had no candidates) and
+    the number of candidate versions per song.
+    """
+    candidates = pd.DataFrame({
+        "song": song_ids,
+        "row": spotify_rows,
+        "popularity": spotify_df["popularity"].iloc[spotify_rows].fillna(-1).to_numpy(),
+        "release_date": spotify_df["release_date"].iloc[spotify_rows].fillna("9999").astype(str).to_numpy(),
+    })
+    candidates = candidates.sort_values(
+        ["song", "popularity", "release_date", "row"], ascending=[True, False, True, True]
+    )
+    best = candidates.drop_duplicates("song")
+
+    song_track = np.full(n_songs, -1, dtype=np.int64)
+    song_track[best["song"].to_numpy()] = best["row"].to_numpy()
+    versions = np.bincount(candidates["song"].to_numpy(), minlength=n_songs)
+    return song_track, versions
+
+def spotify_fingerprint(spotify_path):
+    """
+    Identifies the Spotify data: the checksum retrieval recorded for the raw
+    CSV, or the Parquet copy's size and modification time if there is no manifest.
+    """
+    manifest_path = RAW_DIR / "data_manifest.json"
+    if manifest_path.exists():
+        entry = json.loads(manifest_path.read_text()).get("files", {}).get("spotify_songs.csv", {})
+        if "sha256" in entry:
+            return entry["sha256"]
+    stat = Path(spotify_path).stat()
+    return f"{stat.st_size}:{stat.st_mtime_ns}"
+
+
+def load_state(signature, output_path):
+    """
+    State of the last integration run if an incremental run can append to it,
+    else None (printing why a full rebuild is needed).
+    """
+    if not (STATE_PATH.exists() and RESOLVED_PATH.exists() and Path(output_path).exists()):
+        print("No previous integration to append to, running a full rebuild")
+        return None
+    state = json.loads(STATE_PATH.read_text())
+    changed = [k for k in signature if state.get("signature", {}).get(k) != signature[k]]
+    if changed:
+        print(f"Full rebuild: {', '.join(changed)} changed since the last integration")
+        return None
+    return state
+
+
+def load_spotify(spotify_path, spotify_columns, cache):
+    """
+    Load the Spotify side once: the feature columns we keep plus the normalized
+    keys. This is the only table kept in memory for the whole run.
+    """
+    spotify_needed = [c for c in spotify_columns if c in ["name", "artists"] + spotify_keep]
+    spotify_df = read_table(spotify_path, columns=spotify_needed)
+
+    # Spotify: name is consistent
+    spotify_df["name_clean"] = cache.normalize(spotify_df["name"])
+
+    # Spotify artists are stringified lists like "['A', 'B']", the brackets and quotes get stripped as punctuation.
+    # Missing values become "nan" like the str() call in the original loop did
+    spotify_df["artists_clean"] = cache.normalize(spotify_df["artists"], na_value="nan")
+    spotify_df['match_key'] = spotify_df['name_clean'] + '_' + spotify_df['artists_clean']
+    return spotify_df.drop(columns=["name"])
+
+
+def build_artist_index(spotify_df, cache):
+    """Artist index over the Spotify rows: every track under its whole artist credit and under each listed artist"""
+    spotify_artists = split_artist_list(spotify_df["artists"]).reset_index(drop=True).explode()
+    spotify_artists_clean = cache.normalize(spotify_artists)
+    listed = (spotify_artists_clean != "").to_numpy()
+    spotify_positions = np.arange(len(spotify_df))
+    return ArtistIndex.build(
+        np.concatenate([spotify_positions, spotify_artists.index.to_numpy()[listed]]),
+        pd.concat([spotify_df["name_clean"], spotify_df["name_clean"].iloc[spotify_artists.index[listed]]]),
+        pd.concat([spotify_df["artists_clean"], spotify_artists_clean[listed]]),
+    )
+
+
+def load_artist_index(spotify_df, cache, signature=None):
+    """
+    Artist index saved by an earlier run with the same Spotify data and rules,
+    or a new one built (and saved, when `signature` is given) if there is none.
+    """
+    artist_index = ArtistIndex.load(INDEX_PATH, signature) if signature is not None else None
+    if artist_index is None:
+        artist_index = build_artist_index(spotify_df, cache)
+        if signature is not None:
+            artist_index.save(INDEX_PATH, signature)
+    return artist_index
+
+
+def probe_songs(songs, credit_col, artist_index, cache):
+    """
+    Probe the artist index for each song with its whole credit, then its primary
+    artist, then any featured artists, and keep the first probe that finds
+    something. Returns the bucket per song (-1 if none) and which probe hit.
+    """
+    credit = split_credit(songs[credit_col])
+    credited_artists = credit.explode()
+    probes = pd.DataFrame({
+        "song": np.concatenate([np.arange(len(songs)), credited_artists.index.to_numpy()]),
+        "title": pd.concat([songs["song_clean"], songs["song_clean"].iloc[credited_artists.index]], ignore_index=True),
+        "artist": pd.concat([songs["artist_clean"], cache.normalize(credited_artists)], ignore_index=True),
+    })
+    probes = probes[probes["artist"] != ""].drop_duplicates(["song", "artist"])
+    probes["bucket"] = artist_index.lookup(probes["title"], probes["artist"])
+    # Rank 0 is the whole credit, 1 the primary artist, 2+ featured artists
+    probes["rank"] = probes.groupby("song").cumcount()
+
+    hits = probes[probes["bucket"] >= 0].drop_duplicates("song")
+    song_bucket = np.full(len(songs), -1, dtype=np.int64)
+    song_bucket[hits["song"]] = hits["bucket"]
+    method = np.full(len(songs), "", dtype=object)
+    method[hits["song"]] = np.where(hits["rank"] == 0, "credit", "artist")
+    return song_bucket, method
+
+
+def fuzzy_candidates(songs, spotify_df, fuzzy_threshold=DEFAULT_THRESHOLD):
+    """
+    Closest Spotify key for each song (see fuzzy_matching.py).
+
+    Returns the positions of the matched songs and their confidence, plus the
+    candidate (song position, Spotify row) pairs: every Spotify row whose
+    whole credit is the matched key.
+    """
+    spotify_keys = (
+        spotify_df[["name_clean", "artists_clean", "match_key"]]
+        .drop_duplicates("match_key")
+        .rename(columns={"name_clean": "song", "artists_clean": "artist"})
+    )
+    billboard_keys = pd.DataFrame({
+        "song": songs["song_clean"].to_numpy(),
+        "artist": songs["artist_clean"].to_numpy(),
+        "match_key": np.arange(len(songs)),
+    })
+    fuzzy_df = fuzzy_match(billboard_keys, spotify_keys, threshold=fuzzy_threshold)
+
+    spotify_rows = pd.DataFrame({"spotify_key": spotify_df["match_key"].to_numpy(), "row": np.arange(len(spotify_df))})
+    candidates = fuzzy_df.astype({"spotify_key": object}).merge(spotify_rows, on="spotify_key")
+    return (
+        fuzzy_df["match_key"].to_numpy(dtype=np.int64),
+        fuzzy_df["match_confidence"].to_numpy(dtype=np.float64),
+        candidates["match_key"].to_numpy(dtype=np.int64),
+        candidates["row"].to_numpy(dtype=np.int64),
+    )
+
+
+def resolve_songs(songs, credit_col, artist_index, spotify_df, cache, fuzzy=False, fuzzy_threshold=DEFAULT_THRESHOLD):
+    """
+    Resolve distinct Billboard songs (song_clean, artist_clean and the raw credit) to
+    one Spotify row each.
+
+    Songs are first looked up in the artist index (skipped when artist_index is
+    None); with fuzzy on, songs still unresolved get their closest Spotify key.
+    A song is resolved the same way whatever other songs it is resolved with.
+    Returns a frame aligned with `songs` with the chosen `track` (-1 if none),
+    its `confidence`, the `method` that found it and the number of `versions`.
+    """
+    songs = songs.reset_index(drop=True)
+    if artist_index is not None:
+        song_bucket, method = probe_songs(songs, credit_col, artist_index, cache)
+        song_ids, candidate_rows = artist_index.rows(song_bucket)
+    else:
+        song_bucket = np.full(len(songs), -1, dtype=np.int64)
+        method = np.full(len(songs), "", dtype=object)
+        song_ids = candidate_rows = np.array([], dtype=np.int64)
+    confidence = np.where(song_bucket >= 0, 1.0, np.nan)
+
+    #Optionally, songs the index can't resolve get pointed at their closest Spotify key instead
+    unresolved = np.flatnonzero(song_bucket < 0)
+    if fuzzy and len(unresolved):
+        fuzzy_ids, fuzzy_confidence, fuzzy_songs, fuzzy_rows = fuzzy_candidates(
+            songs.iloc[unresolved], spotify_df, fuzzy_threshold
+        )
+        confidence[unresolved[fuzzy_ids]] = fuzzy_confidence
+        method[unresolved[fuzzy_ids]] = "fuzzy"
+        song_ids = np.concatenate([song_ids, unresolved[fuzzy_songs]])
+        candidate_rows = np.concatenate([candidate_rows, fuzzy_rows])
+
+    #Pick one canonical Spotify track per song, so repeated versions don't multiply the weekly rows
+    track, versions = pick_canonical_tracks(song_ids, candidate_rows, spotify_df, len(songs))
+
+    return pd.DataFrame({"track": track, "confidence": confidence, "method": method, "versions": versions})
+
+
+def normalize_chart_rows(billboard_df, song_col, artist_col, cache):
+    """Add the normalized title, artist and match key to chart rows"""
+    # Same rules as clean_string, applied once per distinct raw string
+    billboard_df["song_clean"] = cache.normalize(billboard_df[song_col])
+    billboard_df["artist_clean"] = cache.normalize(billboard_df[artist_col])
+
+    #Create key matching for datasets, used to help match object between both datasets after cleaning reformattation
+    billboard_df['match_key'] = billboard_df['song_clean'] + '_' + billboard_df['artist_clean']
+
+
+def match_chart_rows(billboard_df, song_col, artist_col, resolved, artist_index, spotify_df, cache,
+                     fuzzy=False, fuzzy_threshold=DEFAULT_THRESHOLD):
+    """
+    Match one block of weekly chart rows against Spotify.
+
+    `resolved` holds the songs resolved so far (indexed by song key) and is
+    returned with this block's new songs added, so each song is only resolved
+    once however many weeks or chunks it appears in. Returns the integrated
+    rows of this block sorted by date (labelled with their billboard_df index)
+    and the updated `resolved`. Rows that already hold song_clean, artist_clean
+    and match_key (normalized by match_partitioned()) aren't normalized again.
+    """
+    if "match_key" not in billboard_df.columns:
+        normalize_chart_rows(billboard_df, song_col, artist_col, cache)
+    song_key = billboard_df["match_key"] + "\0" + billboard_df[artist_col].fillna("")
+
+    #Phase 1: resolve each song we haven't seen yet to one Spotify track
+    # The key goes on before the rows are picked: assigning a Series to an empty selection would bring every row back
+    new_songs = billboard_df.assign(song_key=song_key)[resolved.index.get_indexer(song_key) < 0].drop_duplicates("song_key")
+    if len(new_songs):
+        new_resolved = resolve_songs(
+            new_songs, artist_col, artist_index, spotify_df, cache, fuzzy=fuzzy, fuzzy_threshold=fuzzy_threshold
+        ).set_index(new_songs["song_key"].to_numpy())
+        resolved = new_resolved if resolved.empty else pd.concat([resolved, new_resolved])
+
+    #Phase 2: attach only the Spotify feature columns to the weekly chart rows of matched songs
+    row_songs = resolved.index.get_indexer(song_key)
+    row_track = resolved["track"].to_numpy()[row_songs]
+    matched_rows = np.flatnonzero(row_track >= 0)
+    billboard_df["match_confidence"] = resolved["confidence"].to_numpy()[row_songs]
+
+    billboard_cols = [c for c in list(billboard_keep_map.keys()) + ["match_confidence"] if c in billboard_df.columns]
+    spotify_cols = [c for c in spotify_keep if c in spotify_df.columns]
+    merged_df = pd.concat(
+        [
+            billboard_df[billboard_cols].iloc[matched_rows],
+            spotify_df[spotify_cols].iloc[row_track[matched_rows]].set_axis(billboard_df.index[matched_rows]),
+        ],
+        axis=1,
+    )
+
+    # Build list (not set!) of columns to keep
+    keep_cols = list(billboard_keep_map.keys()) + spotify_keep
+    if fuzzy:
+        keep_cols.append("match_confidence")
+    # Keep only the columns that actually exist, integrate_data() warns about the others
+    keep_cols = [c for c in keep_cols if c in merged_df.columns]
+
+    integrated_df = merged_df[keep_cols].copy()
+
+    # Rename Billboard columns to nicer names
+    integrated_df = integrated_df.rename(columns=billboard_keep_map)
+
+    # Convert Date column to datetime
+    integrated_df["Date"] = pd.to_datetime(integrated_df["Date"])
+
+    # Creating Binary Targets for overall song performance (Peak Position is nullable Int64, a missing one counts as not reached)
+    integrated_df["reached_top_10"] = (integrated_df["Peak Position"] <= 10).fillna(False).astype(int)
+    integrated_df["reached_top_1"] = (integrated_df["Peak Position"] == 1).fillna(False).astype(int)
+
+    #Sorting the block by date, a stable sort so rows of the same week stay in chart order
+    integrated_df = integrated_df.sort_values('Date', kind='stable')
+    return integrated_df, resolved
+
+
+def match_partition(billboard_df, spotify_df, song_col, artist_col, keep_confidence=False):
+    """
+    Worker for match_partitioned(): build the artist index over one Spotify
+    partition and match the chart rows of the same partition against it.
+    The chart rows come normalized, only the Spotify artist lists and the
+    credited artists are normalized here.
+    """
+    cache = NormalizationCache()
+    artist_index = build_artist_index(spotify_df, cache)
+    integrated_df, resolved = match_chart_rows(
+        billboard_df, song_col, artist_col, pd.DataFrame(columns=RESOLVED_COLUMNS), artist_index, spotify_df, cache
+    )
+    if not resolved.empty:
+        # Tracks are positions in this partition, store them as positions in the whole Spotify table
+        track = resolved["track"].to_numpy()
+        resolved["track"] = np.where(track >= 0, spotify_df.index.to_numpy()[track], -1)
+    if keep_confidence:
+        # Everything matched here is an exact match, fuzzy matching runs afterwards on the whole Spotify table
+        integrated_df.insert(integrated_df.columns.get_loc("reached_top_10"), "match_confidence", 1.0)
+    return integrated_df, resolved
+
+
+def match_partitioned(billboard_df, spotify_df, song_col, artist_col, cache, workers,
+                      fuzzy=False, fuzzy_threshold=DEFAULT_THRESHOLD):
+    """
+    Same result as match_chart_rows() on the whole chart, spread over `workers` processes.
+
+    Both tables are hash-partitioned on the normalized title. Every artist index
+    key starts with the title, so a chart song can only match tracks in its own
+    partition, and each partition is indexed and joined in its own process.
+    The chart is normalized once here and shipped with its normalized columns,
+    so the processes don't normalize it again.
+    Fuzzy matching compares different titles, so it runs afterwards in this
+    process on the songs no partition could resolve. Results are put back in
+    chart order before the date sort, so the output doesn't depend on `workers`.
+    """
+    normalize_chart_rows(billboard_df, song_col, artist_col, cache)
+
+    billboard_partition = pd.util.hash_array(billboard_df["song_clean"].to_numpy(dtype=object)) % workers
+    spotify_partition = pd.util.hash_array(spotify_df["name_clean"].to_numpy(dtype=object)) % workers
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        results = list(executor.map(
+            match_partition,
+            [billboard_df[billboard_partition == p] for p in range(workers)],
+            [spotify_df[spotify_partition == p] for p in range(workers)],
+            repeat(song_col),
+            repeat(artist_col),
+            repeat(fuzzy),
+        ))
+    integrated = [integrated_df for integrated_df, _ in results]
+    resolved = pd.concat([r for _, r in results if not r.empty] or [pd.DataFrame(columns=RESOLVED_COLUMNS)])
+
+    if fuzzy:
+        unresolved = resolved.index[resolved["method"] == ""]
+        song_key = billboard_df["match_key"] + "\0" + billboard_df[artist_col].fillna("")
+        unresolved_rows = billboard_df[unresolved.get_indexer(song_key) >= 0]
+        if len(unresolved_rows):
+            fuzzy_df, fuzzy_resolved = match_chart_rows(
+                unresolved_rows, song_col, artist_col, pd.DataFrame(columns=RESOLVED_COLUMNS), None, spotify_df, cache,
+                fuzzy=True, fuzzy_threshold=fuzzy_threshold,
+            )
+            resolved = pd.concat([resolved.drop(fuzzy_resolved.index), fuzzy_resolved])
+            integrated.append(fuzzy_df)
+
+    integrated_df = pd.concat(integrated).sort_index(kind="stable").sort_values("Date", kind="stable")
+    return integrated_df, resolved
+
+
+def integrate_data(export_csv=False, use_cache=True, fuzzy=False, fuzzy_threshold=DEFAULT_THRESHOLD,
+                   chunk_size=None, workers=1, incremental=False, save=True):
+
+    """
+    Intergrate the Billboard and Spotify dataset into our coding pipelines.
+
+    With chunk_size set, the Billboard chart is streamed in blocks of that many
+    rows and the integrated rows are spilled to sorted temporary files and merged,
+    so memory stays bounded by the chunk size (plus the Spotify index) instead of
+    the number of chart rows. The output is identical to the in-memory run.
+
+    With workers > 1, the chart and Spotify tables are hash-partitioned on the
+    normalized title and matched in that many processes (see
+    match_partitioned()). The output is again identical.
+
+    With incremental on, only chart rows newer than the last integrated week
+    (the watermark in integration_state.json) are matched and appended to the
+    integrated data as a new part file (see storage.append_table()), reusing
+    the songs already resolved and the saved artist index; without fuzzy
+    matching only the Spotify feature columns are read. Rows up to the
+    watermark are taken as final. When the Spotify data,
+    the normalization rules or the matching options changed since the last run
+    (or there is no last run), a full rebuild runs instead, with chunk_size and
+    workers as given. Either way the integrated data comes out the same as a
+    full rebuild. Returns None when the table is only on disk (chunked and
+    incremental runs).
+
+    With save off, the integrated data is only returned, not written (nor is
+    the incremental state that describes it), for callers that pass it on in
+    memory (see run_pipeline.py). The normalization cache and the artist index
+    are still saved unless use_cache is off: they are caches keyed on the
+    Spotify data and the rules, not outputs, and only make later runs faster.
+    """
+    if workers > 1 and chunk_size is not None:
+        raise ValueError("workers and chunk_size can't be combined, pick one of the two")
+    if not save and (chunk_size is not None or incremental):
+        raise ValueError("chunked and incremental runs build the integrated data on disk, they need save on")
+    
+    print("Data Intergration")
+    
+    #Only load the columns we actually use from each dataset, read from the typed Parquet copies made in retrieval
+    billboard_path = RAW_DIR / "billboard_hot_100.parquet"
+    spotify_path = RAW_DIR / "spotify_songs.parquet"
+    output_path = PROCESSED_DIR / "integrated_data.parquet"
+
+    billboard_columns = table_columns(billboard_path)
+    spotify_columns = table_columns(spotify_path)
+
+    # Billboard: find song + artist columns, regardless of exact casing/name
+    billboard_song_col = get_col(
+        billboard_columns,
+        ["Song", "song", "title", "Track Name", "track_name"],
+        "Billboard song",
+    )
+    billboard_artist_col = get_col(
+        billboard_columns,
+        ["Artist", "artist", "Artist(s)", "artist_name"],
+        "Billboard artist",
+    )
+
+    billboard_needed = [billboard_song_col, billboard_artist_col] + list(billboard_keep_map.keys())
+    billboard_needed = [c for c in billboard_columns if c in billboard_needed]
+
+    # Optional: sanity check / warning if something is missing
+    keep_cols = list(billboard_keep_map.keys()) + spotify_keep
+    missing = [c for c in keep_cols if c not in billboard_columns and c not in spotify_columns]
+    if missing:
+        print("  Warning: the following expected columns are missing in merged_df:")
+        for m in missing:
+            print(f"    - {m}")
+
+    #Anything that changes how existing rows match forces a full rebuild of the integrated data
+    signature = {
+        "spotify data": spotify_fingerprint(spotify_path),
+        "normalization rules": rules_version(),
+        "matching version": INTEGRATION_VERSION,
+        "fuzzy": fuzzy,
+        "fuzzy threshold": fuzzy_threshold if fuzzy else None,
+    }
+    index_signature = {k: signature[k] for k in ["spotify data", "normalization rules", "matching version"]}
+    date_col = get_col(billboard_columns, ["date", "Date"], "Billboard date")
+    state = load_state(signature, output_path) if incremental else None
+
+    if state is not None:
+        #Incremental run: only the chart weeks after the watermark, matched in this process
+        new_rows = read_table(
+            billboard_path, columns=billboard_needed, filters=[(date_col, ">", pd.Timestamp(state["watermark"]))]
+        )
+        print(f"Incremental run: {len(new_rows):,} chart rows after {state['watermark']}")
+        if new_rows.empty:
+            print("Integrated data is already up to date")
+            return None
+        chunk_size = None
+        workers = 1
+    elif save:
+        # A full rebuild replaces whatever an earlier run left, don't let an incremental run append to it halfway
+        STATE_PATH.unlink(missing_ok=True)
+
+    # Same rules as clean_string, applied once per distinct raw string. Billboard repeats the same
+    # song and artist every week it charts, and the raw -> clean mapping is kept on disk between runs
+    cache_path = PROCESSED_DIR / "normalization_cache.parquet" if use_cache else None
+    cache = NormalizationCache.load(cache_path) if use_cache else NormalizationCache()
+
+    #Load in the Spotify side, cleaned and indexed by title and artist
+    
+    print("\nLoading Spotify and building artist index")
+    artist_index = None
+    if state is not None and not fuzzy and use_cache:
+        # Appending exact matches only needs the saved index (it holds the normalized Spotify keys)
+        # and the feature columns of the tracks, the Spotify titles and artists aren't read or normalized
+        artist_index = ArtistIndex.load(INDEX_PATH, index_signature)
+    if artist_index is not None:
+        spotify_df = read_table(spotify_path, columns=[c for c in spotify_columns if c in spotify_keep])
+        print(f"Spotify records: {len(spotify_df):,}")
+        print(f"Artist index keys: {len(artist_index):,} (saved)")
+    else:
+        spotify_df = load_spotify(spotify_path, spotify_columns, cache)
+        print(f"Spotify records: {len(spotify_df):,}")
+        if workers > 1:
+            # Each worker builds the index over its own partition
+            print(f"Artist index built per partition ({workers} workers)")
+        else:
+            # Saved next to the cache, so later runs on the same Spotify data don't have to rebuild it
+            artist_index = load_artist_index(spotify_df, cache, index_signature if use_cache else None)
+            print(f"Artist index keys: {len(artist_index):,}")
+
+    #Match the Billboard chart, all at once or one chunk at a time
+    
+    print("\nMatching Billboard chart")
+    resolved = pd.DataFrame(columns=RESOLVED_COLUMNS)
+    billboard_records = 0
+    matched_records = 0
+    fuzzy_rows = 0
+    top_10 = 0
+    top_1 = 0
+    memory_before = 0.0
+    memory_after = 0.0
+    columns = []
+    watermark = None
+
+    if state is not None:
+        # Carry on from the last run's songs and totals
+        resolved = pd.read_parquet(RESOLVED_PATH).set_index("song_key")
+        billboard_records = state["billboard_records"]
+        matched_records = state["matched_records"]
+        fuzzy_rows = state["fuzzy_rows"]
+        top_10 = state["top_10"]
+        top_1 = state["top_1"]
+        memory_before = state["memory_before"]
+        memory_after = state["memory_after"]
+        columns = state["columns"]
+        watermark = pd.Timestamp(state["watermark"])
+        billboard_chunks = [new_rows]
+    elif chunk_size is None:
+        billboard_chunks = [read_table(billboard_path, columns=billboard_needed)]
+    else:
+        billboard_chunks = iter_table(billboard_path, columns=billboard_needed, chunk_size=chunk_size)
+        run_dir = tempfile.TemporaryDirectory(dir=PROCESSED_DIR, prefix="integration_runs_")
+        run_paths = []
+
+    for billboard_df in billboard_chunks:
+        if workers > 1:
+            integrated_df, resolved = match_partitioned(
+                billboard_df, spotify_df, billboard_song_col, billboard_artist_col, cache, workers,
+                fuzzy=fuzzy, fuzzy_threshold=fuzzy_threshold,
+            )
+        else:
+            integrated_df, resolved = match_chart_rows(
+                billboard_df, billboard_song_col, billboard_artist_col, resolved, artist_index, spotify_df, cache,
+                fuzzy=fuzzy, fuzzy_threshold=fuzzy_threshold,
+            )
+        if fuzzy and not resolved.empty:
+            song_key = billboard_df["match_key"] + "\0" + billboard_df[billboard_artist_col].fillna("")
+            fuzzy_rows += int((resolved["method"].to_numpy()[resolved.index.get_indexer(song_key)] == "fuzzy").sum())
+
+        # Compact dtypes (categoricals, float32, small ints) before the rows are kept or spilled
+        memory_before += memory_mb(integrated_df)
+        integrated_df = compact(integrated_df)
+        memory_after += memory_mb(integrated_df)
+
+        billboard_records += len(billboard_df)
+        matched_records += len(integrated_df)
+        top_10 += int(integrated_df["reached_top_10"].sum())
+        top_1 += int(integrated_df["reached_top_1"].sum())
+        columns = list(integrated_df.columns)
+        latest = pd.Timestamp(billboard_df[date_col].max())
+        watermark = latest if watermark is None or latest > watermark else watermark
+
+        if chunk_size is not None:
+            run_paths.append(Path(run_dir.name) / f"run_{len(run_paths):05d}.parquet")
+            plain_types(integrated_df).to_parquet(run_paths[-1], index=False)
+            print(f"  Chunk {len(run_paths)}: {billboard_records:,} chart rows read, {matched_records:,} matched")
+
+    print(f"Billboard records: {billboard_records:,}")
+    if cache.save():
+        print(f"Normalization cache saved to: {cache_path} ({len(cache):,} strings)")
+
+    #Print out the merge stats, since not every song on Spotify has Charted on Billboards thus some records won't be shared between each dataset
+    method = resolved["method"]
+    versions = resolved["versions"].to_numpy(dtype=np.int64)
+    fuzzy_songs = int((method == "fuzzy").sum())
+    ambiguous_songs = int((versions > 1).sum())
+    collapsed_versions = int((versions[versions > 1] - 1).sum())
+    print(f"Songs matched on the whole artist credit: {int((method == 'credit').sum()):,}")
+    print(f"Songs matched on a primary or featured artist: {int((method == 'artist').sum()):,}")
+    if fuzzy:
+        print(f"Songs without an exact match: {int(method.isin(['', 'fuzzy']).sum()):,}")
+        print(f"Fuzzy matched songs: {fuzzy_songs:,} ({fuzzy_rows:,} chart rows, threshold {fuzzy_threshold})")
+    print(f"Songs with several Spotify versions: {ambiguous_songs:,} ({collapsed_versions:,} extra versions collapsed)")
+    print(f"Total matched records: {matched_records:,}")
+    print(f"Match rate of datasets: {matched_records/billboard_records*100:.2f}% ")
+    print(memory_report("integrated data", memory_before, memory_after))
+
+    #Save new updated Integrated Dataset as Parquet (and CSV if asked for), sorted by date
+    if state is not None:
+        # Every new row is dated after the rows already stored, so appending keeps the table sorted
+        STATE_PATH.unlink()
+        output_path = append_table(integrated_df, output_path, export_csv=export_csv)
+        integrated_df = None
+    elif chunk_size is None:
+        if save:
+            output_path = write_table(integrated_df, output_path, export_csv=export_csv)
+    else:
+        output_path = merge_sorted_runs(run_paths, output_path, "Date", chunk_size=chunk_size, export_csv=export_csv)
+        run_dir.cleanup()
+        integrated_df = None
+
+    #Final information of Where Integrated dataset is saved to and Statsical inforamtion of Integrated Dataset
+    shape = (matched_records, len(columns))
+    if save:
+        print(f"\nIntegrated data saved to: {output_path}")
+    print(f"Final dataset shape: {shape}")
+    print(f"Columns: {columns}")
+    
+    #Creating a Text File highlighting details and summarizing infromation of new Dataset we created for any inquires
+    txt_path = Path("data/processed/integration_summary.txt")
+    
+    with open(txt_path, 'w') as f:
+        f.write("Data Integration Summary\n")
+        
+        f.write(f"Billboard records: {billboard_records:,}\n")
+        f.write(f"Spotify records: {len(spotify_df):,}\n")
+        f.write(f"Matched records: {matched_records:,}\n")
+        f.write(f"Match rate: {matched_records/billboard_records*100:.2f}%\n")
+        if fuzzy:
+            f.write(f"Fuzzy matched songs: {fuzzy_songs:,} ({fuzzy_rows:,} chart rows, threshold {fuzzy_threshold})\n")
+        f.write(f"Songs with several Spotify versions: {ambiguous_songs:,} ({collapsed_versions:,} extra versions collapsed)\n")
+        f.write(memory_report("integrated data", memory_before, memory_after) + "\n")
+        f.write(f"\nFinal dataset shape: {shape}\n")
+        f.write(f"\nColumns in integrated dataset:\n")
+        for col in columns:
+            f.write(f"  - {col}\n")
+        f.write(f"\nTarget variables created:\n")
+        f.write(f"  - reached_top_10: {top_10:,} songs\n")
+        f.write(f"  - reached_top_1: {top_1:,} songs\n")
+
+    print(f"Integration summary saved to: {txt_path}")
+
+    if not save:
+        return integrated_df
+
+    #Record the watermark and the resolved songs, so the next run can integrate just the newer weeks
+    resolved.rename_axis("song_key").reset_index().to_parquet(RESOLVED_PATH, index=False)
+    STATE_PATH.write_text(json.dumps({
+        "signature": signature,
+        "watermark": str(watermark.date()),
+        "billboard_records": billboard_records,
+        "matched_records": matched_records,
+        "fuzzy_rows": fuzzy_rows,
+        "top_10": top_10,
+        "top_1": top_1,
+        "memory_before": memory_before,
+        "memory_after": memory_after,
+        "columns": columns,
+    }, indent=2))
+    print(f"Integrated up to chart week {watermark.date()} (state saved to: {STATE_PATH})")
+
+    return integrated_df
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Integrate the Billboard and Spotify datasets")
+    parser.add_argument("--csv", action="store_true", help="also export integrated_data.csv")
+    parser.add_argument("--no-cache", action="store_true", help="don't read or write the normalization cache")
+    parser.add_argument("--fuzzy", action="store_true", help="also match songs whose title or artist differ slightly")
+    parser.add_argument("--fuzzy-threshold", type=float, default=DEFAULT_THRESHOLD,
+                        help=f"minimum similarity for a fuzzy match (default {DEFAULT_THRESHOLD})")
+    parser.add_argument("--chunk-size", type=int, default=None,
+                        help="stream the Billboard chart in chunks of this many rows instead of loading it all")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="match hash partitions of the data in this many processes (default 1)")
+    parser.add_argument("--incremental", action="store_true",
+                        help="only integrate chart weeks newer than the last run (full rebuild if Spotify or the rules changed)")
+    args = parser.parse_args()
+    integrate_data(
+        export_csv=args.csv,
+        use_cache=not args.no_cache,
+        fuzzy=args.fuzzy,
+        fuzzy_threshold=args.fuzzy_threshold,
+        chunk_size=args.chunk_size,
+        workers=args.workers,
+        incremental=args.incremental,
+    )
\ No newline at end of file
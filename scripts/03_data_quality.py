@@ -1,165 +1,297 @@
-import pandas as pd
-import numpy as np
-from pathlib import Path
-
-"""
-This script checks and assesses the quality of the integrated dataset we created in Data Integration
-"""
-
-def assess_quality():
-    
-    """Function Built to evaluate the quailty of the integrated dataset"""
-    print("Integrated Data Quality Check Process")
-    
-    df = pd.read_csv("data/processed/integrated_data.csv")
-    
-    print(f"Dataset shape: {df.shape}")
-    
-    #Created to make a text file at the end with all information within the assess_quailty after function excutes for later refrenece
-    quality_report = []
-    
-    #First, we are checking the dataset that was created to see how complete it is with values, checking for null or missing values
-    print("\nFirst, Checking to see if Dataset is complete with no Null Values")
-    
-    missing_data = df.isnull().sum()
-    missing_pct = (df.isnull().sum() / len(df) * 100).round(2)
-
-    #Going to show the user what null or missing values are present in the new dataset
-    print(f"\nMissing values per column:")
-    quality_report.append("\nMissing values per column:")
-    #loop that is using Fstring to print per each column with missing data/null data
-    for col in df.columns:
-        if missing_data[col] > 0:
-            print(f"  {col}: {missing_data[col]} ({missing_pct[col]}%)")
-            quality_report.append(f"  {col}: {missing_data[col]} ({missing_pct[col]}%)")
-            
-    if missing_data.sum() == 0:
-        print("  No missing values found!")
-        quality_report.append("  No missing values found!")
-
-    #Second, Accuracy Testing to see how valid the data is compared to the varaible guidelines for the dataset
-    print("Secondly, Accuracy Test to see if values are in valid ranges")
-
-    quality_report.append("\n\n2. Accuracy Test")
-    
-    # Check for valid ranges
-    issues = []
-
-    # Spotify features should be in valid ranges
-    if ((df['acousticness'] < 0) | (df['acousticness'] > 1)).any():
-        issues.append("Acousticness values outside [0,1] range")
-
-    if ((df['danceability'] < 0) | (df['danceability'] > 1)).any():
-        issues.append("Danceability values outside [0,1] range")
-
-    if ((df['energy'] < 0) | (df['energy'] > 1)).any():
-        issues.append("Energy values outside [0,1] range")
-
-    if ((df['valence'] < 0) | (df['valence'] > 1)).any():
-        issues.append("Valence values outside [0,1] range")
-
-    if ((df['Rank'] < 1) | (df['Rank'] > 100)).any():
-        issues.append("Rank values outside [1,100] range")
-
-    if ((df['Peak Position'] < 1) | (df['Peak Position'] > 100)).any():
-        issues.append("Peak Position values outside [1,100] range")
-
-    if len(issues) > 0:
-        print("Issues found:")
-        quality_report.append("\nIssues found:")
-        for issue in issues:
-            print(f"  : {issue}")
-            quality_report.append(f"  : {issue}")
-    else:
-        print("All values within expected ranges!")
-        quality_report.append("All values within expected ranges!")
-
-    #Third, Consistency Test, searching for Duplicate Songs
-    quality_report.append("\n\n3. Consistency Test")
-    
-    
-    # Check duplicate songs
-    duplicates = df.duplicated(subset=['Song', 'Artist', 'Date'])
-    print(f"Duplicate records (Items with same song name, artist, date): {duplicates.sum()}")
-    quality_report.append(f"Duplicate records (Items with same song name, artist, date): {duplicates.sum()}")
-    
-    #Fourth, Analyizing the Distribution of Data
-    
-    print("4. Distribution Analysis")
-    quality_report.append("\n\n4. Distribution Analysis")
-    
-    # Numerical columns we will be using for our analysis
-    numeric_cols = ['danceability', 'energy', 'loudness', 'speechiness',
-                    'acousticness', 'instrumentalness', 'liveness', 'valence', 'tempo']
-    
-    print("\nBasic Statistics for Key Features:")
-    quality_report.append("\nBasic Statistics for key features:")
-    
-    stats = df[numeric_cols].describe()
-    print(stats)
-    #now add to the report
-    quality_report.append("\n" + stats.to_string())
-
-    #We are going to look at outliers in the data using IQR
-    print("\n\nOutlier detection using IQR method:")
-    quality_report.append("\n\nOutlier detection using IQR method:")
-    
-    for col in numeric_cols:
-        Q1 = df[col].quantile(0.25)
-        Q3 = df[col].quantile(0.75)
-        
-        IQR = Q3 - Q1
-        
-        lower_bound = Q1 - 1.5 * IQR
-        upper_bound = Q3 + 1.5 * IQR
-
-        outliers = ((df[col] < lower_bound) | (df[col] > upper_bound)).sum()
-        outlier_percent = (outliers / len(df) * 100).round(2)
-
-        if outliers > 0:
-            print(f"  {col}: {outliers} outliers ({outlier_percent}%)")
-            quality_report.append(f"  {col}: {outliers} outliers ({outlier_percent}%)")
-            
-    #Fifth, we are going to create a list of data types for all the variables for reference
-    print("5. Data Types")
-    quality_report.append("\n\n5. Data Types")
-    
-    print("\nColumn data types:")
-    quality_report.append("\nColumn data types:")
-    
-    for col in df.columns:
-        print(f"  {col}: {df[col].dtype}")
-        quality_report.append(f"  {col}: {df[col].dtype}")
-
-    #Finally, Summarize the Information from the Integrated Data Set
-    print("Integrated Data Quality Summary")
-    
-    total_cells = df.shape[0] * df.shape[1]
-    
-    missing_cells = df.isnull().sum().sum()
-    
-    completeness = ((total_cells - missing_cells) / total_cells * 100).round(2)
-
-    print(f"\nCompleteness: {completeness}%")
-    print(f"Total records: {len(df):,}")
-    print(f"Total features: {len(df.columns)}")
-
-    quality_report.append(f"\nCompleteness: {completeness}%")
-    quality_report.append(f"Total records: {len(df):,}")
-    quality_report.append(f"Total features: {len(df.columns)}")
-    
-    #Now save the report into Text File for later reference after running
-    report_path = Path("data/processed/quality_report.txt")
-    with open(report_path, 'w') as f:
-        f.write('\n'.join(quality_report))
-
-    print(f"\nQuality report saved to: {report_path}")
-
-    return df
-
-if __name__ == "__main__":
-    assess_quality()
-    
-
-     
-    
+import argparse
+import json
+import pandas as pd
+import numpy as np
+from pathlib import Path
+
+from storage import PROCESSED_DIR, iter_table, read_table
+from schema import compact, memory_mb, memory_report
+from profiler import DESCRIBE_STATS, profile
+from profile_cache import drift_table, merge_profiles, yearly_profiles
+from streaming_stats import DEFAULT_K, DuplicateFilter, StreamingProfile, rank_error
+from validation import RULES_PATH, ValidationTally, load_rules, validate
+
+"""
+This script checks and assesses the quality of the integrated dataset we created in Data Integration
+"""
+
+# Numerical columns we will be using for our analysis
+NUMERIC_COLS = ['danceability', 'energy', 'loudness', 'speechiness',
+                'acousticness', 'instrumentalness', 'liveness', 'valence', 'tempo']
+
+# Columns that identify a chart entry, for the consistency check
+DUPLICATE_KEY = ['Song', 'Artist', 'Date']
+
+def stream_quality(rules, chunk_size):
+    """
+    The report statistics from the integrated data read chunk_size rows at a
+    time, in memory that doesn't grow with the table (see streaming_stats.py).
+    The first pass builds the column profile, the rule counts and the
+    duplicate count; the second counts the IQR outliers once the fences are
+    known. Quartiles are sketch estimates, everything else is exact.
+    """
+    path = PROCESSED_DIR / "integrated_data.parquet"
+    stream = StreamingProfile()
+    tally = ValidationTally(rules)
+    duplicates = DuplicateFilter(DUPLICATE_KEY)
+    duplicate_count = 0
+    dtypes = None
+    rows = 0
+    chunks = 0
+    for chunk in iter_table(path, chunk_size=chunk_size):
+        chunk = compact(chunk)
+        #Number chunk rows by their position in the table so sample rows show the same index as in memory
+        chunk.index = pd.RangeIndex(rows, rows + len(chunk))
+        if dtypes is None:
+            dtypes = chunk.dtypes.copy()
+        #Integer columns compact to nullable ints (Int8...) as soon as one chunk has missing values
+        for col in chunk.columns:
+            if pd.api.types.is_extension_array_dtype(chunk[col].dtype) and not isinstance(chunk[col].dtype, pd.CategoricalDtype):
+                dtypes[col] = chunk[col].dtype
+        stream.update(chunk)
+        tally.update(chunk)
+        duplicate_count += int(duplicates.duplicated(chunk).sum())
+        rows += len(chunk)
+        chunks += 1
+
+    fences = stream.result()
+    outliers = 0
+    for chunk in iter_table(path, chunk_size=chunk_size):
+        outliers = outliers + stream.count_outliers(compact(chunk), fences)
+
+    print(f"Streamed {rows:,} rows in {chunks} chunks of up to {chunk_size:,} rows")
+    print(f"Quartiles from quantile sketches (k={DEFAULT_K}, rank error within {rank_error():.2%} of the rows)")
+    rule_results, rule_samples, failing_rows = tally.results()
+    return stream.result(outliers), rule_results, rule_samples, failing_rows, duplicate_count, rows, dtypes
+
+def cached_profile(df):
+    """
+    The column profile merged from per chart year profiles, only the years whose
+    data changed since the last run are profiled again (see profile_cache.py).
+    Also returns the per-year drift table
+    """
+    profiles = yearly_profiles(df)
+    merged = merge_profiles(profiles)
+    fences = merged.result()
+    column_profile = merged.result(merged.count_outliers(df, fences))
+    return column_profile, drift_table(profiles, merged, NUMERIC_COLS)
+
+def assess_quality(chunk_size=None, profile_cache=False, df=None):
+    
+    """
+    Function Built to evaluate the quailty of the integrated dataset.
+    With a chunk_size the data is streamed instead of loaded whole (see stream_quality),
+    with profile_cache the column profile is merged from cached per-year profiles (see cached_profile).
+    The integrated data can be passed in as df instead of being read from disk
+    """
+    if df is not None and chunk_size is not None:
+        raise ValueError("chunk_size streams the integrated data from disk, it can't be combined with df")
+    print("Integrated Data Quality Check Process")
+
+    # Validation rules declared in validation_rules.yaml (valid ranges, allowed values, non-null,
+    # unique chart positions and cross-column rules)
+    rules = load_rules(RULES_PATH)
+
+    if chunk_size is None:
+        if df is None:
+            df = read_table(PROCESSED_DIR / "integrated_data.parquet")
+
+        #Hold the table in compact dtypes (categoricals, float32, small ints) for this stage
+        memory_before = memory_mb(df)
+        df = compact(df)
+        print(memory_report("quality", memory_before, memory_mb(df)))
+
+        #Profile every column in one pass: nulls, describe() statistics and IQR outliers (see profiler.py)
+        if profile_cache:
+            column_profile, drift = cached_profile(df)
+        else:
+            column_profile, drift = profile(df), None
+        #Rules are compiled into a few vectorized passes
+        rule_results, rule_samples, failing_mask = validate(df, rules)
+        failing_rows = int(failing_mask.sum())
+        duplicate_count = int(df.duplicated(subset=DUPLICATE_KEY).sum())
+        n_rows, dtypes = len(df), df.dtypes
+    else:
+        df = None
+        drift = None
+        column_profile, rule_results, rule_samples, failing_rows, duplicate_count, n_rows, dtypes = stream_quality(rules, chunk_size)
+
+    columns = list(column_profile.index)
+    print(f"Dataset shape: {(n_rows, len(columns))}")
+    
+    #Created to make a text file at the end with all information within the assess_quailty after function excutes for later refrenece
+    quality_report = []
+    
+    #First, we are checking the dataset that was created to see how complete it is with values, checking for null or missing values
+    print("\nFirst, Checking to see if Dataset is complete with no Null Values")
+    
+    missing_data = column_profile["nulls"]
+    missing_pct = (missing_data / n_rows * 100).round(2)
+
+    #Going to show the user what null or missing values are present in the new dataset
+    print(f"\nMissing values per column:")
+    quality_report.append("\nMissing values per column:")
+    #loop that is using Fstring to print per each column with missing data/null data
+    for col in columns:
+        if missing_data[col] > 0:
+            print(f"  {col}: {missing_data[col]} ({missing_pct[col]}%)")
+            quality_report.append(f"  {col}: {missing_data[col]} ({missing_pct[col]}%)")
+            
+    if missing_data.sum() == 0:
+        print("  No missing values found!")
+        quality_report.append("  No missing values found!")
+
+    #Second, Accuracy Testing to see how valid the data is compared to the varaible guidelines for the dataset
+    print("Secondly, Accuracy Test to see if values are in valid ranges")
+
+    quality_report.append("\n\n2. Accuracy Test")
+    
+    issues = list(rule_results.loc[rule_results["violations"] > 0, "message"])
+
+    if len(issues) > 0:
+        print("Issues found:")
+        quality_report.append("\nIssues found:")
+        for issue in issues:
+            print(f"  : {issue}")
+            quality_report.append(f"  : {issue}")
+    else:
+        print("All values within expected ranges!")
+        quality_report.append("All values within expected ranges!")
+
+    #Per rule violation counts and the time of the pass that checked each rule, with a few offending rows for each failing rule
+    print(f"\nValidation rules ({len(rules)} from {RULES_PATH}):")
+    quality_report.append(f"\nValidation rules ({len(rules)} from {RULES_PATH}):")
+    rule_table = rule_results[["type", "columns", "violations", "percent", "pass_ms"]].to_string()
+    print(rule_table)
+    quality_report.append(rule_table)
+    print(f"Rows failing any rule: {failing_rows}")
+    quality_report.append(f"Rows failing any rule: {failing_rows}")
+    for name, sample in rule_samples.items():
+        print(f"\nSample rows failing {name}:")
+        print(sample.to_string())
+        quality_report.append(f"\nSample rows failing {name}:")
+        quality_report.append(sample.to_string())
+
+    #Third, Consistency Test, searching for Duplicate Songs
+    quality_report.append("\n\n3. Consistency Test")
+    
+    
+    # Check duplicate songs
+    print(f"Duplicate records (Items with same song name, artist, date): {duplicate_count}")
+    quality_report.append(f"Duplicate records (Items with same song name, artist, date): {duplicate_count}")
+    
+    #Fourth, Analyizing the Distribution of Data
+    
+    print("4. Distribution Analysis")
+    quality_report.append("\n\n4. Distribution Analysis")
+    
+    numeric_cols = NUMERIC_COLS
+    
+    print("\nBasic Statistics for Key Features:")
+    quality_report.append("\nBasic Statistics for key features:")
+    
+    # Same table describe() prints, taken from the profile
+    stats = column_profile.loc[numeric_cols, DESCRIBE_STATS].T
+    print(stats)
+    #now add to the report
+    quality_report.append("\n" + stats.to_string())
+
+    #We are going to look at outliers in the data using IQR
+    print("\n\nOutlier detection using IQR method:")
+    quality_report.append("\n\nOutlier detection using IQR method:")
+    
+    # Values beyond 1.5 IQR below Q1 or above Q3, counted by the profiler
+    for col in numeric_cols:
+        outliers = column_profile.loc[col, "outliers"]
+        outlier_percent = (outliers / n_rows * 100).round(2)
+
+        if outliers > 0:
+            print(f"  {col}: {outliers} outliers ({outlier_percent}%)")
+            quality_report.append(f"  {col}: {outliers} outliers ({outlier_percent}%)")
+            
+    #Fifth, we are going to create a list of data types for all the variables for reference
+    print("5. Data Types")
+    quality_report.append("\n\n5. Data Types")
+    
+    print("\nColumn data types:")
+    quality_report.append("\nColumn data types:")
+    
+    for col in columns:
+        print(f"  {col}: {dtypes[col]}")
+        quality_report.append(f"  {col}: {dtypes[col]}")
+
+    #Sixth, how the key features move from one chart year to the next (only with the per-year profile cache)
+    if drift is not None:
+        print("6. Drift by Chart Year")
+        quality_report.append("\n\n6. Drift by Chart Year")
+        print("\nFeature means per chart year, max_shift = largest distance from the overall mean in standard deviations:")
+        quality_report.append("\nFeature means per chart year, max_shift = largest distance from the overall mean in standard deviations:")
+        print(drift)
+        quality_report.append("\n" + drift.to_string())
+        drift.to_csv(PROCESSED_DIR / "quality_drift.csv")
+        print(f"Drift table saved to: {PROCESSED_DIR / 'quality_drift.csv'}")
+
+    #Finally, Summarize the Information from the Integrated Data Set
+    print("Integrated Data Quality Summary")
+    
+    total_cells = n_rows * len(columns)
+    
+    missing_cells = missing_data.sum()
+    
+    completeness = ((total_cells - missing_cells) / total_cells * 100).round(2)
+
+    print(f"\nCompleteness: {completeness}%")
+    print(f"Total records: {n_rows:,}")
+    print(f"Total features: {len(columns)}")
+
+    quality_report.append(f"\nCompleteness: {completeness}%")
+    quality_report.append(f"Total records: {n_rows:,}")
+    quality_report.append(f"Total features: {len(columns)}")
+    
+    #Now save the report into Text File for later reference after running
+    report_path = Path("data/processed/quality_report.txt")
+    with open(report_path, 'w') as f:
+        f.write('\n'.join(quality_report))
+
+    print(f"\nQuality report saved to: {report_path}")
+
+    #Same report as JSON, with the full column profile, for scripts that want to read it
+    json_path = report_path.with_suffix(".json")
+    report_json = {
+        "records": n_rows,
+        "features": len(columns),
+        "completeness": float(completeness),
+        "missing_values": {col: int(n) for col, n in missing_data.items() if n > 0},
+        "range_issues": issues,
+        "validation": json.loads(rule_results.to_json(orient="index")),
+        "validation_samples": {
+            name: json.loads(sample.to_json(orient="index", date_format="iso")) for name, sample in rule_samples.items()
+        },
+        "rows_failing_rules": failing_rows,
+        "duplicate_records": duplicate_count,
+        "outliers": {col: int(column_profile.loc[col, "outliers"]) for col in numeric_cols},
+        "dtypes": {col: str(dtypes[col]) for col in columns},
+        "profile": json.loads(column_profile.drop(columns="range_violations").to_json(orient="index")),
+    }
+    if drift is not None:
+        report_json["drift"] = json.loads(drift.to_json(orient="index"))
+    with open(json_path, 'w') as f:
+        json.dump(report_json, f, indent=2)
+    print(f"Quality report (JSON) saved to: {json_path}")
+
+    return df
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Assess the quality of the integrated dataset")
+    parser.add_argument("--chunk-size", type=int, default=None,
+                        help="Stream the data in chunks of this many rows (approximate quartiles, constant memory)")
+    parser.add_argument("--profile-cache", action="store_true",
+                        help="Merge the column profile from per chart year profiles cached between runs, and report drift per year")
+    args = parser.parse_args()
+    if args.chunk_size is not None and args.profile_cache:
+        parser.error("--profile-cache works on the loaded table, it can't be combined with --chunk-size")
+    assess_quality(chunk_size=args.chunk_size, profile_cache=args.profile_cache)
+    
+
+     
+    
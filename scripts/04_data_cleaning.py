@@ -1,165 +1,396 @@
-import pandas as pd
-import numpy as np
-from pathlib import Path
-
-def clean_data():
-    """Clean the integrated dataset"""
-
-    print("Data Cleaning")
-    
-    df = pd.read_csv("data/processed/integrated_data.csv")
-    
-    print(f"Original dataset shape: {df.shape}")
-
-    #Creating a Text file highlighting the process of this Script for future reference after excutation
-    cleaning_log = []
-    cleaning_log.append("Data Cleaning Log")
-    cleaning_log.append(f"\nOriginal dataset shape: {df.shape}")
-    
-    #First, Missing Value handling
-    
-    print("1. Handling Missing Values")
-    cleaning_log.append("\n1. Handling Missing Values")
-    
-    #Find total missing value before cleaning
-    missing_before_cleaning = df.isnull().sum().sum()
-    print(f"\nMissing values before cleaning: {missing_before_cleaning}")
-    cleaning_log.append(f"\nMissing values before cleaning: {missing_before_cleaning}")
-
-    # Drop rows with missing critical values, as these are needed for the analysis
-    critical_cols = ['Song', 'Artist', 'Rank', 'danceability', 'energy', 'loudness']
-    df_clean = df.dropna(subset=critical_cols)
-
-    rows_dropped = len(df) - len(df_clean)
-    print(f"Rows removed due to missing critical values: {rows_dropped}")
-    cleaning_log.append(f"Rows removed due to missing critical values: {rows_dropped}")
-    
-    # Fill the remaining missing values with the median for numeric columns. We decided this was the best choice because other critical numeric columns could be distorted due to Spotify adding older songs into their system.
-    numeric_cols = df_clean.select_dtypes(include=[np.number]).columns
-
-    for col in numeric_cols:
-        missing_count = df_clean[col].isnull().sum()
-        if missing_count > 0:
-            median_val = df_clean[col].median()
-            df_clean[col].fillna(median_val, inplace=True)
-            print(f"  {col}: Filled {missing_count} missing values with median ({median_val:.4f})")
-            cleaning_log.append(f"  {col}: Filled {missing_count} missing values with median ({median_val:.4f})")
-
-    missing_after = df_clean.isnull().sum().sum()
-    print(f"\nMissing values after cleaning: {missing_after}")
-    cleaning_log.append(f"\nMissing values after cleaning: {missing_after}")
-
-    #Second, We will have the process of handling duplicate songs, Since Songs have many verison we have to keep this in mind not getting rid songs with many verisons.
-    
-    print("2. Handling Duplicates")
-    cleaning_log.append("\n2. Handling Duplicates")
-    
-    #Print number and record number of the duplicate values
-    duplicates_before = df_clean.duplicated().sum()
-    print(f"\nDuplicate Song Rows before removal: {duplicates_before}")
-    cleaning_log.append(f"\nDuplicate Song Rows before removal: {duplicates_before}")
-    
-    #drops the duplicate values
-    df_clean = df_clean.drop_duplicates()
-
-    #Print the new list after dropping
-    duplicates_after = df_clean.duplicated().sum()
-    print(f"Duplicate Song Rows after removal: {duplicates_after}")
-    cleaning_log.append(f"Duplicate Song Rows after removal: {duplicates_after}")
-    
-    # Thrid, we will handle Outliers/extreme cases
-    
-    print("3. Outlier Handling")
-    cleaning_log.append("\n3. Outlier Handling")
-    
-    # For features like tempo and loudness, cap at reasonable percentiles
-    outlier_columns = ['tempo', 'loudness', 'duration_ms']
-
-    for column in outlier_columns:
-        if column in df_clean.columns:
-            
-            # Will use the 1st and 99th percentile for capping values, so we still get them at a high extreme value range of only 1% of varaible
-            lower_bound = df_clean[column].quantile(0.01)
-            upper_bound = df_clean[column].quantile(0.99)
-
-            outliers_lower = (df_clean[column] < lower_bound).sum()
-            outliers_upper = (df_clean[column] > upper_bound).sum()
-
-            if outliers_lower > 0 or outliers_upper > 0:
-                df_clean[column] = df_clean[column].clip(lower=lower_bound, upper=upper_bound)
-                print(f"  {column}: Capped {outliers_lower} Lower and {outliers_upper} Upper outliers")
-                cleaning_log.append(f"  {column}: Capped {outliers_lower} Lower and {outliers_upper} Upper outliers")
-                
-    #Fourth, we will now validate the data ranges making sure they are within variable bound if they are bounded values like percentages
-    
-    print("4. Validating Data Ranges")
-    cleaning_log.append("\n4. Validating Data Ranges")
-    
-    """Ensuring the bounded values are between domain of [0,1] like mentioned before"""
-    
-    #Here is the list of bounded features
-    
-    bounded_features = ['acousticness', 'danceability', 'energy', 'instrumentalness',
-                        'liveness', 'speechiness', 'valence']
-
-    for column in bounded_features:
-        if column in df_clean.columns:
-            df_clean[column] = df_clean[column].clip(lower=0, upper=1)
-            
-    print("All Bounded Features Validated to be in [0, 1] range")
-    cleaning_log.append("All Bounded Features Validated to be in [0, 1] range")
-    
-    # Fifth, We will Covert Data Types to make sure all the varaibles are the correct/desired Data type
-    
-    print("5. Converting Data Types")
-    cleaning_log.append("\n5. Converting Data Types")
-    
-    """
-    First in this Step 5, we will handle non-numrice values like '-' which is present in the Last Week and Weeks in Charts varaibles
-    Then, we will do the same to ensure integer values are also correct using .astype(int)
-    """
-    
-    for column in ['Last Week', 'Weeks in Charts']:
-        if column in df_clean.columns:
-            df_clean[column] = pd.to_numeric(df_clean[column], errors='coerce')
-            df_clean[column] = df_clean[column].fillna(0).astype(int)
-
-
-    int_cols = ['Rank', 'Peak Position', 'year', 'mode', 'key', 'explicit']
-    for col in int_cols:
-        if col in df_clean.columns:
-            df_clean[col] = df_clean[col].astype(int)
-
-    print("Data types converted successfully")
-    cleaning_log.append("Data types converted successfully")
-    
-    # Finally we will Summarize the Information we excuted for the terminal to print and to record for the Cleaning Log
-    
-    print("Cleaning Summary")
-    cleaning_log.append("Cleaning Summary")
-    
-    print(f"\Starting Integrate Dataset shape: {df.shape}")
-    print(f"Cleaned shape: {df_clean.shape}")
-    print(f"Rows removed: {len(df) - len(df_clean)} ({(len(df) - len(df_clean))/len(df)*100:.2f}%)")
-    print(f"Data quality: {(1 - df_clean.isnull().sum().sum()/(df_clean.shape[0]*df_clean.shape[1]))*100:.2f}% complete")
-
-    cleaning_log.append(f"\nStarting Integrate Dataset shape: {df.shape}")
-    cleaning_log.append(f"Cleaned shape: {df_clean.shape}")
-    cleaning_log.append(f"Rows removed: {len(df) - len(df_clean)} ({(len(df) - len(df_clean))/len(df)*100:.2f}%)")
-    cleaning_log.append(f"Data quality: {(1 - df_clean.isnull().sum().sum()/(df_clean.shape[0]*df_clean.shape[1]))*100:.2f}% complete")
-
-    #Now we will Save the Dataset, to be used in the next Process 5 the analysis and the Cleaning_Log txt file for a reference after excuting program
-    output_path = Path("data/processed/cleaned_data.csv")
-    df_clean.to_csv(output_path, index=False)
-    print(f"\nCleaned data saved to: {output_path}")
-
-    # Save cleaning log
-    cleaning_log_path = Path("data/processed/cleaning_log.txt")
-    with open(cleaning_log_path, 'w') as f:
-        f.write('\n'.join(cleaning_log))
-
-    print(f"Cleaning log saved to: {cleaning_log_path}")
-    return df_clean
-
-if __name__ == "__main__":
-    clean_data()
\ No newline at end of file
+import argparse
+import time
+import numpy as np
+from pathlib import Path
+
+from storage import PROCESSED_DIR, TableWriter, iter_table, read_table, write_table
+from schema import compact, memory_mb, memory_report, process_memory_mb
+from dedup_index import DEDUP_INDEX_PATH, DedupIndex, DedupIndexWriter
+from cleaning_plan import (CLEANING_PLAN_PATH, CRITICAL_COLS, OUTLIER_COLUMNS, CleaningPlan, cap_outliers,
+                           clip_bounded, convert_types, fill_missing, percentile_bounds, sketch_bounds)
+from streaming_stats import DEFAULT_K, DuplicateFilter, QuantileSketch, StreamingProfile, rank_error
+
+# Columns two rows have to agree on to be duplicates, None for all of them
+DEDUP_COLUMNS = None
+
+class StepLog:
+    """Time and process memory (current and peak RSS) after each cleaning step, for the cleaning log"""
+
+    def __init__(self):
+        self.steps = []
+        self.start = time.perf_counter()
+
+    def done(self, step):
+        now = time.perf_counter()
+        self.steps.append((step, now - self.start, *process_memory_mb()))
+        self.start = now
+
+    def lines(self):
+        mb = lambda value: f"{value:>9.1f} MB" if value is not None else f"{'n/a':>12}"
+        lines = [f"{'Step':<20}{'Time':>9}{'RSS':>12}{'Peak RSS':>12}"]
+        for step, seconds, current, peak in self.steps:
+            lines.append(f"{step:<20}{seconds:>8.2f}s{mb(current)}{mb(peak)}")
+        lines.append(f"{'total':<20}{sum(step[1] for step in self.steps):>8.2f}s")
+        return lines
+
+def clean_data(export_csv=False, chunk_size=None, df=None, save=True, dedup_columns=DEDUP_COLUMNS):
+    """
+    Clean the integrated dataset.
+    With a chunk_size the data is streamed instead of loaded whole (see clean_data_streaming).
+    The integrated data can be passed in as df instead of being read from disk,
+    and with save off the cleaned data is only returned, not written. The
+    cleaning plan and duplicate index are saved either way, since the models
+    trained on the cleaned rows are, and new rows have to be cleaned like them.
+    Rows are duplicates when they agree on dedup_columns (all columns by default).
+
+    The table is copied once: missing values, critical rows and duplicates are
+    all found on the loaded frame, and the rows that stay are taken out in one
+    go to the working copy that the later steps change in place.
+
+    The medians and capping bounds learned here are saved as a CleaningPlan
+    (cleaning_plan.json), which cleans new rows the same way (see cleaning_plan.py).
+    They are learned as CleaningPlan.fit() does, so the saved plan is the one fit() gives.
+    """
+    if chunk_size is not None:
+        if df is not None or not save:
+            raise ValueError("chunk_size streams the data from and to disk, it can't be combined with df or save off")
+        return clean_data_streaming(export_csv, chunk_size, dedup_columns)
+
+    print("Data Cleaning")
+    steps = StepLog()
+    
+    if df is None:
+        df = read_table(PROCESSED_DIR / "integrated_data.parquet")
+
+    #Hold the table in compact dtypes (categoricals, float32, small ints) for this stage
+    memory_before = memory_mb(df)
+    df = compact(df)
+    print(memory_report("cleaning", memory_before, memory_mb(df)))
+    steps.done("load")
+    
+    print(f"Original dataset shape: {df.shape}")
+
+    #Creating a Text file highlighting the process of this Script for future reference after excutation
+    cleaning_log = []
+    cleaning_log.append("Data Cleaning Log")
+    cleaning_log.append(f"\nOriginal dataset shape: {df.shape}")
+    
+    #First, Missing Value handling
+    
+    print("1. Handling Missing Values")
+    cleaning_log.append("\n1. Handling Missing Values")
+    
+    #One isnull() pass gives every missing value count of this step
+    missing = df.isnull().to_numpy()
+    missing_before_cleaning = int(missing.sum())
+    print(f"\nMissing values before cleaning: {missing_before_cleaning}")
+    cleaning_log.append(f"\nMissing values before cleaning: {missing_before_cleaning}")
+
+    # Drop rows with missing critical values, as these are needed for the analysis
+    keep = ~missing[:, [df.columns.get_loc(col) for col in CRITICAL_COLS]].any(axis=1)
+    missing_kept = missing[keep].sum(axis=0)
+
+    rows_dropped = len(df) - int(keep.sum())
+    print(f"Rows removed due to missing critical values: {rows_dropped}")
+    cleaning_log.append(f"Rows removed due to missing critical values: {rows_dropped}")
+    
+    # Fill the remaining missing values with the median for numeric columns. We decided this was the best choice because other critical numeric columns could be distorted due to Spotify adding older songs into their system.
+    numeric_cols = df.select_dtypes(include=[np.number]).columns
+    fill_cols = [col for col in numeric_cols if missing_kept[df.columns.get_loc(col)] > 0]
+
+    #The plan starts with the medians of every numeric column in one call, over the rows that are kept.
+    #Only the columns missing values here are filled, the plan keeps them all for new rows
+    plan = CleaningPlan.fit_medians(df, keep, dedup_columns)
+    medians = plan.medians
+    for col in fill_cols:
+        missing_count = missing_kept[df.columns.get_loc(col)]
+        print(f"  {col}: Filled {missing_count} missing values with median ({medians[col]:.4f})")
+        cleaning_log.append(f"  {col}: Filled {missing_count} missing values with median ({medians[col]:.4f})")
+    #Only the filled columns are new, the rest are shared with df
+    filled = fill_missing(df.copy(deep=False), {col: medians[col] for col in fill_cols})
+
+    missing_after = int(missing_kept.sum()) - sum(missing_kept[df.columns.get_loc(col)] for col in fill_cols)
+    print(f"\nMissing values after cleaning: {missing_after}")
+    cleaning_log.append(f"\nMissing values after cleaning: {missing_after}")
+    steps.done("missing values")
+
+    #Second, We will have the process of handling duplicate songs, Since Songs have many verison we have to keep this in mind not getting rid songs with many verisons.
+    
+    print("2. Handling Duplicates")
+    cleaning_log.append("\n2. Handling Duplicates")
+    
+    #Print number and record number of the duplicate values, found by row fingerprints over the kept rows
+    #The index of the rows that stay is saved with the cleaning plan, for checking later loads against them
+    dedup_index = DedupIndex(dedup_columns)
+    duplicated = dedup_index.duplicated(filled, rows=keep, step="integrated data")
+    duplicates_before = int(duplicated.sum())
+    print(f"\nDuplicate Song Rows before removal: {duplicates_before}")
+    cleaning_log.append(f"\nDuplicate Song Rows before removal: {duplicates_before}")
+    
+    #Take the kept, first-copy rows out in one go, this is the only copy of the table
+    df_clean = filled[keep & ~duplicated]
+    del filled
+
+    #Only first copies are left
+    duplicates_after = 0
+    print(f"Duplicate Song Rows after removal: {duplicates_after}")
+    cleaning_log.append(f"Duplicate Song Rows after removal: {duplicates_after}")
+    key_columns = "all columns" if dedup_columns is None else ", ".join(dedup_columns)
+    print(f"Duplicates by fingerprint over {key_columns}:")
+    cleaning_log.append(f"Duplicates by fingerprint over {key_columns}:")
+    for line in dedup_index.stats_lines():
+        print(f"  {line}")
+        cleaning_log.append(f"  {line}")
+    dedup_index.save(DEDUP_INDEX_PATH)
+    print(f"Duplicate index saved to: {DEDUP_INDEX_PATH}")
+    del dedup_index
+    steps.done("duplicates")
+    
+    # Thrid, we will handle Outliers/extreme cases
+    
+    print("3. Outlier Handling")
+    cleaning_log.append("\n3. Outlier Handling")
+    
+    # For features like tempo and loudness, cap at reasonable percentiles
+    # Will use the 1st and 99th percentile for capping values, so we still get them at a high extreme value range of only 1% of varaible
+    plan.bounds = percentile_bounds(df_clean)
+    df_clean, capped = cap_outliers(df_clean, plan.bounds)
+    for column, (outliers_lower, outliers_upper) in capped.items():
+        if outliers_lower > 0 or outliers_upper > 0:
+            print(f"  {column}: Capped {outliers_lower} Lower and {outliers_upper} Upper outliers")
+            cleaning_log.append(f"  {column}: Capped {outliers_lower} Lower and {outliers_upper} Upper outliers")
+    steps.done("outliers")
+                
+    #Fourth, we will now validate the data ranges making sure they are within variable bound if they are bounded values like percentages
+    
+    print("4. Validating Data Ranges")
+    cleaning_log.append("\n4. Validating Data Ranges")
+    
+    df_clean = clip_bounded(df_clean)
+            
+    print("All Bounded Features Validated to be in [0, 1] range")
+    cleaning_log.append("All Bounded Features Validated to be in [0, 1] range")
+    steps.done("ranges")
+    
+    # Fifth, We will Covert Data Types to make sure all the varaibles are the correct/desired Data type
+    
+    print("5. Converting Data Types")
+    cleaning_log.append("\n5. Converting Data Types")
+    
+    df_clean = convert_types(df_clean)
+
+    print("Data types converted successfully")
+    cleaning_log.append("Data types converted successfully")
+    steps.done("types")
+    
+    # Finally we will Summarize the Information we excuted for the terminal to print and to record for the Cleaning Log
+    
+    print("Cleaning Summary")
+    cleaning_log.append("Cleaning Summary")
+
+    rows_removed = len(df) - len(df_clean)
+    complete = (1 - df_clean.isnull().sum().sum()/(df_clean.shape[0]*df_clean.shape[1]))*100
+    
+    print(f"\nStarting Integrate Dataset shape: {df.shape}")
+    print(f"Cleaned shape: {df_clean.shape}")
+    print(f"Rows removed: {rows_removed} ({rows_removed/len(df)*100:.2f}%)")
+    print(f"Data quality: {complete:.2f}% complete")
+
+    cleaning_log.append(f"\nStarting Integrate Dataset shape: {df.shape}")
+    cleaning_log.append(f"Cleaned shape: {df_clean.shape}")
+    cleaning_log.append(f"Rows removed: {rows_removed} ({rows_removed/len(df)*100:.2f}%)")
+    cleaning_log.append(f"Data quality: {complete:.2f}% complete")
+
+    #Now we will Save the Dataset, to be used in the next Process 5 the analysis and the Cleaning_Log txt file for a reference after excuting program
+    if save:
+        output_path = write_table(df_clean, PROCESSED_DIR / "cleaned_data.parquet", export_csv=export_csv)
+        print(f"\nCleaned data saved to: {output_path}")
+    plan.save(CLEANING_PLAN_PATH)
+    print(f"Cleaning plan (medians, capping bounds) saved to: {CLEANING_PLAN_PATH}")
+    steps.done("save")
+
+    # Time and memory of every step, peak RSS is the highest the process reached up to that step
+    print("\nStep resources:")
+    cleaning_log.append("\nStep resources (time, process RSS after the step, peak RSS so far)")
+    for line in steps.lines():
+        print(f"  {line}")
+        cleaning_log.append(f"  {line}")
+
+    # Save cleaning log
+    cleaning_log_path = Path("data/processed/cleaning_log.txt")
+    with open(cleaning_log_path, 'w') as f:
+        f.write('\n'.join(cleaning_log))
+
+    print(f"Cleaning log saved to: {cleaning_log_path}")
+    return df_clean
+
+def clean_data_streaming(export_csv, chunk_size, dedup_columns=DEDUP_COLUMNS):
+    """
+    Clean the integrated dataset chunk_size rows at a time, in memory that doesn't grow with the table.
+
+    Same steps as clean_data(), in three passes over the data: the first finds the
+    medians for the missing values, the second the duplicates and the 1st/99th
+    percentiles of the capped features, the third cleans and writes each chunk.
+    Medians and percentiles come from quantile sketches (see streaming_stats.py),
+    so they can differ from the exact ones by a fraction of a percent of the rows.
+    Duplicates are found across chunks because the integrated data is sorted by Date.
+    The third pass also writes the duplicate index of the rows that stay, saved
+    with the plan as clean_data() does, without holding those rows.
+    """
+    print("Data Cleaning (streaming)")
+    path = PROCESSED_DIR / "integrated_data.parquet"
+    print(f"Chunks of up to {chunk_size:,} rows, medians and percentiles from quantile sketches "
+          f"(k={DEFAULT_K}, rank error within {rank_error():.2%} of the rows)")
+
+    steps = StepLog()
+    cleaning_log = []
+    cleaning_log.append("Data Cleaning Log")
+
+    def chunks():
+        for chunk in iter_table(path, chunk_size=chunk_size):
+            yield compact(chunk).dropna(subset=CRITICAL_COLS)
+
+    #First pass: sizes, missing values and the medians of the columns that have any
+    rows = 0
+    kept = 0
+    columns = None
+    missing_before_cleaning = 0
+    remaining = StreamingProfile()
+    for chunk in iter_table(path, chunk_size=chunk_size):
+        rows += len(chunk)
+        columns = chunk.columns
+        missing_before_cleaning += chunk.isnull().sum().sum()
+        chunk = compact(chunk).dropna(subset=CRITICAL_COLS)
+        kept += len(chunk)
+        remaining.update(chunk)
+    column_profile = remaining.result()
+    steps.done("pass 1: missing")
+
+    print(f"Original dataset shape: {(rows, len(columns))}")
+    cleaning_log.append(f"\nOriginal dataset shape: {(rows, len(columns))}")
+
+    print("1. Handling Missing Values")
+    cleaning_log.append("\n1. Handling Missing Values")
+    print(f"\nMissing values before cleaning: {missing_before_cleaning}")
+    cleaning_log.append(f"\nMissing values before cleaning: {missing_before_cleaning}")
+    rows_dropped = rows - kept
+    print(f"Rows removed due to missing critical values: {rows_dropped}")
+    cleaning_log.append(f"Rows removed due to missing critical values: {rows_dropped}")
+
+    #The plan keeps the sketch median of every numeric column, for new rows missing any of them
+    plan = CleaningPlan.from_profile(column_profile, remaining.numeric, dedup_columns, fitted_rows=rows)
+    medians = {}
+    for col in remaining.numeric:
+        missing_count = column_profile.loc[col, "nulls"]
+        if missing_count > 0 and col in plan.medians:
+            medians[col] = plan.medians[col]
+            print(f"  {col}: Filled {missing_count} missing values with median ({medians[col]:.4f})")
+            cleaning_log.append(f"  {col}: Filled {missing_count} missing values with median ({medians[col]:.4f})")
+
+    #Second pass: duplicates and the capping percentiles of the deduplicated rows
+    duplicates = DuplicateFilter(dedup_columns)
+    sketches = {column: QuantileSketch() for column in OUTLIER_COLUMNS if column in columns}
+    duplicates_before = 0
+    missing_after = 0
+    for chunk in chunks():
+        chunk = fill_missing(chunk, medians)
+        missing_after += chunk.isnull().sum().sum()
+        duplicated = duplicates.duplicated(chunk)
+        duplicates_before += int(duplicated.sum())
+        for column, sketch in sketches.items():
+            sketch.update(chunk.loc[~duplicated, column].to_numpy(dtype=np.float64, na_value=np.nan))
+    plan.bounds = sketch_bounds(sketches)
+    steps.done("pass 2: duplicates")
+
+    print(f"\nMissing values after cleaning: {missing_after}")
+    cleaning_log.append(f"\nMissing values after cleaning: {missing_after}")
+
+    print("2. Handling Duplicates")
+    cleaning_log.append("\n2. Handling Duplicates")
+    print(f"\nDuplicate Song Rows before removal: {duplicates_before}")
+    cleaning_log.append(f"\nDuplicate Song Rows before removal: {duplicates_before}")
+
+    #Third pass: clean every chunk and write it out, with the duplicate index of the rows that stay
+    duplicates = DuplicateFilter(dedup_columns)
+    capped_total = {column: (0, 0) for column in plan.bounds}
+    cleaned_rows = 0
+    cleaned_missing = 0
+    output_path = PROCESSED_DIR / "cleaned_data.parquet"
+    with TableWriter(output_path, export_csv=export_csv) as writer, \
+            DedupIndexWriter(dedup_columns, DEDUP_INDEX_PATH, chunk_size) as index_writer:
+        for chunk in chunks():
+            chunk = fill_missing(chunk, medians)
+            duplicated = duplicates.duplicated(chunk)
+            index_writer.add(chunk, ~duplicated)
+            chunk = chunk[~duplicated]
+            chunk, capped = cap_outliers(chunk, plan.bounds)
+            for column, (lower, upper) in capped.items():
+                capped_total[column] = (capped_total[column][0] + lower, capped_total[column][1] + upper)
+            chunk = convert_types(clip_bounded(chunk))
+            writer.write(chunk)
+            cleaned_rows += len(chunk)
+            cleaned_missing += chunk.isnull().sum().sum()
+    steps.done("pass 3: clean, save")
+
+    #The filter passed only first copies through
+    duplicates_after = 0
+    print(f"Duplicate Song Rows after removal: {duplicates_after}")
+    cleaning_log.append(f"Duplicate Song Rows after removal: {duplicates_after}")
+
+    print("3. Outlier Handling")
+    cleaning_log.append("\n3. Outlier Handling")
+    for column, (outliers_lower, outliers_upper) in capped_total.items():
+        if outliers_lower > 0 or outliers_upper > 0:
+            print(f"  {column}: Capped {outliers_lower} Lower and {outliers_upper} Upper outliers")
+            cleaning_log.append(f"  {column}: Capped {outliers_lower} Lower and {outliers_upper} Upper outliers")
+
+    print("4. Validating Data Ranges")
+    cleaning_log.append("\n4. Validating Data Ranges")
+    print("All Bounded Features Validated to be in [0, 1] range")
+    cleaning_log.append("All Bounded Features Validated to be in [0, 1] range")
+
+    print("5. Converting Data Types")
+    cleaning_log.append("\n5. Converting Data Types")
+    print("Data types converted successfully")
+    cleaning_log.append("Data types converted successfully")
+
+    print("Cleaning Summary")
+    cleaning_log.append("Cleaning Summary")
+
+    cleaned_shape = (cleaned_rows, len(columns))
+    print(f"\nStarting Integrate Dataset shape: {(rows, len(columns))}")
+    print(f"Cleaned shape: {cleaned_shape}")
+    print(f"Rows removed: {rows - cleaned_rows} ({(rows - cleaned_rows)/rows*100:.2f}%)")
+    print(f"Data quality: {(1 - cleaned_missing/(cleaned_rows*len(columns)))*100:.2f}% complete")
+
+    cleaning_log.append(f"\nStarting Integrate Dataset shape: {(rows, len(columns))}")
+    cleaning_log.append(f"Cleaned shape: {cleaned_shape}")
+    cleaning_log.append(f"Rows removed: {rows - cleaned_rows} ({(rows - cleaned_rows)/rows*100:.2f}%)")
+    cleaning_log.append(f"Data quality: {(1 - cleaned_missing/(cleaned_rows*len(columns)))*100:.2f}% complete")
+
+    print(f"\nCleaned data saved to: {output_path}")
+    print(f"Duplicate index saved to: {DEDUP_INDEX_PATH} ({index_writer.rows:,} rows)")
+    plan.save(CLEANING_PLAN_PATH)
+    print(f"Cleaning plan (medians, capping bounds) saved to: {CLEANING_PLAN_PATH}")
+
+    print("\nStep resources:")
+    cleaning_log.append("\nStep resources (time, process RSS after the step, peak RSS so far)")
+    for line in steps.lines():
+        print(f"  {line}")
+        cleaning_log.append(f"  {line}")
+
+    cleaning_log_path = Path("data/processed/cleaning_log.txt")
+    with open(cleaning_log_path, 'w') as f:
+        f.write('\n'.join(cleaning_log))
+
+    print(f"Cleaning log saved to: {cleaning_log_path}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Clean the integrated dataset")
+    parser.add_argument("--csv", action="store_true", help="also export cleaned_data.csv")
+    parser.add_argument("--chunk-size", type=int, default=None,
+                        help="Stream the data in chunks of this many rows (approximate medians and percentiles, constant memory)")
+    parser.add_argument("--dedup-columns", nargs="+", default=DEDUP_COLUMNS, metavar="COLUMN",
+                        help="count rows as duplicates when they agree on these columns (default: all columns)")
+    args = parser.parse_args()
+    clean_data(export_csv=args.csv, chunk_size=args.chunk_size, dedup_columns=args.dedup_columns)
\ No newline at end of file
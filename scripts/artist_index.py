@@ -0,0 +1,138 @@
+"""
+Hash index from (normalized title, individual artist) to Spotify rows.
+
+Spotify stores the artists of a track as a stringified list ("['A', 'B']")
+and Billboard as one credit string ("A Featuring B"). Joining the two whole
+credits only works when they are written exactly the same way, so the index
+keeps one entry per credited artist (plus one for the whole credit) and a
+Billboard song is resolved by probing its whole credit first, then its primary
+artist, then any featured artists.
+
+The index itself is a pandas Index of "title\\0artist" keys (a hash table, so
+each probe is a constant-time lookup) pointing into one array of Spotify row
+positions, grouped by key like a CSR matrix. Normalized text never contains
+"\\0" (clean_string drops it as punctuation), so keys can't run into each other.
+
+Building the index normalizes every Spotify artist, so it can be saved to a
+Parquet file (one row per key with the list of its row positions) and loaded
+back on later runs instead.
+"""
+
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+KEY_SEPARATOR = "\0"
+
+# Splits a stringified Python list such as "['A', 'B']" or "[\"Guns N' Roses\", 'C']" into its items
+ARTIST_LIST_SEPARATOR = r"""['"]\s*,\s*['"]"""
+
+# Splits a Billboard credit such as "A Featuring B & C" into the artists it names
+CREDIT_SEPARATOR = r"(?i)\s+(?:featuring|feat\.?|ft\.?|with|&)\s+|\s*,\s*"
+
+
+def split_artist_list(values: pd.Series) -> pd.Series:
+    """Raw Spotify artist lists -> one Python list of raw artist names per row (brackets/quotes left for normalization)"""
+    return values.fillna("").astype(str).str.split(ARTIST_LIST_SEPARATOR, regex=True)
+
+
+def split_credit(values: pd.Series) -> pd.Series:
+    """Raw Billboard credits -> [primary artist, featured artists...] per row"""
+    return values.fillna("").astype(str).str.split(CREDIT_SEPARATOR, regex=True)
+
+
+def make_keys(titles, artists) -> pd.Series:
+    """Index keys for normalized titles and artists"""
+    titles = pd.Series(titles).astype(str).reset_index(drop=True)
+    artists = pd.Series(artists).astype(str).reset_index(drop=True)
+    return titles + KEY_SEPARATOR + artists
+
+
+class ArtistIndex:
+    """
+    (normalized title, artist) -> Spotify row positions.
+
+    Build it with ArtistIndex.build(), probe it with lookup() and turn the
+    buckets it returns into row positions with rows(). Row positions are
+    positions (not labels) in the frame the index was built from.
+    """
+
+    def __init__(self, keys: pd.Index, offsets: np.ndarray, row_ids: np.ndarray):
+        self.keys = keys
+        self.offsets = offsets
+        self.row_ids = row_ids
+
+    @classmethod
+    def build(cls, row_ids, titles, artists) -> "ArtistIndex":
+        """
+        Index row_ids[i] under (titles[i], artists[i]) for every i.
+
+        A row credited to several artists is simply passed once per artist.
+        Row positions inside each bucket are kept in ascending order.
+        """
+        row_ids = np.asarray(row_ids, dtype=np.int64)
+        keys = make_keys(titles, artists)
+
+        entries = pd.DataFrame({"key": keys, "row_id": row_ids}).drop_duplicates()
+        codes, uniques = pd.factorize(entries["key"])
+        order = np.lexsort((entries["row_id"].to_numpy(), codes))
+
+        offsets = np.zeros(len(uniques) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(codes, minlength=len(uniques)), out=offsets[1:])
+        return cls(pd.Index(uniques, dtype=object), offsets, entries["row_id"].to_numpy()[order])
+
+    def save(self, path, metadata: dict | None = None):
+        """Write the index to a Parquet file, tagged with the string pairs in `metadata`"""
+        rows = pa.LargeListArray.from_arrays(pa.array(self.offsets), pa.array(self.row_ids, type=pa.int64()))
+        table = pa.table({"key": pa.array(self.keys.to_numpy(), type=pa.large_string()), "rows": rows})
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        pq.write_table(table.replace_schema_metadata({k: str(v) for k, v in (metadata or {}).items()}), path)
+
+    @classmethod
+    def load(cls, path, metadata: dict | None = None) -> "ArtistIndex | None":
+        """Index written by save(), or None if there is no file or it was saved with other `metadata`"""
+        path = Path(path)
+        if not path.exists():
+            return None
+        stored = pq.read_schema(path).metadata or {}
+        if any(stored.get(k.encode()) != str(v).encode() for k, v in (metadata or {}).items()):
+            return None
+
+        table = pq.read_table(path)
+        rows = table.column("rows").combine_chunks()
+        offsets = rows.offsets.to_numpy().astype(np.int64)
+        row_ids = rows.values.to_numpy().astype(np.int64)
+        return cls(pd.Index(table.column("key").to_numpy(), dtype=object), offsets - offsets[0], row_ids[offsets[0]:])
+
+    def __len__(self):
+        return len(self.keys)
+
+    def lookup(self, titles, artists) -> np.ndarray:
+        """Bucket of each (title, artist) probe, -1 where nothing is indexed under it"""
+        return self.keys.get_indexer(make_keys(titles, artists))
+
+    def bucket_sizes(self, buckets: np.ndarray) -> np.ndarray:
+        """Number of rows in each bucket (0 for -1)"""
+        buckets = np.asarray(buckets)
+        sizes = self.offsets[buckets + 1] - self.offsets[buckets]
+        return np.where(buckets >= 0, sizes, 0)
+
+    def rows(self, buckets: np.ndarray):
+        """
+        Expand buckets into (probe position, row position) pairs, one per
+        indexed row, in probe order and then row order.
+        """
+        buckets = np.asarray(buckets)
+        sizes = self.bucket_sizes(buckets)
+        probe = np.repeat(np.arange(len(buckets)), sizes)
+        # Position of each output pair inside its bucket
+        within = np.arange(len(probe)) - np.repeat(np.cumsum(sizes) - sizes, sizes)
+        return probe, self.row_ids[self.offsets[buckets[probe]] + within]
+
+    def find(self, title: str, artist: str) -> np.ndarray:
+        """Row positions indexed under one normalized (title, artist) pair"""
+        _, row_ids = self.rows(self.lookup([title], [artist]))
+        return row_ids
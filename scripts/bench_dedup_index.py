@@ -0,0 +1,93 @@
+"""
+Check and time the fingerprint duplicate index used by 04_data_cleaning.
+
+1. DedupIndex against df.duplicated() on the integrated data, over all columns
+   and over Song, Artist and Date: the same rows have to be marked.
+2. The same with fingerprints cut down to 16 bits, so most rows share a
+   fingerprint with another one: collisions have to be settled exactly.
+3. Incremental loads: the index of all but the latest chart weeks is saved,
+   loaded again and used to dedupe the latest weeks, against rescanning
+   everything with duplicated(). Once for the latest weeks alone, once with
+   rows of earlier weeks sent again, which makes the index read its saved keys.
+
+Run from the project root after 02_data_integration.py:
+    python scripts/bench_dedup_index.py
+"""
+
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from storage import PROCESSED_DIR, read_table
+from schema import compact
+from dedup_index import DedupIndex
+
+SUBSET = ['Song', 'Artist', 'Date']
+
+# Share of chart weeks in the incremental load, and rows of earlier weeks sent again with it
+NEW_WEEKS = 0.05
+RESENT_ROWS = 1000
+
+
+class TruncatedIndex(DedupIndex):
+    """DedupIndex with 16-bit fingerprints, so collisions happen all the time"""
+
+    def fingerprint(self, keys):
+        return super().fingerprint(keys) & np.uint64(0xFFFF)
+
+
+def timed(func):
+    start = time.perf_counter()
+    result = func()
+    return result, time.perf_counter() - start
+
+
+def run_benchmark():
+    df = compact(read_table(PROCESSED_DIR / "integrated_data.parquet"))
+    print("Duplicate Index Benchmark")
+    print(f"Rows: {len(df):,}, columns: {len(df.columns)}\n")
+
+    print(f"{'Columns':<22}{'Index':<12}{'duplicated()':>14}{'index':>10}{'duplicates':>12}{'collisions':>12}")
+    for label, columns in [("all columns", None), ("Song, Artist, Date", SUBSET)]:
+        expected, pandas_time = timed(lambda: df.duplicated(columns).to_numpy())
+        for name, index in [("64-bit", DedupIndex(columns)), ("16-bit", TruncatedIndex(columns))]:
+            found, index_time = timed(lambda: index.duplicated(df))
+            assert (found == expected).all(), f"{name} index differs from duplicated() over {label}"
+            print(f"{label:<22}{name:<12}{pandas_time:>13.3f}s{index_time:>9.3f}s"
+                  f"{int(found.sum()):>12,}{index.stats[-1]['collisions']:>12,}")
+
+    # Incremental loads against the saved index of the earlier weeks (the index time includes loading it)
+    weeks = np.sort(df['Date'].dropna().unique())
+    cutoff = weeks[int(len(weeks) * (1 - NEW_WEEKS))]
+    history = df[df['Date'] < cutoff]
+    latest = df[df['Date'] >= cutoff]
+    resent = history.sample(min(RESENT_ROWS, len(history)), random_state=42)
+    loads = [("latest weeks", latest), ("+ rows sent again", pd.concat([latest, resent], ignore_index=True))]
+    print(f"\nIncremental loads: the latest {len(latest):,} rows, then with {len(resent):,} earlier rows sent again, "
+          f"against {len(history):,} earlier rows")
+
+    print(f"{'Load':<20}{'Columns':<22}{'Index':<10}{'rescan':>10}{'index':>10}{'duplicates':>12}{'collisions':>12}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for label, columns in [("all columns", None), ("Song, Artist, Date", SUBSET)]:
+            for name, cls in [("64-bit", DedupIndex), ("16-bit", TruncatedIndex)]:
+                path = Path(tmp) / f"{name}.parquet"
+                built = cls(columns)
+                built.duplicated(history)
+                built.save(path)
+                for load_name, load in loads:
+                    both = pd.concat([history, load], ignore_index=True)
+                    expected, rescan_time = timed(lambda: both.duplicated(columns).to_numpy()[len(history):])
+                    index, load_time = timed(lambda: cls.load(columns, path))
+                    found, index_time = timed(lambda: index.duplicated(load))
+                    assert (found == expected).all(), f"{name} index differs from a rescan over {label}"
+                    print(f"{load_name:<20}{label:<22}{name:<10}{rescan_time:>9.3f}s{load_time + index_time:>9.3f}s"
+                          f"{int(found.sum()):>12,}{index.stats[-1]['collisions']:>12,}")
+
+    print("\nEvery index marked the same rows as duplicated()")
+
+
+if __name__ == "__main__":
+    run_benchmark()
@@ -0,0 +1,101 @@
+"""
+Check and time the compiled forest of forest_predictor.py.
+
+1. Probabilities: CompiledForest.predict_proba against the forest's
+   predict_proba on cleaned catalog tracks, and predict_track on raw catalog
+   rows against the cleaning plan + predict_proba path of score_catalog.py.
+   Both have to be identical, not just close.
+2. Latency of one track: the scaler and predict_proba on a one-row DataFrame
+   against predict_track on a dict of the track's audio features.
+3. The predictor is loaded and used in a fresh Python without importing
+   scikit-learn or pandas.
+
+Run from the project root after 05_data_analysis.py and export_forest.py:
+    python scripts/bench_forest_predictor.py
+"""
+
+import subprocess
+import sys
+import time
+
+import numpy as np
+
+from storage import RAW_DIR, read_table
+from cleaning_plan import CleaningPlan
+from features import add_features, base_feature_cols
+from model_store import load_artifact
+from forest_predictor import COMPILED_FOREST_PATH, CompiledForest
+
+# Catalog tracks compared, and tracks timed one by one
+SAMPLE_SIZE = 5000
+LATENCY_TRACKS = 200
+
+NO_SKLEARN_CHECK = f"""
+import sys
+sys.path.insert(0, "scripts")
+from forest_predictor import CompiledForest
+forest = CompiledForest.load({str(COMPILED_FOREST_PATH)!r})
+forest.predict_track({{"danceability": 0.7, "energy": 0.8, "loudness": -5.0}})
+print(",".join(name for name in ("sklearn", "pandas") if name in sys.modules))
+"""
+
+
+def per_call(func, items):
+    """Median seconds of func(item) over the items"""
+    times = []
+    for item in items:
+        start = time.perf_counter()
+        func(item)
+        times.append(time.perf_counter() - start)
+    return float(np.median(times))
+
+
+def run_benchmark():
+    artifact = load_artifact("Random Forest")
+    model, scaler, feature_cols = artifact["model"], artifact["scaler"], artifact["feature_cols"]
+    # One thread, so the trees are added up in order as the compiled forest does
+    model.set_params(n_jobs=1)
+    forest = CompiledForest.load()
+    plan = CleaningPlan.load()
+    print("Compiled Forest Benchmark")
+    print(f"{len(forest.roots)} trees, {len(forest.feature):,} nodes, depth {forest.depth}\n")
+
+    catalog = read_table(RAW_DIR / "spotify_songs.parquet", columns=["id"] + base_feature_cols)
+    catalog = catalog.sample(min(SAMPLE_SIZE, len(catalog)), random_state=42).reset_index(drop=True)
+    cleaned = add_features(plan.transform(catalog))
+    X = cleaned[feature_cols]
+
+    expected = model.predict_proba(scaler.transform(X))[:, 1]
+    compiled = forest.predict_proba(X.to_numpy(dtype=np.float64))
+    assert np.array_equal(compiled, expected), "predict_proba of the compiled forest differs from the forest"
+    print(f"predict_proba: {len(X):,} cleaned tracks, identical to the forest")
+
+    tracks = catalog[base_feature_cols].to_dict("records")
+    by_track = np.array([forest.predict_track(track) for track in tracks])
+    pipeline = np.full(len(catalog), np.nan)
+    pipeline[cleaned.index.to_numpy()] = expected
+    assert np.array_equal(by_track, pipeline, equal_nan=True), "predict_track differs from cleaning + predict_proba"
+    print(f"predict_track: {len(tracks):,} raw tracks, identical to cleaning plan + predict_proba "
+          f"({int(np.isnan(by_track).sum())} missing a critical feature)")
+
+    # Latency of one track at a time
+    rows = [X.iloc[[i]] for i in range(min(LATENCY_TRACKS, len(X)))]
+    sklearn_seconds = per_call(lambda row: model.predict_proba(scaler.transform(row))[:, 1], rows)
+    compiled_seconds = per_call(forest.predict_track, tracks[:LATENCY_TRACKS])
+    batch_start = time.perf_counter()
+    forest.predict_proba(X.to_numpy(dtype=np.float64))
+    batch_seconds = time.perf_counter() - batch_start
+
+    print(f"\n{'One track':<36}{'median latency':>16}")
+    print(f"{'scaler + predict_proba (sklearn)':<36}{sklearn_seconds * 1e6:>14,.0f}us")
+    print(f"{'predict_track (compiled)':<36}{compiled_seconds * 1e6:>14,.0f}us")
+    print(f"Speedup: {sklearn_seconds / compiled_seconds:.0f}x; "
+          f"compiled batch of {len(X):,}: {len(X) / batch_seconds:,.0f} tracks/s")
+
+    imported = subprocess.run([sys.executable, "-c", NO_SKLEARN_CHECK], capture_output=True, text=True, check=True)
+    assert imported.stdout.strip() == "", f"the predictor imported {imported.stdout.strip()}"
+    print("\nThe predictor loads and scores without importing scikit-learn or pandas")
+
+
+if __name__ == "__main__":
+    run_benchmark()
@@ -0,0 +1,73 @@
+"""
+Benchmark for the fuzzy matching mode of 02_data_integration.
+
+Builds the same match keys integrate_data() does, then compares the exact
+match_key merge with exact + fuzzy matching at a few thresholds. For each one
+it prints how many distinct chart songs and chart rows found a Spotify track,
+the gain over exact matching and the time it took.
+
+Run from the project root after 01_data_retrieval.py:
+    python scripts/bench_fuzzy_matching.py
+"""
+
+import time
+
+from storage import RAW_DIR, read_table
+from normalization import NormalizationCache
+from fuzzy_matching import DEFAULT_THRESHOLD, fuzzy_match
+
+THRESHOLDS = [0.95, 0.9, DEFAULT_THRESHOLD, 0.8]
+
+
+def build_keys():
+    """Billboard and Spotify keys built the same way as in integrate_data()"""
+    billboard_df = read_table(RAW_DIR / "billboard_hot_100.parquet", columns=["song", "artist"])
+    spotify_df = read_table(RAW_DIR / "spotify_songs.parquet", columns=["name", "artists"])
+
+    cache = NormalizationCache()
+    billboard_df["song"] = cache.normalize(billboard_df["song"])
+    billboard_df["artist"] = cache.normalize(billboard_df["artist"])
+    billboard_df["match_key"] = billboard_df["song"] + "_" + billboard_df["artist"]
+
+    spotify_df["song"] = cache.normalize(spotify_df["name"])
+    spotify_df["artist"] = cache.normalize(spotify_df["artists"], na_value="nan")
+    spotify_df["match_key"] = spotify_df["song"] + "_" + spotify_df["artist"]
+
+    return billboard_df, spotify_df[["song", "artist", "match_key"]].drop_duplicates("match_key")
+
+
+def run_benchmark():
+    billboard_df, spotify_keys = build_keys()
+
+    print("Fuzzy Matching Benchmark")
+    print(f"Billboard rows: {len(billboard_df):,} ({billboard_df['match_key'].nunique():,} distinct songs)")
+    print(f"Spotify keys: {len(spotify_keys):,}")
+
+    start = time.perf_counter()
+    exact = billboard_df["match_key"].isin(spotify_keys["match_key"])
+    exact_time = time.perf_counter() - start
+
+    total_songs = billboard_df["match_key"].nunique()
+    exact_songs = billboard_df.loc[exact, "match_key"].nunique()
+    exact_rows = int(exact.sum())
+
+    billboard_keys = billboard_df.loc[~exact].drop_duplicates("match_key")
+
+    print(f"\n{'Mode':<16}{'Songs':>10}{'Song rate':>11}{'Rows':>11}{'Row rate':>10}{'Gain':>9}{'Time (s)':>10}")
+    print(f"{'exact':<16}{exact_songs:>10,}{exact_songs / total_songs:>11.2%}"
+          f"{exact_rows:>11,}{exact_rows / len(billboard_df):>10.2%}{'':>9}{exact_time:>10.3f}")
+
+    for threshold in THRESHOLDS:
+        start = time.perf_counter()
+        fuzzy_df = fuzzy_match(billboard_keys, spotify_keys, threshold=threshold)
+        fuzzy_time = time.perf_counter() - start
+
+        songs = exact_songs + len(fuzzy_df)
+        rows = exact_rows + int(billboard_df["match_key"].isin(fuzzy_df["match_key"]).sum())
+        gain = (rows - exact_rows) / len(billboard_df)
+        print(f"{f'fuzzy >= {threshold}':<16}{songs:>10,}{songs / total_songs:>11.2%}"
+              f"{rows:>11,}{rows / len(billboard_df):>10.2%}{gain:>+9.2%}{exact_time + fuzzy_time:>10.3f}")
+
+
+if __name__ == "__main__":
+    run_benchmark()
@@ -0,0 +1,61 @@
+"""
+Benchmark for multi-process integration in 02_data_integration.
+
+Runs integrate_data() with 1, 2, 4 and 8 workers (or the counts given on the
+command line), checks every run writes the same integrated data as the
+single-process run and prints the scaling curve: time, chart rows per second
+and speedup over one worker.
+
+Run from the project root after 01_data_retrieval.py:
+    python scripts/bench_integration_workers.py
+    python scripts/bench_integration_workers.py 1 2 3 4
+"""
+
+import contextlib
+import importlib
+import io
+import os
+import sys
+import time
+
+import pandas as pd
+
+from storage import PROCESSED_DIR, RAW_DIR, read_table
+
+integration = importlib.import_module("02_data_integration")
+
+WORKER_COUNTS = [1, 2, 4, 8]
+
+
+def run_benchmark(worker_counts):
+    chart_rows = len(read_table(RAW_DIR / "billboard_hot_100.parquet", columns=["rank"]))
+
+    print("Integration Worker Benchmark")
+    print(f"Chart rows: {chart_rows:,}, CPU cores: {os.cpu_count()}")
+    print(f"\n{'Workers':>8}{'Time (s)':>10}{'Rows/s':>12}{'Speedup':>9}")
+
+    expected = None
+    base_time = None
+    for workers in worker_counts:
+        start = time.perf_counter()
+        # integrate_data() prints its own report, keep the table readable
+        with contextlib.redirect_stdout(io.StringIO()):
+            integration.integrate_data(workers=workers)
+        elapsed = time.perf_counter() - start
+
+        #Every worker count has to give exactly the same table
+        result = read_table(PROCESSED_DIR / "integrated_data.parquet")
+        if expected is None:
+            expected = result
+            base_time = elapsed
+        else:
+            pd.testing.assert_frame_equal(result, expected)
+
+        print(f"{workers:>8}{elapsed:>10.2f}{chart_rows / elapsed:>12,.0f}{base_time / elapsed:>8.2f}x")
+
+    print("\nAll worker counts wrote identical integrated data")
+
+
+if __name__ == "__main__":
+    counts = [int(a) for a in sys.argv[1:]] or WORKER_COUNTS
+    run_benchmark(counts)
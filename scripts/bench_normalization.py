@@ -0,0 +1,79 @@
+"""
+Benchmark for the match-key normalization in 02_data_integration.
+
+Builds the four key columns (Billboard song/artist, Spotify name/artists) with
+the original per-value clean_string() loop and with the vectorized
+normalize_text()/normalize_artists(), checks the keys are byte-identical and
+prints the time each one took, then times the NormalizationCache path that
+only normalizes each distinct string once.
+
+Run from the project root after 01_data_retrieval.py:
+    python scripts/bench_normalization.py
+"""
+
+import time
+
+from storage import RAW_DIR, read_table
+from normalization import NormalizationCache, clean_string, normalize_text, normalize_artists
+
+
+def original_artists(values):
+    """The pre-vectorization loop over Spotify's artist lists"""
+    artists_clean = []
+    for artist in values:
+        raw = str(artist)
+        raw = raw.replace("[", "").replace("]", "").replace("'", "")
+        artists_clean.append(clean_string(raw))
+    return artists_clean
+
+
+def run_benchmark():
+    billboard_df = read_table(RAW_DIR / "billboard_hot_100.parquet", columns=["song", "artist"])
+    spotify_df = read_table(RAW_DIR / "spotify_songs.parquet", columns=["name", "artists"])
+
+    columns = [
+        ("Billboard song", billboard_df["song"], lambda s: list(s.apply(clean_string)), normalize_text),
+        ("Billboard artist", billboard_df["artist"], lambda s: list(s.apply(clean_string)), normalize_text),
+        ("Spotify name", spotify_df["name"], lambda s: list(s.apply(clean_string)), normalize_text),
+        ("Spotify artists", spotify_df["artists"], original_artists, normalize_artists),
+    ]
+
+    print("Normalization Benchmark")
+    print(f"\n{'Column':<18}{'Rows':>10}{'Original (s)':>15}{'Vectorized (s)':>17}{'Speedup':>10}")
+
+    total_original = 0.0
+    total_vectorized = 0.0
+    for name, values, original, vectorized in columns:
+        start = time.perf_counter()
+        expected = original(values)
+        original_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        result = vectorized(values)
+        vectorized_time = time.perf_counter() - start
+
+        #The keys have to be exactly the same, otherwise the merge would change
+        mismatches = sum(a != b for a, b in zip(expected, result))
+        if mismatches or len(expected) != len(result):
+            raise AssertionError(f"{name}: {mismatches} keys differ from clean_string()")
+
+        total_original += original_time
+        total_vectorized += vectorized_time
+        print(f"{name:<18}{len(values):>10,}{original_time:>15.3f}{vectorized_time:>17.3f}{original_time / vectorized_time:>9.1f}x")
+
+    print(f"{'Total':<18}{'':>10}{total_original:>15.3f}{total_vectorized:>17.3f}{total_original / total_vectorized:>9.1f}x")
+    print("\nAll keys identical to clean_string()")
+
+    #Normalizing once per distinct string, first with an empty cache and then with a warm one
+    cache = NormalizationCache()
+    for label in ["empty cache", "warm cache"]:
+        start = time.perf_counter()
+        for name, values, _, vectorized in columns:
+            na_value = "nan" if vectorized is normalize_artists else ""
+            cache.normalize(values, na_value=na_value)
+        elapsed = time.perf_counter() - start
+        print(f"Distinct-value normalization ({label}): {elapsed:.3f}s ({total_original / elapsed:.1f}x), {len(cache):,} strings cached")
+
+
+if __name__ == "__main__":
+    run_benchmark()
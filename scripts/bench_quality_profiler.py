@@ -0,0 +1,102 @@
+"""
+Benchmark for the single-pass profiler used by 03_data_quality.
+
+Times the statistics assess_quality() used to compute with separate pandas
+passes (isnull() three times, one comparison per range check, describe() and
+two quantile() calls per column) against profiler.profile() on the full
+integrated dataset, and checks both give the same numbers.
+
+Run from the project root after 02_data_integration.py:
+    python scripts/bench_quality_profiler.py
+    python scripts/bench_quality_profiler.py 5    # best of 5 runs
+"""
+
+import importlib
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+from storage import PROCESSED_DIR, read_table
+from schema import compact
+from profiler import DESCRIBE_STATS, profile
+from validation import RULES_PATH, load_rules, rule_ranges
+
+quality = importlib.import_module("03_data_quality")
+
+REPEATS = 3
+
+# The range checks the quality report used to hard-code, now declared in validation_rules.yaml
+RANGE_COLUMNS = ['acousticness', 'danceability', 'energy', 'valence', 'Rank', 'Peak Position']
+VALID_RANGES = {col: bounds for col, bounds in rule_ranges(load_rules(RULES_PATH)).items() if col in RANGE_COLUMNS}
+
+
+def pandas_profile(df):
+    """The statistics of the quality report, computed the way assess_quality() used to"""
+    missing_data = df.isnull().sum()
+    missing_pct = (df.isnull().sum() / len(df) * 100).round(2)
+
+    issues = [col for col, (low, high) in VALID_RANGES.items() if ((df[col] < low) | (df[col] > high)).any()]
+
+    stats = df[quality.NUMERIC_COLS].describe()
+
+    outliers = {}
+    for col in quality.NUMERIC_COLS:
+        Q1 = df[col].quantile(0.25)
+        Q3 = df[col].quantile(0.75)
+        IQR = Q3 - Q1
+        outliers[col] = ((df[col] < Q1 - 1.5 * IQR) | (df[col] > Q3 + 1.5 * IQR)).sum()
+
+    missing_cells = df.isnull().sum().sum()
+    return missing_data, missing_pct, issues, stats, outliers, missing_cells
+
+
+def fused_profile(df):
+    """The same statistics from one profile() call"""
+    column_profile = profile(df, ranges=VALID_RANGES)
+    missing_data = column_profile["nulls"]
+    missing_pct = (missing_data / len(df) * 100).round(2)
+    issues = [col for col in VALID_RANGES if column_profile.loc[col, "range_violations"] > 0]
+    stats = column_profile.loc[quality.NUMERIC_COLS, DESCRIBE_STATS].T
+    outliers = {col: column_profile.loc[col, "outliers"] for col in quality.NUMERIC_COLS}
+    return missing_data, missing_pct, issues, stats, outliers, missing_data.sum()
+
+
+def best_time(func, df, repeats):
+    times = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        result = func(df)
+        times.append(time.perf_counter() - start)
+    return min(times), result
+
+
+def run_benchmark(repeats):
+    df = compact(read_table(PROCESSED_DIR / "integrated_data.parquet"))
+    numeric = sum(pd.api.types.is_numeric_dtype(df[c]) for c in df.columns)
+
+    print("Quality Profiler Benchmark")
+    print(f"Rows: {len(df):,}, columns: {len(df.columns)} ({numeric} numeric), best of {repeats}")
+
+    pandas_time, expected = best_time(pandas_profile, df, repeats)
+    fused_time, result = best_time(fused_profile, df, repeats)
+
+    #Both have to produce exactly the same report numbers
+    missing_data, missing_pct, issues, stats, outliers, missing_cells = result
+    pd.testing.assert_series_equal(missing_data, expected[0], check_names=False)
+    pd.testing.assert_series_equal(missing_pct, expected[1], check_names=False)
+    assert issues == expected[2]
+    assert stats.to_string() == expected[3].to_string()
+    assert np.array_equal(stats.to_numpy(), expected[3].to_numpy(), equal_nan=True)
+    assert outliers == expected[4]
+    assert missing_cells == expected[5]
+
+    print(f"\n{'Method':<28}{'Time (s)':>10}{'Rows/s':>14}")
+    print(f"{'pandas passes (previous)':<28}{pandas_time:>10.3f}{len(df) / pandas_time:>14,.0f}")
+    print(f"{'single-pass profile()':<28}{fused_time:>10.3f}{len(df) / fused_time:>14,.0f}")
+    print(f"\nSpeedup: {pandas_time / fused_time:.2f}x, identical report statistics")
+
+
+if __name__ == "__main__":
+    run_benchmark(int(sys.argv[1]) if len(sys.argv) > 1 else REPEATS)
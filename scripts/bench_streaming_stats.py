@@ -0,0 +1,87 @@
+"""
+Accuracy check for the streaming statistics used by the --chunk-size modes of
+03_data_quality and 04_data_cleaning.
+
+Streams the integrated dataset through StreamingProfile and per-column
+quantile sketches, then compares them with the exact in-memory values: the
+moments and null counts should match up to float rounding, and every sketch
+quantile should be within the rank error bound of streaming_stats.py.
+
+Run from the project root after 02_data_integration.py:
+    python scripts/bench_streaming_stats.py
+    python scripts/bench_streaming_stats.py 20000    # chunk size
+"""
+
+import sys
+import time
+
+import numpy as np
+
+from storage import PROCESSED_DIR, iter_table, read_table
+from schema import compact
+from profiler import profile
+from streaming_stats import DEFAULT_K, QuantileSketch, StreamingProfile, rank_error
+
+CHUNK_SIZE = 50_000
+
+# Quartiles for the quality report, 1st/99th percentiles for the cleaning caps, plus the tails in between
+PROBES = [0.01, 0.05, 0.25, 0.5, 0.75, 0.95, 0.99]
+
+
+def observed_rank_error(values: np.ndarray, estimate: float, q: float) -> float:
+    """How far (as a fraction of the rows) the rank of `estimate` is from q: 0 if any of its ranks is q * (n - 1)"""
+    ordered = np.sort(values[~np.isnan(values)])
+    n = len(ordered)
+    low = np.searchsorted(ordered, estimate, side="left")
+    high = np.searchsorted(ordered, estimate, side="right") - 1
+    target = q * (n - 1)
+    return max(0.0, low - target, target - high) / n
+
+
+def run_benchmark(chunk_size):
+    path = PROCESSED_DIR / "integrated_data.parquet"
+
+    start = time.perf_counter()
+    stream = StreamingProfile()
+    sketches = {}
+    rows = 0
+    for chunk in iter_table(path, chunk_size=chunk_size):
+        chunk = compact(chunk)
+        stream.update(chunk)
+        for col in stream.numeric:
+            sketches.setdefault(col, QuantileSketch()).update(chunk[col].to_numpy(dtype=np.float64, na_value=np.nan))
+        rows += len(chunk)
+    stream_time = time.perf_counter() - start
+    streamed = stream.result()
+
+    df = compact(read_table(path))
+    exact = profile(df)
+
+    print("Streaming Statistics Accuracy")
+    print(f"Rows: {rows:,}, chunks of {chunk_size:,}, {len(stream.numeric)} numeric columns, streamed in {stream_time:.2f}s")
+    print(f"Sketch k={DEFAULT_K}: at most {max(len(s) for s in sketches.values()):,} values kept per column, "
+          f"rank error bound {rank_error():.2%}")
+
+    assert (streamed["nulls"] == exact["nulls"]).all()
+    moments = ["count", "mean", "std", "min", "max"]
+    moment_error = (
+        (streamed.loc[stream.numeric, moments] - exact.loc[stream.numeric, moments]).abs()
+        / exact.loc[stream.numeric, moments].abs().clip(lower=1e-12)
+    ).max().max()
+    print(f"Null counts identical, largest relative error in count/mean/std/min/max: {moment_error:.1e}")
+
+    print(f"\n{'Column':<20}" + "".join(f"{f'q={q}':>10}" for q in PROBES))
+    worst = 0.0
+    for col in stream.numeric:
+        values = df[col].to_numpy(dtype=np.float64, na_value=np.nan)
+        estimates = sketches[col].quantile(PROBES)
+        errors = [observed_rank_error(values, e, q) for e, q in zip(estimates, PROBES)]
+        worst = max(worst, *errors)
+        print(f"{col:<20}" + "".join(f"{e:>10.3%}" for e in errors))
+
+    print(f"\nLargest rank error: {worst:.3%} of the rows (bound {rank_error():.2%})")
+    assert worst <= rank_error(), "quantile sketch outside its error bound"
+
+
+if __name__ == "__main__":
+    run_benchmark(int(sys.argv[1]) if len(sys.argv) > 1 else CHUNK_SIZE)
@@ -0,0 +1,259 @@
+"""
+The cleaning of 04_data_cleaning as a plan: fitted once, applied to any rows.
+
+Cleaning learns a few numbers from the integrated data: the median of every
+numeric column (to fill missing values) and the 1st/99th percentiles of tempo,
+loudness and duration_ms (to cap outliers). CleaningPlan keeps them. fit()
+learns them the way clean_data() does, transform() applies them to a batch of
+rows, each row on its own, so new rows (new chart weeks, new Spotify releases)
+are cleaned without the data the plan was fitted on. clean_data() saves its
+plan as cleaning_plan.json.
+
+transform() only uses the columns a batch has, so rows of the Spotify catalog,
+which have no chart columns, get their audio features filled, capped and
+clipped. With a DedupIndex it also drops rows already cleaned before.
+
+Apply the saved plan to new rows from the project root:
+    python scripts/cleaning_plan.py new_rows.parquet new_rows_clean.parquet
+    python scripts/cleaning_plan.py new_rows.csv new_rows_clean.parquet --chunk-size 50000 --dedup
+"""
+
+import argparse
+import json
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from storage import PROCESSED_DIR, TableWriter, iter_table
+from schema import BOUNDED_FEATURES, compact
+from dedup_index import DEDUP_INDEX_PATH, DedupIndex
+
+CLEANING_PLAN_PATH = PROCESSED_DIR / "cleaning_plan.json"
+
+# Bump when the plan's fields change so old plans aren't applied
+CLEANING_PLAN_VERSION = 1
+
+# Rows missing any of these are dropped, as these are needed for the analysis
+CRITICAL_COLS = ['Song', 'Artist', 'Rank', 'danceability', 'energy', 'loudness']
+
+# Features capped at their 1st and 99th percentiles
+OUTLIER_COLUMNS = ['tempo', 'loudness', 'duration_ms']
+CAP_QUANTILES = [0.01, 0.99]
+
+def fill_missing(df, medians):
+    """Fill the missing values of each column in medians with its median"""
+    for col, median_val in medians.items():
+        df[col] = df[col].fillna(median_val)
+    return df
+
+def cap_outliers(df, bounds):
+    """Clip each column in bounds to its (lower, upper) percentiles, returns the number of values capped below and above"""
+    capped = {}
+    for column, (lower_bound, upper_bound) in bounds.items():
+        outliers_lower = (df[column] < lower_bound).sum()
+        outliers_upper = (df[column] > upper_bound).sum()
+        if outliers_lower > 0 or outliers_upper > 0:
+            df[column] = df[column].clip(lower=lower_bound, upper=upper_bound)
+        capped[column] = (outliers_lower, outliers_upper)
+    return df, capped
+
+def clip_bounded(df):
+    """Ensuring the bounded values are between domain of [0,1]"""
+    for column in BOUNDED_FEATURES:
+        if column in df.columns:
+            df[column] = df[column].clip(lower=0, upper=1)
+    return df
+
+def convert_types(df):
+    """
+    Handle non-numeric values like '-' which is present in the Last Week and Weeks in Charts varaibles,
+    then make sure integer values are also correct using .astype(int)
+    """
+    for column in ['Last Week', 'Weeks in Charts']:
+        if column in df.columns:
+            df[column] = pd.to_numeric(df[column], errors='coerce')
+            df[column] = df[column].fillna(0).astype(int)
+
+    int_cols = ['Rank', 'Peak Position', 'year', 'mode', 'key', 'explicit']
+    for col in int_cols:
+        if col in df.columns:
+            df[col] = df[col].astype(int)
+
+    # astype(int) gives int64, bring the integer columns back down to their compact types
+    return compact(df)
+
+def column_medians(df, columns, rows):
+    """Median of each column over `rows` (a boolean mask), missing values skipped. Columns without a value there are left out"""
+    medians = df.loc[rows, list(columns)].median()
+    return {col: float(value) for col, value in medians.dropna().items()}
+
+def percentile_bounds(df):
+    """(lower, upper) capping percentiles of the outlier columns df has, all in one quantile() call"""
+    columns = [column for column in OUTLIER_COLUMNS if column in df.columns]
+    percentiles = df[columns].quantile(CAP_QUANTILES)
+    return {column: tuple(float(value) for value in percentiles[column]) for column in columns}
+
+def sketch_bounds(sketches):
+    """percentile_bounds() from a QuantileSketch per outlier column"""
+    return {column: tuple(float(value) for value in sketch.quantile(CAP_QUANTILES)) for column, sketch in sketches.items()}
+
+
+class CleaningPlan:
+    """
+    What cleaning learned from the data it was fitted on: the fill median of
+    every numeric column, the capping bounds of the outlier columns, and the
+    columns that decide which rows are duplicates (None for all).
+    """
+
+    def __init__(self, medians=None, bounds=None, dedup_columns=None, fitted_rows=0):
+        self.medians = dict(medians or {})
+        self.bounds = dict(bounds or {})
+        self.dedup_columns = dedup_columns
+        self.fitted_rows = fitted_rows
+        # Counts of everything transform() did, summed over the batches
+        self.counts = {"rows": 0, "dropped": 0, "filled": 0, "duplicates": 0, "capped": 0, "kept": 0}
+
+    @classmethod
+    def fit(cls, df, dedup_columns=None):
+        """
+        Learn the plan from a table: the medians of the rows with every critical
+        value, and the capping percentiles of those rows once filled and deduplicated
+        """
+        df = compact(df)
+        keep = critical_rows(df)
+        plan = cls.fit_medians(df, keep, dedup_columns)
+
+        filled = plan.fill(df.copy(deep=False))
+        duplicated = DedupIndex(dedup_columns).duplicated(filled, rows=keep, add=False)
+        plan.bounds = percentile_bounds(filled[keep & ~duplicated])
+        return plan
+
+    @classmethod
+    def fit_medians(cls, df, keep, dedup_columns=None):
+        """
+        The first half of fit(), shared with clean_data(): a plan holding the
+        medians of the numeric columns of a compacted table over the `keep` rows.
+        Its bounds are set once those rows are filled and deduplicated
+        """
+        medians = column_medians(df, df.select_dtypes(include=[np.number]).columns, keep)
+        return cls(medians, dedup_columns=dedup_columns, fitted_rows=len(df))
+
+    @classmethod
+    def from_profile(cls, profile, numeric_cols, dedup_columns=None, fitted_rows=0):
+        """
+        The plan of a table cleaned as a stream: the sketch medians of a
+        StreamingProfile result (columns without a value are left out). Its
+        bounds come from sketch_bounds() once the rows are filled and deduplicated
+        """
+        medians = {col: float(profile.loc[col, "50%"]) for col in numeric_cols if pd.notna(profile.loc[col, "50%"])}
+        return cls(medians, dedup_columns=dedup_columns, fitted_rows=fitted_rows)
+
+    def fill(self, df):
+        """Fill the missing values of the plan's columns that df has"""
+        medians = {col: value for col, value in self.medians.items() if col in df.columns and df[col].hasnans}
+        return fill_missing(df, medians)
+
+    def transform(self, df, dedup_index=None, step="batch"):
+        """
+        Clean a batch of rows with the fitted values: drop the rows missing a
+        critical value, fill, drop duplicates (of earlier rows too, with a
+        DedupIndex), cap, clip and convert types. Nothing is learned from the batch
+        """
+        rows = len(df)
+        df = compact(df)
+        keep = critical_rows(df)
+        filled_before = int(df[[col for col in self.medians if col in df.columns]].isna().to_numpy()[keep].sum())
+        df = self.fill(df)
+        duplicated = np.zeros(len(df), dtype=bool)
+        if dedup_index is not None:
+            duplicated = dedup_index.duplicated(df, rows=keep, step=step)
+        df = df[keep & ~duplicated]
+        df, capped = cap_outliers(df, {col: bounds for col, bounds in self.bounds.items() if col in df.columns})
+        df = convert_types(clip_bounded(df))
+
+        self.counts["rows"] += rows
+        self.counts["dropped"] += rows - int(keep.sum())
+        self.counts["filled"] += filled_before
+        self.counts["duplicates"] += int(duplicated.sum())
+        self.counts["capped"] += int(sum(lower + upper for lower, upper in capped.values()))
+        self.counts["kept"] += len(df)
+        return df
+
+    def to_dict(self):
+        return {
+            "version": CLEANING_PLAN_VERSION,
+            "fitted_rows": self.fitted_rows,
+            "critical_columns": CRITICAL_COLS,
+            "cap_quantiles": CAP_QUANTILES,
+            "dedup_columns": self.dedup_columns,
+            "medians": self.medians,
+            "bounds": {col: list(bounds) for col, bounds in self.bounds.items()},
+        }
+
+    def save(self, path: Path = CLEANING_PLAN_PATH):
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        Path(path).write_text(json.dumps(self.to_dict(), indent=2))
+
+    @classmethod
+    def load(cls, path: Path = CLEANING_PLAN_PATH):
+        """The saved plan, an error if there is none or it was saved by another version"""
+        path = Path(path)
+        if not path.exists():
+            raise FileNotFoundError(f"No cleaning plan at {path}, run 04_data_cleaning.py first")
+        saved = json.loads(path.read_text())
+        if saved.get("version") != CLEANING_PLAN_VERSION:
+            raise ValueError(f"{path} was saved by another version of the cleaning plan, run 04_data_cleaning.py again")
+        return cls(
+            saved["medians"], {col: tuple(bounds) for col, bounds in saved["bounds"].items()},
+            saved["dedup_columns"], saved["fitted_rows"],
+        )
+
+
+def critical_rows(df):
+    """Boolean array, True for the rows that have every critical column df has"""
+    critical = [col for col in CRITICAL_COLS if col in df.columns]
+    return ~df[critical].isna().to_numpy().any(axis=1)
+
+
+def apply_plan(input_path, output_path, chunk_size=100_000, dedup=False, export_csv=False):
+    """
+    Clean a table of new rows chunk by chunk with the saved plan and write it to output_path.
+    With dedup on, rows already in the saved duplicate index are dropped and the new ones added to it
+    """
+    plan = CleaningPlan.load()
+    dedup_index = DedupIndex.load(plan.dedup_columns) if dedup else None
+    print(f"Cleaning {input_path} with the plan fitted on {plan.fitted_rows:,} rows ({CLEANING_PLAN_PATH})")
+
+    start = time.perf_counter()
+    with TableWriter(output_path, export_csv=export_csv) as writer:
+        for i, chunk in enumerate(iter_table(input_path, chunk_size=chunk_size)):
+            cleaned = plan.transform(chunk, dedup_index, step=f"chunk {i + 1}")
+            if len(cleaned):
+                writer.write(cleaned)
+    seconds = time.perf_counter() - start
+
+    counts = plan.counts
+    print(f"Rows: {counts['rows']:,} read, {counts['dropped']:,} missing a critical value, "
+          f"{counts['duplicates']:,} duplicates, {counts['kept']:,} written to {output_path}")
+    print(f"Values: {counts['filled']:,} filled with medians, {counts['capped']:,} capped")
+    print(f"Cleaned in {seconds:.2f}s ({counts['rows'] / max(seconds, 1e-9):,.0f} rows/s)")
+    if dedup_index is not None:
+        for line in dedup_index.stats_lines():
+            print(f"  {line}")
+        dedup_index.save(DEDUP_INDEX_PATH)
+        print(f"Duplicate index updated: {DEDUP_INDEX_PATH}")
+    return plan
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Clean new rows with the plan saved by 04_data_cleaning.py")
+    parser.add_argument("input", help="table of new rows (Parquet or CSV)")
+    parser.add_argument("output", help="where to write the cleaned rows (Parquet)")
+    parser.add_argument("--chunk-size", type=int, default=100_000, help="rows cleaned at a time (default 100000)")
+    parser.add_argument("--dedup", action="store_true",
+                        help="drop rows already in the saved duplicate index, and add the new ones to it")
+    parser.add_argument("--csv", action="store_true", help="also write the output as CSV")
+    args = parser.parse_args()
+    apply_plan(args.input, args.output, chunk_size=args.chunk_size, dedup=args.dedup, export_csv=args.csv)
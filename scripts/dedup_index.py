@@ -0,0 +1,297 @@
+"""
+Duplicate rows found by 64-bit row fingerprints, kept between runs.
+
+DedupIndex hashes every row once over a set of key columns (all columns by
+default, or a subset such as Song, Artist and Date) into a 64-bit fingerprint.
+Rows with a new fingerprint are new rows. Rows whose fingerprint was seen
+before are only duplicates if their key values are equal too, so a hash
+collision never drops a row (collisions are counted in the stats).
+
+The fingerprints and key values of the rows indexed so far can be saved to
+dedup_index.parquet (or written chunk by chunk with DedupIndexWriter, for a
+table cleaned as a stream). A later load of new rows is then checked against that
+history without reading the tables it came from again: only the fingerprints
+are looked up, and the saved key values are read when a fingerprint matches.
+
+Values are hashed in one representation per kind of value (numbers as
+float64, dates in nanoseconds, text by content), so the same row gets the same
+fingerprint whatever dtypes compact() gave the table it is in.
+"""
+
+import json
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from storage import PROCESSED_DIR, merge_sorted_runs, plain_types
+
+DEDUP_INDEX_PATH = PROCESSED_DIR / "dedup_index.parquet"
+
+# Bump when the fingerprints change so old indexes are ignored
+DEDUP_INDEX_VERSION = 1
+
+
+def index_metadata(columns: list) -> dict:
+    """Schema metadata of a saved index, checked by DedupIndex.load()"""
+    return {"version": str(DEDUP_INDEX_VERSION), "columns": json.dumps(columns)}
+
+
+def fingerprint(keys: pd.DataFrame) -> np.ndarray:
+    """64-bit hash of every row of the canonical keys"""
+    return pd.util.hash_pandas_object(keys, index=False).to_numpy()
+
+
+def canonical_keys(df: pd.DataFrame, columns: list, rows: np.ndarray | None = None) -> pd.DataFrame:
+    """
+    The key columns of df (only `rows`, a boolean mask, if given) as float64
+    numbers, datetime64[ns] dates and text, with a plain 0..n-1 index
+    """
+    keys = {}
+    for col in columns:
+        values = df[col]
+        if pd.api.types.is_datetime64_any_dtype(values):
+            values = values.to_numpy()
+            keys[col] = (values if rows is None else values[rows]).astype("datetime64[ns]")
+        elif pd.api.types.is_numeric_dtype(values) and not isinstance(values.dtype, pd.CategoricalDtype):
+            if isinstance(values.dtype, pd.api.extensions.ExtensionDtype):
+                values = values.to_numpy(dtype=np.float64, na_value=np.nan)
+            else:
+                values = values.to_numpy()
+            values = (values if rows is None else values[rows]).astype(np.float64)
+            # + 0.0 turns -0.0 into 0.0, which duplicated() counts as the same value
+            values += 0.0
+            keys[col] = values
+        else:
+            # Text and categoricals hash by content, so they are kept as they are
+            keys[col] = values.array if rows is None else values.array[rows]
+    return pd.DataFrame(keys, columns=columns, copy=False)
+
+
+def rows_equal(left: pd.DataFrame, left_rows: np.ndarray, right: pd.DataFrame, right_rows: np.ndarray) -> np.ndarray:
+    """Whether left row left_rows[i] has the same values as right row right_rows[i] (missing equals missing)"""
+    equal = np.ones(len(left_rows), dtype=bool)
+    for col in left.columns:
+        a = left[col].take(left_rows).to_numpy()
+        b = right[col].take(right_rows).to_numpy()
+        equal &= (a == b) | (pd.isna(a) & pd.isna(b))
+    return equal
+
+
+class DedupIndex:
+    """
+    Fingerprints and key values of the distinct rows seen so far.
+
+    duplicated(df) works like df.duplicated(columns) but also marks rows
+    already in the index, and adds the new rows to it.
+    """
+
+    # The row hash, a method so a subclass can swap it (bench_dedup_index.py cuts it to 16 bits)
+    fingerprint = staticmethod(fingerprint)
+
+    def __init__(self, columns: list | None = None):
+        self.columns = columns
+        self.stats = []
+        self.path = None
+        # Fingerprints in the order the rows were indexed, their sort order and sorted values for lookups
+        self.fingerprints = np.empty(0, dtype=np.uint64)
+        self.order = np.empty(0, dtype=np.int64)
+        self.sorted = self.fingerprints
+        # The indexed rows: the ones saved at self.path, then (frame, boolean mask) of every load since.
+        # Their canonical key values are only built when a fingerprint matches (self.keys, for the first self.keyed loads)
+        self.loads = []
+        self.keys = None
+        self.keyed = 0
+
+    def __len__(self):
+        return len(self.fingerprints)
+
+    def saved_rows(self) -> list:
+        """The key columns of the rows in the saved index, as a one-frame list (empty if nothing was loaded)"""
+        return [] if self.path is None else [pq.read_table(self.path, columns=self.columns).to_pandas()]
+
+    def history_keys(self) -> pd.DataFrame:
+        """Canonical key values of every indexed row, in index order"""
+        if self.keys is None and self.path is not None:
+            self.keys = canonical_keys(self.saved_rows()[0], self.columns)
+        if self.keyed < len(self.loads):
+            parts = ([] if self.keys is None else [self.keys]) + [
+                canonical_keys(df, self.columns, rows) for df, rows in self.loads[self.keyed:]
+            ]
+            self.keys = pd.concat(parts, ignore_index=True) if len(parts) > 1 else parts[0]
+            self.keyed = len(self.loads)
+        return self.keys
+
+    def lookup(self, hashes: np.ndarray):
+        """Position in the index of a row with each fingerprint, -1 where there is none"""
+        found = np.full(len(hashes), -1, dtype=np.int64)
+        if len(self.sorted):
+            at = np.minimum(np.searchsorted(self.sorted, hashes), len(self.sorted) - 1)
+            hit = self.sorted[at] == hashes
+            found[hit] = self.order[at[hit]]
+        return found
+
+    def duplicated(self, df: pd.DataFrame, rows: np.ndarray | None = None, step: str = "load", add: bool = True) -> np.ndarray:
+        """
+        Boolean array over df's rows: True for rows that repeat an earlier row
+        of df or a row of the index, over the key columns. With `rows` (a
+        boolean mask) only those rows are checked, the others are never
+        duplicates and never indexed. With add on, the new rows join the index.
+        """
+        start = time.perf_counter()
+        if self.columns is None:
+            self.columns = list(df.columns)
+        positions = np.arange(len(df)) if rows is None else np.flatnonzero(rows)
+        keys = canonical_keys(df, self.columns, rows)
+        hashes = self.fingerprint(keys)
+        duplicated = np.zeros(len(keys), dtype=bool)
+        collisions = 0
+
+        # Within the load: each row against the first row with its fingerprint
+        codes, _ = pd.factorize(hashes)
+        first = np.unique(codes, return_index=True)[1][codes]
+        candidates = np.flatnonzero(first != np.arange(len(keys)))
+        same = rows_equal(keys, candidates, keys, first[candidates])
+        duplicated[candidates[same]] = True
+        if not same.all():
+            # Rows sharing a fingerprint without being equal: settle those fingerprints exactly
+            shared = np.isin(codes, codes[candidates[~same]])
+            exact = keys[shared].duplicated().to_numpy()
+            collisions += int((~exact).sum()) - len(np.unique(codes[shared]))
+            duplicated[shared] = exact
+        within = int(duplicated.sum())
+
+        # Against the index: new fingerprints are new rows, matching ones are compared with the saved keys
+        unseen = np.flatnonzero(~duplicated)
+        found = self.lookup(hashes[unseen])
+        matched = unseen[found >= 0]
+        if len(matched):
+            history = self.history_keys()
+            same = rows_equal(keys, matched, history, found[found >= 0])
+            retry = np.flatnonzero(~same)
+            if len(retry):
+                # An earlier collision can leave one fingerprint on several index rows, try all of them
+                low = np.searchsorted(self.sorted, hashes[matched[retry]], side="left")
+                counts = np.searchsorted(self.sorted, hashes[matched[retry]], side="right") - low
+                starts = np.cumsum(counts) - counts
+                others = self.order[np.repeat(low - starts, counts) + np.arange(counts.sum())]
+                equal = rows_equal(keys, np.repeat(matched[retry], counts), history, others)
+                same[retry] = np.maximum.reduceat(equal, starts)
+            collisions += int((~same).sum())
+            duplicated[matched[same]] = True
+        in_index = int(duplicated.sum()) - within
+
+        if add:
+            # Only a reference to the new rows is kept, they are taken out when compared or saved
+            new = ~duplicated
+            indexed = np.zeros(len(df), dtype=bool)
+            indexed[positions[new]] = True
+            # df[columns] is a lazy copy, later changes to df don't reach the index
+            self.loads.append((df[self.columns], indexed))
+            # Merge the new fingerprints into the sorted ones (after equal ones) instead of sorting them all again
+            added = hashes[new]
+            added_order = np.argsort(added, kind="stable")
+            at = np.searchsorted(self.sorted, added[added_order], side="right")
+            self.sorted = np.insert(self.sorted, at, added[added_order])
+            self.order = np.insert(self.order, at, len(self.fingerprints) + added_order)
+            self.fingerprints = np.concatenate([self.fingerprints, added])
+
+        self.stats.append({
+            "step": step, "rows": len(keys), "within": within, "in_index": in_index,
+            "collisions": collisions, "indexed": len(self), "seconds": time.perf_counter() - start,
+        })
+        result = np.zeros(len(df), dtype=bool)
+        result[positions] = duplicated
+        return result
+
+    def stats_lines(self) -> list:
+        """One line of duplicate counts per duplicated() call"""
+        return [
+            f"{s['step']}: {s['rows']} rows fingerprinted, {s['within']} duplicates within the load, "
+            f"{s['in_index']} already in the index, {s['collisions']} hash collisions resolved, "
+            f"{s['indexed']} rows indexed ({s['seconds']:.2f}s)"
+            for s in self.stats
+        ]
+
+    def save(self, path: Path = DEDUP_INDEX_PATH):
+        """Write the fingerprints and key columns of every indexed row, sorted by fingerprint so loading needs no sort"""
+        parts = self.saved_rows() + [df.loc[rows, self.columns] for df, rows in self.loads]
+        rows = pd.concat(parts, ignore_index=True) if len(parts) > 1 else parts[0]
+        table = pa.Table.from_pandas(plain_types(rows.take(self.order)), preserve_index=False)
+        table = table.append_column("fingerprint", pa.array(self.sorted, type=pa.uint64()))
+        table = table.replace_schema_metadata(index_metadata(self.columns))
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        # Always read back whole, so the file is written without statistics and dictionaries (twice as fast)
+        pq.write_table(table, path, use_dictionary=False, write_statistics=False)
+
+    @classmethod
+    def load(cls, columns: list | None = None, path: Path = DEDUP_INDEX_PATH):
+        """
+        The saved index (only its fingerprints are read until a key comparison
+        needs the rest), or an empty one if there is none for these columns
+        """
+        index = cls(columns)
+        path = Path(path)
+        if not path.exists():
+            return index
+        metadata = {k.decode(): v.decode() for k, v in (pq.read_schema(path).metadata or {}).items()}
+        if metadata.get("version") != str(DEDUP_INDEX_VERSION) or (columns is not None and json.loads(metadata["columns"]) != list(columns)):
+            print("Duplicate index was built for other columns or by another version, starting a new one")
+            return index
+        index.columns = json.loads(metadata["columns"])
+        index.path = path
+        index.fingerprints = pq.read_table(path, columns=["fingerprint"]).column("fingerprint").to_numpy()
+        index.order = np.arange(len(index.fingerprints))
+        index.sorted = index.fingerprints
+        return index
+
+
+class DedupIndexWriter:
+    """
+    The saved index of a table deduplicated chunk by chunk, written without
+    holding it: add() fingerprints the distinct rows of each chunk and spills
+    them as a run sorted by fingerprint, close() merges the runs into the same
+    file DedupIndex.save() writes for those rows. The rows added must not
+    repeat each other, deciding that is up to the caller (see DuplicateFilter).
+    """
+
+    def __init__(self, columns: list | None = None, path: Path = DEDUP_INDEX_PATH, chunk_size: int = 100_000):
+        self.columns = columns
+        self.path = Path(path)
+        self.chunk_size = chunk_size
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.run_dir = tempfile.TemporaryDirectory(dir=self.path.parent, prefix="dedup_runs_")
+        self.run_paths = []
+        self.rows = 0
+
+    def add(self, df: pd.DataFrame, rows: np.ndarray | None = None):
+        """Index the rows of df (only `rows`, a boolean mask, if given)"""
+        if self.columns is None:
+            self.columns = list(df.columns)
+        keys = df[self.columns] if rows is None else df.loc[rows, self.columns]
+        hashes = fingerprint(canonical_keys(df, self.columns, rows))
+        order = np.argsort(hashes, kind="stable")
+        table = pa.Table.from_pandas(plain_types(keys.iloc[order]), preserve_index=False)
+        table = table.append_column("fingerprint", pa.array(hashes[order], type=pa.uint64()))
+        self.run_paths.append(Path(self.run_dir.name) / f"run_{len(self.run_paths):05d}.parquet")
+        pq.write_table(table.replace_schema_metadata(index_metadata(self.columns)), self.run_paths[-1])
+        self.rows += len(keys)
+
+    def close(self) -> Path:
+        """Merge the runs into the index file (an index left from before is removed if nothing was added)"""
+        if self.run_paths:
+            merge_sorted_runs(self.run_paths, self.path, "fingerprint", chunk_size=self.chunk_size)
+        else:
+            self.path.unlink(missing_ok=True)
+        self.run_dir.cleanup()
+        return self.path
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
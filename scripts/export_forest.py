@@ -0,0 +1,49 @@
+"""
+Export a saved random forest as the NumPy arrays forest_predictor.py scores with.
+
+Takes the forest 05_data_analysis.py saved in models/ (with its scaler and
+feature columns) and the cleaning plan of 04_data_cleaning.py, and writes
+models/forest_compiled.npz. Export again after the forest is retrained.
+
+Run from the project root after 05_data_analysis.py:
+    python scripts/export_forest.py
+"""
+
+import argparse
+import time
+from pathlib import Path
+
+import numpy as np
+
+from schema import BOUNDED_FEATURES
+from cleaning_plan import CRITICAL_COLS, CleaningPlan
+from model_store import MODEL_DIR, load_artifact
+from forest_predictor import COMPILED_FOREST_PATH, compile_forest
+
+
+def export_forest(label="Random Forest", output_path=COMPILED_FOREST_PATH, model_dir=MODEL_DIR):
+    """Compile the saved model `label` and write its arrays to output_path"""
+    start = time.perf_counter()
+    artifact = load_artifact(label, model_dir)
+    arrays = compile_forest(
+        artifact["model"], artifact["scaler"], artifact["feature_cols"], CleaningPlan.load(),
+        critical_cols=CRITICAL_COLS, bounded_cols=BOUNDED_FEATURES,
+    )
+    # Which trained model the arrays come from
+    arrays["model_key"] = np.array(artifact["key"])
+
+    output_path = Path(output_path)
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    np.savez(output_path, **arrays)
+    print(f"Compiled the saved {label} ({len(arrays['roots'])} trees, {len(arrays['feature']):,} nodes, "
+          f"depth {int(arrays['depth'])}) in {time.perf_counter() - start:.2f}s")
+    print(f"Saved: {output_path} ({output_path.stat().st_size / 1024 ** 2:.1f} MB)")
+    return output_path
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Export a saved random forest for the NumPy single-track predictor")
+    parser.add_argument("--model", default="Random Forest", help="label of the saved forest (default: Random Forest)")
+    parser.add_argument("--output", default=COMPILED_FOREST_PATH, help=f"where to write the arrays (default {COMPILED_FOREST_PATH})")
+    args = parser.parse_args()
+    export_forest(args.model, args.output)
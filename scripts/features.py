@@ -0,0 +1,26 @@
+"""
+The model features, shared by the analysis and the scoring of new tracks.
+
+analyze_data() trains on these columns and score_catalog.py scores the
+Spotify catalog with them, so both derive the engineered features the same way.
+"""
+
+# Spotify audio features the analysis is built on
+base_feature_cols = ['danceability', 'energy', 'loudness', 'speechiness',
+                     'acousticness', 'instrumentalness', 'liveness', 'valence', 'tempo']
+
+# Interactions of the audio features added by add_features()
+engineered_feature_cols = ['energy_loudness', 'energy_danceability', 'positive_energy',
+                           'vocal_prominence', 'tempo_normalized']
+
+feature_cols = base_feature_cols + engineered_feature_cols
+
+
+def add_features(df):
+    """Add the engineered features to a table holding the base features"""
+    df['energy_loudness'] = df['energy'] * df['loudness']
+    df['energy_danceability'] = df['energy'] * df['danceability']
+    df['positive_energy'] = df['valence'] * df['energy']
+    df['vocal_prominence'] = df['speechiness'] * (1 - df['instrumentalness'])
+    df['tempo_normalized'] = (df['tempo'] - 120) / 60
+    return df
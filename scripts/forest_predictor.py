@@ -0,0 +1,207 @@
+"""
+A trained random forest flattened into NumPy arrays, for scoring one track at a time.
+
+scikit-learn's predict_proba on a one-row table goes through input checks, a
+DataFrame and a thread pool over 400 trees, which costs milliseconds per call.
+compile_forest() copies every tree of the forest into five flat arrays
+(split feature, threshold, left and right child, leaf probability) with the
+trees one after another, plus the scaler and what the cleaning plan does to
+the audio features. CompiledForest regroups the nodes by depth when it loads
+them and walks all trees at once, level by level, with a few lookups into the
+small arrays of each level. One track takes 0.1 to 0.2 ms: 400 trees times
+12 levels of NumPy lookups, which is about as far as NumPy alone goes.
+
+The predictor repeats scikit-learn's arithmetic step for step (scaling in
+float64, splits on float32 values, tree probabilities summed in tree order
+and divided by the number of trees), so its probabilities are identical to
+predict_proba, not just close. Loading and predicting only need NumPy:
+export_forest.py writes the arrays from a saved model, this module reads them.
+
+    forest = CompiledForest.load()
+    forest.predict_track({"danceability": 0.7, "energy": 0.8, "loudness": -5.2, ...})
+"""
+
+from pathlib import Path
+
+import numpy as np
+
+from features import add_features, base_feature_cols
+
+COMPILED_FOREST_PATH = Path("models/forest_compiled.npz")
+
+# Bump when the arrays change so old exports aren't loaded
+COMPILED_FOREST_VERSION = 1
+
+
+def compile_forest(model, scaler, feature_cols, plan, critical_cols=(), bounded_cols=()) -> dict:
+    """
+    The arrays of a fitted forest classifier (one whose estimators_ are
+    decision trees), its StandardScaler and the cleaning plan's medians, caps
+    and [0,1] clipping of the base features. critical_cols are the features a
+    track can't be scored without, bounded_cols the ones held as float32 and
+    clipped to [0,1] (schema.BOUNDED_FEATURES)
+    """
+    trees = list(getattr(model, "estimators_", []))
+    if not trees or not all(hasattr(tree, "tree_") for tree in trees):
+        raise ValueError(f"{type(model).__name__} is not a forest of decision trees, it can't be compiled")
+    positive = list(model.classes_).index(1)
+
+    features, thresholds, lefts, rights, leaf_values, roots = [], [], [], [], [], []
+    offset = 0
+    for tree in trees:
+        t = tree.tree_
+        nodes = np.arange(t.node_count)
+        leaf = t.children_left == -1
+        # Leaves have both children pointing to themselves, so every walk can run to the deepest level
+        features.append(np.where(leaf, 0, t.feature))
+        thresholds.append(np.where(leaf, np.inf, t.threshold))
+        lefts.append(np.where(leaf, nodes, t.children_left) + offset)
+        rights.append(np.where(leaf, nodes, t.children_right) + offset)
+        # The tree's class probabilities as predict_proba computes them: node values over their sum
+        value = t.value[:, 0, :]
+        normalizer = value.sum(axis=1)
+        normalizer[normalizer == 0.0] = 1.0
+        leaf_values.append(value[:, positive] / normalizer)
+        roots.append(offset)
+        offset += t.node_count
+
+    bounds = [plan.bounds.get(col, (-np.inf, np.inf)) for col in base_feature_cols]
+    return {
+        "version": np.array(COMPILED_FOREST_VERSION),
+        "feature": np.concatenate(features).astype(np.intp),
+        "threshold": np.concatenate(thresholds).astype(np.float64),
+        "left": np.concatenate(lefts).astype(np.intp),
+        "right": np.concatenate(rights).astype(np.intp),
+        "leaf_value": np.concatenate(leaf_values).astype(np.float64),
+        "roots": np.array(roots, dtype=np.intp),
+        "depth": np.array(max(tree.tree_.max_depth for tree in trees)),
+        "mean": np.asarray(scaler.mean_, dtype=np.float64),
+        "scale": np.asarray(scaler.scale_, dtype=np.float64),
+        "feature_cols": np.array(feature_cols),
+        "medians": np.array([plan.medians.get(col, np.nan) for col in base_feature_cols], dtype=np.float64),
+        "cap_lower": np.array([lower for lower, _ in bounds], dtype=np.float64),
+        "cap_upper": np.array([upper for _, upper in bounds], dtype=np.float64),
+        "critical": np.array([col in critical_cols for col in base_feature_cols]),
+        "bounded": np.array([col in bounded_cols for col in base_feature_cols]),
+    }
+
+
+def level_arrays(feature, threshold, left, right, roots, depth):
+    """
+    The compiled nodes regrouped by depth: a (feature, threshold, children)
+    triple per level holding the nodes of every tree at that depth, so the
+    walk reads a small array per level instead of the whole forest. A leaf
+    above the deepest level is carried down with both children pointing to
+    itself in the next level. children holds the two next-level positions of
+    each node, at 2i and 2i+1. Thresholds are rounded down to float32: for a
+    float32 value x the test x > threshold is unchanged, and it runs without
+    casting x to float64. Also returns the node id at each position of the
+    last level
+    """
+    nodes = np.asarray(roots)
+    levels = []
+    for _ in range(depth):
+        below, position = np.unique(np.stack([left[nodes], right[nodes]], axis=1).ravel(), return_inverse=True)
+        rounded = threshold[nodes].astype(np.float32)
+        above = rounded.astype(np.float64) > threshold[nodes]
+        rounded[above] = np.nextafter(rounded[above], np.float32(-np.inf))
+        levels.append((feature[nodes], rounded, position.astype(np.intp)))
+        nodes = below
+    return levels, nodes
+
+
+class CompiledForest:
+    """
+    Probability of reaching the Top 10 from a forest compiled by compile_forest().
+
+    predict_track() takes the base audio features of one track and cleans them
+    like the cleaning plan does (missing values get the median, tempo and
+    loudness are capped, the [0,1] features clipped). predict_proba() takes
+    rows of the model's feature columns, as predict_proba of the forest does.
+    """
+
+    def __init__(self, arrays: dict):
+        if int(arrays["version"]) != COMPILED_FOREST_VERSION:
+            raise ValueError("The forest was compiled by another version of forest_predictor.py, export it again")
+        self.feature = arrays["feature"]
+        self.threshold = arrays["threshold"]
+        self.leaf_value = arrays["leaf_value"]
+        self.levels, last_nodes = level_arrays(
+            self.feature, self.threshold, arrays["left"], arrays["right"], arrays["roots"], int(arrays["depth"]))
+        # Leaf probability at each position of the last level
+        self.last_values = self.leaf_value[last_nodes]
+        self.roots = arrays["roots"]
+        self.depth = int(arrays["depth"])
+        self.mean = arrays["mean"]
+        self.scale = arrays["scale"]
+        self.feature_cols = [str(col) for col in arrays["feature_cols"]]
+        # Cleaning of each base feature, as plain lists: per-track Python is faster than tiny arrays
+        self.cleaning = list(zip(
+            base_feature_cols, arrays["medians"].tolist(), arrays["cap_lower"].tolist(),
+            arrays["cap_upper"].tolist(), arrays["critical"].tolist(), arrays["bounded"].tolist(),
+        ))
+
+    @classmethod
+    def load(cls, path: Path = COMPILED_FOREST_PATH):
+        path = Path(path)
+        if not path.exists():
+            raise FileNotFoundError(f"No compiled forest at {path}, run export_forest.py first")
+        with np.load(path, allow_pickle=False) as arrays:
+            return cls(dict(arrays))
+
+    def walk(self, X32: np.ndarray) -> np.ndarray:
+        """Leaf probabilities of every tree (columns) for every row of float32 scaled features"""
+        nodes = np.arange(len(self.roots))
+        if len(X32) == 1:
+            # One track: index its features directly, a level is then a few small lookups
+            x = X32[0]
+            for feature, threshold, children in self.levels:
+                nodes = children[(nodes << 1) + (x[feature[nodes]] > threshold[nodes])]
+            return self.last_values[nodes][np.newaxis]
+
+        values = X32.ravel()
+        offsets = np.arange(len(X32))[:, np.newaxis] * X32.shape[1]
+        nodes = np.broadcast_to(nodes, (len(X32), len(self.roots)))
+        for feature, threshold, children in self.levels:
+            nodes = children[(nodes << 1) + (values[offsets + feature[nodes]] > threshold[nodes])]
+        return self.last_values[nodes]
+
+    def predict_proba(self, X) -> np.ndarray:
+        """
+        Top-10 probability of each row of X (the feature columns, in order, no
+        missing values), as the forest's predict_proba[:, 1]
+        """
+        X = np.array(X, dtype=np.float64, ndmin=2)
+        X -= self.mean
+        X /= self.scale
+        # Trees split on float32 values; the per-tree probabilities are added in tree order like scikit-learn does
+        leaf = self.walk(X.astype(np.float32))
+        return np.cumsum(leaf, axis=1)[:, -1] / len(self.roots)
+
+    def track_features(self, track: dict):
+        """
+        The model features of one track (a dict of its base audio features),
+        cleaned like the cleaning plan does. None if a critical feature is missing
+        """
+        values = {}
+        for col, median, lower, upper, critical, bounded in self.cleaning:
+            value = track.get(col)
+            if value is None or value != value:
+                if critical:
+                    return None
+                value = median
+            # The cleaned table holds the bounded features as float32, clipped to [0,1]
+            if bounded:
+                value = min(max(np.float32(value), np.float32(0)), np.float32(1))
+            else:
+                value = np.float64(min(max(float(value), lower), upper))
+            values[col] = value
+        values = add_features(values)
+        return [values[col] for col in self.feature_cols]
+
+    def predict_track(self, track: dict) -> float:
+        """Top-10 probability of one track, nan if it misses a critical audio feature"""
+        features = self.track_features(track)
+        if features is None:
+            return float("nan")
+        return float(self.predict_proba(features)[0])
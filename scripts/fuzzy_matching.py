@@ -0,0 +1,174 @@
+"""
+Fuzzy matching of Billboard songs to Spotify tracks.
+
+The exact match_key merge misses songs whose title or artist credit differs a
+little ("feat." credits, "- Remastered 2009" suffixes, "&" vs "and"). Comparing
+every chart song with every Spotify track is far too slow, so candidates are
+generated with a blocking index first: an inverted index from (artist token,
+title word) to Spotify keys, i.e. a bucket of titles per artist. Only pairs that
+share an artist token and a title word are scored, and the scoring is done for
+all pairs at once with sparse matrices:
+
+- title similarity: cosine of character-trigram vectors
+- artist similarity: share of the smaller artist-token set found in the other
+
+Both work on the keys produced by clean_string, so they see lowercase text
+with punctuation already removed.
+"""
+
+import re
+
+import numpy as np
+import pandas as pd
+from scipy import sparse
+from sklearn.feature_extraction.text import CountVectorizer
+from sklearn.preprocessing import normalize
+
+# Words that join artist credits rather than name an artist
+ARTIST_CONNECTORS = {"featuring", "feat", "ft", "and", "with", "x", "vs", "the"}
+
+# Words that mark a version of a recording rather than a different song
+TITLE_NOISE = {
+    "remastered", "remaster", "version", "mono", "stereo", "edit", "radio",
+    "single", "mix", "feat", "featuring", "ft", "live", "original",
+}
+YEAR = re.compile(r"^(19|20)\d\d$")
+
+DEFAULT_THRESHOLD = 0.85
+TITLE_WEIGHT = 0.7
+ARTIST_WEIGHT = 0.3
+
+# Blocking buckets holding more Spotify keys than this are too common to block on
+MAX_BUCKET_SIZE = 5000
+
+# Pairs scored per batch, to keep the gathered sparse rows small
+PAIR_BATCH_SIZE = 500_000
+
+
+def artist_tokens(artist: str) -> str:
+    """Artist credit reduced to the tokens that name artists"""
+    return " ".join(t for t in artist.split() if t not in ARTIST_CONNECTORS)
+
+
+def title_core(title: str) -> str:
+    """Title without version markers such as 'remastered 2009' or 'mono'"""
+    core = " ".join(t for t in title.split() if t not in TITLE_NOISE and not YEAR.match(t))
+    return core or title
+
+
+def blocking_tokens(title: str, artist: str) -> str:
+    """
+    Blocking keys for one song: every (artist token, title word) combination,
+    so each artist gets its own bucket of titles
+    """
+    titles = title_core(title).split()
+    return " ".join(f"{a}|{t}" for a in artist_tokens(artist).split() for t in titles)
+
+
+def _token_matrix(texts, vocabulary=None):
+    vectorizer = CountVectorizer(
+        analyzer=str.split, binary=True, lowercase=False, vocabulary=vocabulary, dtype=np.int32
+    )
+    matrix = vectorizer.fit_transform(texts) if vocabulary is None else vectorizer.transform(texts)
+    return matrix.tocsr(), vectorizer.vocabulary_
+
+
+def _pair_products(left, right, rows, cols) -> np.ndarray:
+    """Row-wise dot products left[rows[k]] . right[cols[k]] for every pair k"""
+    products = np.empty(len(rows), dtype=np.float64)
+    for start in range(0, len(rows), PAIR_BATCH_SIZE):
+        stop = start + PAIR_BATCH_SIZE
+        pair_product = left[rows[start:stop]].multiply(right[cols[start:stop]])
+        products[start:stop] = np.asarray(pair_product.sum(axis=1)).ravel()
+    return products
+
+
+def candidate_pairs(billboard_keys: pd.DataFrame, spotify_keys: pd.DataFrame, max_bucket_size: int = MAX_BUCKET_SIZE):
+    """
+    Pairs (billboard row, spotify row) that share an artist token and a title word.
+
+    Looks the Billboard keys up in an inverted index of (artist token, title
+    word) -> Spotify keys and returns the two row-position arrays.
+    """
+    spotify_blocks, vocabulary = _token_matrix(
+        [blocking_tokens(t, a) for t, a in zip(spotify_keys["song"], spotify_keys["artist"])]
+    )
+    billboard_blocks, _ = _token_matrix(
+        [blocking_tokens(t, a) for t, a in zip(billboard_keys["song"], billboard_keys["artist"])],
+        vocabulary,
+    )
+
+    # Drop buckets that are too big to be useful (e.g. a prolific artist with a very common word)
+    bucket_sizes = np.asarray(spotify_blocks.sum(axis=0)).ravel()
+    usable = sparse.diags((bucket_sizes <= max_bucket_size).astype(np.int32), dtype=np.int32)
+    shared = (billboard_blocks @ usable) @ spotify_blocks.T
+    shared.eliminate_zeros()
+    shared = shared.tocoo()
+    return shared.row, shared.col
+
+
+def artist_similarity(billboard_artists: pd.Series, spotify_artists: pd.Series, rows, cols) -> np.ndarray:
+    """Overlap coefficient of the two artist-token sets for the given pairs"""
+    # One vocabulary over both sides, so no token is dropped and the set sizes don't depend on the batch
+    tokens, _ = _token_matrix(pd.concat([billboard_artists, spotify_artists], ignore_index=True).map(artist_tokens))
+    billboard_tokens, spotify_tokens = tokens[:len(billboard_artists)], tokens[len(billboard_artists):]
+
+    shared = _pair_products(billboard_tokens, spotify_tokens, rows, cols)
+    billboard_sizes = np.asarray(billboard_tokens.sum(axis=1)).ravel()
+    spotify_sizes = np.asarray(spotify_tokens.sum(axis=1)).ravel()
+    smaller = np.minimum(billboard_sizes[rows], spotify_sizes[cols])
+    return shared / np.maximum(smaller, 1)
+
+
+def title_similarity(billboard_titles: pd.Series, spotify_titles: pd.Series, rows, cols) -> np.ndarray:
+    """Cosine similarity of character-trigram vectors for the given pairs"""
+    vectorizer = CountVectorizer(analyzer="char_wb", ngram_range=(3, 3), lowercase=False, dtype=np.float32)
+    vectorizer.fit(pd.concat([billboard_titles, spotify_titles], ignore_index=True))
+    billboard_vectors = normalize(vectorizer.transform(billboard_titles))
+    spotify_vectors = normalize(vectorizer.transform(spotify_titles))
+    return _pair_products(billboard_vectors, spotify_vectors, rows, cols)
+
+
+def fuzzy_match(billboard_keys: pd.DataFrame, spotify_keys: pd.DataFrame,
+                threshold: float = DEFAULT_THRESHOLD, max_bucket_size: int = MAX_BUCKET_SIZE) -> pd.DataFrame:
+    """
+    Find the best Spotify key for each Billboard key.
+
+    Both frames need `song`, `artist` and `match_key` columns holding cleaned
+    strings, one row per distinct key. Returns one row per Billboard key whose
+    best candidate scores at least `threshold`, with columns `match_key`
+    (Billboard), `spotify_key` and `match_confidence`. Ties go to the Spotify
+    key that sorts first, so the result doesn't depend on row order.
+    """
+    columns = ["match_key", "spotify_key", "match_confidence"]
+    if billboard_keys.empty or spotify_keys.empty:
+        return pd.DataFrame(columns=columns)
+
+    billboard_keys = billboard_keys.reset_index(drop=True)
+    spotify_keys = spotify_keys.sort_values("match_key").reset_index(drop=True)
+
+    rows, cols = candidate_pairs(billboard_keys, spotify_keys, max_bucket_size=max_bucket_size)
+    if len(rows) == 0:
+        return pd.DataFrame(columns=columns)
+
+    # Only the Spotify keys that showed up as a candidate need to be scored
+    used, cols = np.unique(cols, return_inverse=True)
+    spotify_keys = spotify_keys.iloc[used].reset_index(drop=True)
+
+    title_score = title_similarity(
+        billboard_keys["song"].map(title_core), spotify_keys["song"].map(title_core), rows, cols
+    )
+    artist_score = artist_similarity(billboard_keys["artist"], spotify_keys["artist"], rows, cols)
+    score = TITLE_WEIGHT * title_score + ARTIST_WEIGHT * artist_score
+
+    # Best candidate per Billboard key: highest score, then lowest Spotify position
+    order = np.lexsort((cols, -score, rows))
+    rows, cols, score = rows[order], cols[order], score[order]
+    first = np.r_[True, rows[1:] != rows[:-1]]
+    best = first & (score >= threshold)
+
+    return pd.DataFrame({
+        "match_key": billboard_keys["match_key"].to_numpy()[rows[best]],
+        "spotify_key": spotify_keys["match_key"].to_numpy()[cols[best]],
+        "match_confidence": np.round(score[best].astype(np.float64), 4),
+    })
@@ -0,0 +1,109 @@
+"""
+The models 05_data_analysis can train, and which ones it does.
+
+MODEL_REGISTRY maps a backend name to the label it is reported under, the
+estimator class that builds it and its hyperparameters. analysis_models.yaml
+chooses the backends to train and can override their hyperparameters, so a
+backend is tried by editing the config rather than the analysis.
+
+Random forest, logistic regression and gradient boosting are always trained:
+the report, the plots and the feature importances are built from them. Any
+other backend in the config is trained alongside them and shows up in the
+model comparison. Histogram-based gradient boosting ships with the registry
+but is off in the default config, list it there to compare it.
+"""
+
+import time
+from pathlib import Path
+
+import pandas as pd
+import yaml
+from sklearn.ensemble import GradientBoostingClassifier, HistGradientBoostingClassifier, RandomForestClassifier
+from sklearn.linear_model import LogisticRegression
+from sklearn.metrics import roc_auc_score
+
+MODELS_PATH = Path("analysis_models.yaml")
+
+MODEL_REGISTRY = {
+    # Many decision trees whose votes are aggregated to predict chart success
+    "random_forest": {
+        "label": "Random Forest",
+        "estimator": RandomForestClassifier,
+        "params": {"n_estimators": 400, "max_depth": 12, "min_samples_leaf": 2, "min_samples_split": 5, "random_state": 42},
+    },
+    # Linear model, its coefficients show which features matter
+    "logistic_regression": {
+        "label": "Logistic Regression",
+        "estimator": LogisticRegression,
+        "params": {"random_state": 42, "max_iter": 2000, "C": 0.1, "class_weight": None, "solver": "saga"},
+    },
+    # Exact-split boosting, the slowest model to fit
+    "gradient_boosting": {
+        "label": "Gradient Boosting Classifier",
+        "estimator": GradientBoostingClassifier,
+        "params": {"n_estimators": 200, "learning_rate": 0.1, "max_depth": 5, "random_state": 42},
+    },
+    # Boosting on features binned into 255 histogram buckets, with the same number of stages and depth
+    "hist_gradient_boosting": {
+        "label": "Histogram Gradient Boosting",
+        "estimator": HistGradientBoostingClassifier,
+        "params": {"max_iter": 200, "learning_rate": 0.1, "max_depth": 5, "early_stopping": False, "random_state": 42},
+    },
+}
+
+# Backends the report is built from, trained whatever the config says
+REPORT_MODELS = ["random_forest", "logistic_regression", "gradient_boosting"]
+
+
+def load_model_config(path: Path = MODELS_PATH) -> dict:
+    """
+    Backend name -> hyperparameter overrides from the config, in config order.
+    Without a config file only the report models are trained, with their defaults
+    """
+    path = Path(path)
+    if not path.exists():
+        return {name: {} for name in REPORT_MODELS}
+    with open(path) as f:
+        spec = yaml.safe_load(f) or {}
+
+    config = {}
+    for entry in spec.get("models", []):
+        # An entry is a backend name, or a one-key mapping of a name to its overrides
+        name, overrides = (entry, {}) if isinstance(entry, str) else next(iter(entry.items()))
+        if name not in MODEL_REGISTRY:
+            raise ValueError(f"Unknown model {name!r} in {path}, expected one of {list(MODEL_REGISTRY)}")
+        config[name] = dict(overrides or {})
+    return config
+
+
+def build_models(config: dict) -> dict:
+    """
+    Unfitted estimators for the report models and the configured backends,
+    keyed by label: the report models first, in registry order, then the others
+    """
+    names = REPORT_MODELS + [name for name in config if name not in REPORT_MODELS]
+    models = {}
+    for name in names:
+        entry = MODEL_REGISTRY[name]
+        params = {**entry["params"], **config.get(name, {})}
+        models[entry["label"]] = entry["estimator"](**params)
+    return models
+
+
+def compare_models(models: dict, training_times: dict, X_test, y_test) -> pd.DataFrame:
+    """
+    Fit time, time to predict the test set and test ROC-AUC of every fitted
+    model (label -> estimator), one row per model. training_times is what
+    train_models() returned
+    """
+    rows = []
+    for label, model in models.items():
+        start = time.perf_counter()
+        proba = model.predict_proba(X_test)[:, 1]
+        predict_seconds = time.perf_counter() - start
+        cores, fit_seconds = training_times[label]
+        rows.append({
+            "model": label, "cores": cores, "fit_seconds": fit_seconds,
+            "predict_seconds": predict_seconds, "roc_auc": roc_auc_score(y_test, proba),
+        })
+    return pd.DataFrame(rows)
@@ -0,0 +1,134 @@
+"""
+Trained analysis models saved between runs, so unchanged models aren't retrained.
+
+Every model 05_data_analysis trains is saved in models/ as one joblib file
+holding the fitted estimator, the fitted StandardScaler and the feature
+columns, so it can score new tracks on its own. Its name carries a cache key:
+a hash of the training set (the scaled, SMOTE-balanced rows and their
+labels), the feature columns, the estimator class and its hyperparameters,
+the scikit-learn version and MODEL_ARTIFACT_VERSION. A later run computes the
+same key and loads the file instead of fitting the model again. Anything that
+changes the model (new cleaned data, another feature, other hyperparameters,
+another scikit-learn) changes the key, and that model alone is retrained.
+
+models/manifest.json lists the current artifact of every model label; the
+scoring scripts load models through it.
+"""
+
+import hashlib
+import json
+import time
+from pathlib import Path
+
+import joblib
+import numpy as np
+import sklearn
+
+from training import train_models
+
+MODEL_DIR = Path("models")
+MANIFEST_PATH = MODEL_DIR / "manifest.json"
+
+# Bump when the content of the artifacts changes so old ones are retrained
+MODEL_ARTIFACT_VERSION = 1
+
+# Parameters that change how fast a model trains but not what it learns
+RUNTIME_PARAMS = ("n_jobs", "verbose")
+
+
+def data_key(X, y, feature_cols) -> str:
+    """Hash of the training rows, their labels and the feature columns"""
+    digest = hashlib.sha256()
+    digest.update(json.dumps(list(feature_cols)).encode())
+    for values in (np.asarray(X), np.asarray(y)):
+        values = np.ascontiguousarray(values)
+        digest.update(f"{values.dtype}{values.shape}".encode())
+        digest.update(memoryview(values).cast("B"))
+    return digest.hexdigest()
+
+
+def model_key(model, training_key: str) -> str:
+    """Cache key of an unfitted estimator trained on the data with training_key"""
+    params = {name: value for name, value in model.get_params().items() if name not in RUNTIME_PARAMS}
+    spec = {
+        "data": training_key,
+        "estimator": type(model).__name__,
+        "params": repr(sorted(params.items())),
+        "sklearn": sklearn.__version__,
+        "version": MODEL_ARTIFACT_VERSION,
+    }
+    return hashlib.sha256(json.dumps(spec, sort_keys=True).encode()).hexdigest()[:16]
+
+
+def artifact_path(label: str, key: str, model_dir: Path = MODEL_DIR) -> Path:
+    return Path(model_dir) / f"{label.lower().replace(' ', '_')}-{key}.joblib"
+
+
+def read_manifest(model_dir: Path = MODEL_DIR) -> dict:
+    path = Path(model_dir) / MANIFEST_PATH.name
+    return json.loads(path.read_text()) if path.exists() else {}
+
+
+def load_artifact(label: str = "Random Forest", model_dir: Path = MODEL_DIR) -> dict:
+    """
+    The current artifact of a model label (the dict train_or_load() saved:
+    model, scaler, feature_cols, key, ...), an error if it was never trained
+    """
+    manifest = read_manifest(model_dir)
+    if label not in manifest:
+        raise FileNotFoundError(f"No saved {label} model in {model_dir}, run 05_data_analysis.py first")
+    return joblib.load(Path(model_dir) / manifest[label]["file"])
+
+
+def train_or_load(models: dict, X, y, feature_cols, scaler, cores=None, retrain=False, model_dir: Path = MODEL_DIR):
+    """
+    Load the saved artifact of every model (label -> unfitted estimator) whose
+    cache key matches, train the others with train_models() and save them.
+    Returns the fitted models (in the same order), a dict of label -> (cores,
+    fit seconds) as train_models() gives (the original fit for loaded models)
+    and the set of labels that were loaded
+    """
+    model_dir = Path(model_dir)
+    training_key = data_key(X, y, feature_cols)
+    keys = {label: model_key(model, training_key) for label, model in models.items()}
+
+    fitted, training_times, loaded = {}, {}, set()
+    if not retrain:
+        for label, key in keys.items():
+            path = artifact_path(label, key, model_dir)
+            if path.exists():
+                artifact = joblib.load(path)
+                fitted[label] = artifact["model"]
+                training_times[label] = (artifact["cores"], artifact["fit_seconds"])
+                loaded.add(label)
+    if loaded:
+        print(f"\nLoaded {len(loaded)} trained model{'s' if len(loaded) > 1 else ''} from {model_dir}: {', '.join(sorted(loaded))}")
+
+    to_train = {label: model for label, model in models.items() if label not in loaded}
+    model_dir.mkdir(parents=True, exist_ok=True)
+    manifest = read_manifest(model_dir)
+    if to_train:
+        trained, times = train_models(to_train, X, y, cores=cores)
+        fitted.update(trained)
+        training_times.update(times)
+
+        for label in trained:
+            path = artifact_path(label, keys[label], model_dir)
+            cores_used, seconds = times[label]
+            joblib.dump({
+                "version": MODEL_ARTIFACT_VERSION, "key": keys[label], "label": label,
+                "model": trained[label], "scaler": scaler, "feature_cols": list(feature_cols),
+                "cores": cores_used, "fit_seconds": seconds, "sklearn_version": sklearn.__version__,
+                "trained_at": time.strftime("%Y-%m-%d %H:%M:%S"),
+            }, path)
+            # The artifact this one replaces is never loaded again
+            previous = manifest.get(label, {}).get("file")
+            if previous and previous != path.name and (model_dir / previous).exists():
+                (model_dir / previous).unlink()
+        print(f"Saved {len(trained)} trained model{'s' if len(trained) > 1 else ''} to {model_dir}")
+
+    for label, key in keys.items():
+        manifest[label] = {"file": artifact_path(label, key, model_dir).name, "key": key}
+    (model_dir / MANIFEST_PATH.name).write_text(json.dumps(manifest, indent=2))
+
+    return {label: fitted[label] for label in models}, {label: training_times[label] for label in models}, loaded
@@ -0,0 +1,211 @@
+"""
+Text normalization used to build the Billboard/Spotify match keys.
+
+clean_string() is the reference rule for one value. normalize_text() applies
+the same rule to a whole column at once: the column is turned into one Arrow
+byte buffer and punctuation removal, whitespace collapsing, trimming and
+lowercasing are done with byte lookup tables over that buffer in NumPy. Values
+with non-ASCII characters fall back to clean_string(), since Unicode word and
+space rules are Python's own. Both give byte-identical keys.
+
+NormalizationCache keeps the raw -> clean mapping on disk between runs, so
+each distinct raw string is only ever normalized once.
+"""
+
+import re
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+
+NON_WORD = re.compile(r'[^\w\s]')
+SPACE_RUN = re.compile(r'\s+')
+
+# Bump when clean_string's rules change so cached keys are thrown away
+RULES_VERSION = 1
+
+# Byte tables for ASCII, matching what Python's `re` treats as \w and \s (\s also covers \v and \x1c-\x1f)
+_ascii = [chr(i) for i in range(128)]
+IS_SPACE = np.array([bool(SPACE_RUN.match(c)) for c in _ascii] + [False] * 128)
+IS_KEPT = np.array([not NON_WORD.match(c) for c in _ascii] + [False] * 128)
+TO_LOWER = np.array([ord(c.lower()) for c in _ascii] + list(range(128, 256)), dtype=np.uint8)
+
+
+def clean_string(s):
+    """Cleaning the strings to all match"""
+
+    if pd.isna(s):
+        return ""
+    # Changing Strings to all be or have lowercase, remove special characters, extra spaces
+    s = str(s).lower()
+    s = NON_WORD.sub('', s)
+    s = SPACE_RUN.sub(' ', s)
+    return s.strip()
+
+
+def _to_arrow(values: pd.Series, na_value: str) -> pa.Array:
+    """Turn a column into an Arrow large_string array, with missing values replaced by na_value"""
+    try:
+        arr = pa.array(values, type=pa.large_string(), from_pandas=True)
+    except (pa.ArrowInvalid, pa.ArrowTypeError):
+        # Column holds non-string values (e.g. numbers), stringify them like str() would
+        arr = pa.array(
+            [None if pd.isna(v) else str(v) for v in values.to_numpy(dtype=object)],
+            type=pa.large_string(),
+        )
+    arr = pc.fill_null(arr, na_value)
+    if isinstance(arr, pa.ChunkedArray):
+        arr = arr.combine_chunks()
+    return arr
+
+
+def _kept_offsets(offsets: np.ndarray, keep: np.ndarray) -> np.ndarray:
+    """New string offsets after dropping the bytes where keep is False"""
+    # Dropped bytes are rare, so count them before each offset instead of summing every kept byte
+    dropped = np.flatnonzero(~keep)
+    return offsets - np.searchsorted(dropped, offsets)
+
+
+def normalize_text(values: pd.Series, na_value: str = "") -> pd.Series:
+    """
+    Vectorized clean_string() over a whole column.
+
+    Missing values become `na_value` before cleaning, so na_value="" matches
+    clean_string() and na_value="nan" matches clean_string(str(value)).
+    Returns an Arrow-backed string Series with the same index.
+    """
+    arr = _to_arrow(values, na_value)
+    n = len(arr)
+
+    _, offsets_buf, data_buf = arr.buffers()
+    offsets = np.frombuffer(offsets_buf, dtype=np.int64)[arr.offset:arr.offset + n + 1]
+    data = np.frombuffer(data_buf, dtype=np.uint8)[offsets[0]:offsets[-1]]
+    offsets = offsets - offsets[0]
+
+    # Drop everything that isn't a word or space character (case doesn't matter here, we lowercase at the end)
+    keep = IS_KEPT[data]
+    data = data[keep]
+    offsets = _kept_offsets(offsets, keep)
+
+    # Turn every space character into ' ' and drop spaces that follow another space or start a value
+    is_space = IS_SPACE[data]
+    data[is_space] = ord(" ")
+    prev_space = np.empty(len(data), dtype=bool)
+    prev_space[:1] = True
+    prev_space[1:] = is_space[:-1]
+    prev_space[offsets[:-1][offsets[:-1] < len(data)]] = True
+    keep = ~(is_space & prev_space)
+    data = data[keep]
+    offsets = _kept_offsets(offsets, keep)
+
+    # At most one trailing space is left per value, drop it
+    ends = offsets[1:] - 1
+    trailing = np.zeros(n, dtype=bool)
+    if len(data):
+        trailing = (offsets[1:] > offsets[:-1]) & (data[np.maximum(ends, 0)] == ord(" "))
+    keep = np.ones(len(data), dtype=bool)
+    keep[ends[trailing]] = False
+    data = TO_LOWER[data[keep]]
+    offsets[1:] -= np.cumsum(trailing)
+
+    cleaned = pa.LargeStringArray.from_buffers(n, pa.py_buffer(offsets), pa.py_buffer(data))
+
+    # Non-ASCII values go through the reference implementation
+    non_ascii = pc.invert(pc.string_is_ascii(arr))
+    if pc.any(non_ascii).as_py():
+        raw = arr.filter(non_ascii).to_pylist()
+        fixed = pa.array([clean_string(v) for v in raw], type=pa.large_string())
+        cleaned = pc.replace_with_mask(cleaned, non_ascii, fixed)
+
+    return pd.Series(pd.arrays.ArrowStringArray(cleaned.cast(pa.string())), index=values.index)
+
+
+def normalize_artists(values: pd.Series) -> pd.Series:
+    """
+    Normalize Spotify's stringified artist lists such as "['A', 'B']".
+
+    Brackets and quotes are punctuation, so clean_string() already drops them;
+    missing values become "nan" because the original loop called str() on them.
+    """
+    return normalize_text(values, na_value="nan")
+
+
+def rules_version() -> str:
+    """Identifies the current normalization rules, stored with the on-disk cache"""
+    return f"{RULES_VERSION}:{NON_WORD.pattern}:{SPACE_RUN.pattern}"
+
+
+class NormalizationCache:
+    """
+    Raw string -> normalized key mapping that survives between runs.
+
+    normalize() factorizes a column, looks its distinct values up in the
+    cache, runs normalize_text() only on the ones it hasn't seen and
+    broadcasts the keys back to every row. The cache is a two-column Parquet
+    file tagged with rules_version(); a file written under other rules is ignored.
+    """
+
+    def __init__(self, path: Path | None = None):
+        self.path = Path(path) if path is not None else None
+        self.raw = pd.Index([], dtype=object)
+        self.clean = np.array([], dtype=object)
+        self.hits = 0
+        self.misses = 0
+        self.changed = False
+
+    @classmethod
+    def load(cls, path: Path) -> "NormalizationCache":
+        cache = cls(path)
+        path = Path(path)
+        if path.exists():
+            table = pq.read_table(path)
+            metadata = table.schema.metadata or {}
+            if metadata.get(b"rules_version", b"").decode() == rules_version():
+                cache.raw = pd.Index(table.column("raw").to_numpy(zero_copy_only=False), dtype=object)
+                cache.clean = table.column("clean").to_numpy(zero_copy_only=False)
+        return cache
+
+    def __len__(self):
+        return len(self.raw)
+
+    def normalize(self, values: pd.Series, na_value: str = "") -> pd.Series:
+        """Same result as normalize_text(values, na_value), computed once per unseen distinct value"""
+        codes, uniques = pd.factorize(values.fillna(na_value))
+        uniques = pd.Index(uniques, dtype=object).astype(str)
+
+        positions = self.raw.get_indexer(uniques)
+        unseen = positions == -1
+        self.hits += int((~unseen).sum())
+        self.misses += int(unseen.sum())
+
+        clean = np.empty(len(uniques), dtype=object)
+        clean[~unseen] = self.clean[positions[~unseen]]
+        if unseen.any():
+            new_raw = uniques[unseen]
+            new_clean = normalize_text(pd.Series(new_raw, dtype=object)).to_numpy(dtype=object)
+            clean[unseen] = new_clean
+            self.raw = self.raw.append(new_raw)
+            self.clean = np.concatenate([self.clean, new_clean])
+            self.changed = True
+
+        keys = pa.array(clean, type=pa.string()).take(pa.array(codes))
+        return pd.Series(pd.arrays.ArrowStringArray(keys), index=values.index)
+
+    def save(self) -> bool:
+        """Write the cache to disk if anything new was added, returns whether it wrote"""
+        if self.path is None or not self.changed:
+            return False
+        table = pa.table(
+            {
+                "raw": pa.array(self.raw.to_numpy(), type=pa.string()),
+                "clean": pa.array(self.clean, type=pa.string()),
+            },
+            metadata={"rules_version": rules_version()},
+        )
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        pq.write_table(table, self.path)
+        self.changed = False
+        return True
@@ -0,0 +1,196 @@
+"""
+Quality profiles cached per chart year, so reruns only profile what changed.
+
+The integrated table is split into partitions by chart year (the year of
+Date). Each partition gets a content hash and a StreamingProfile (null counts,
+running moments and a quantile sketch per column, see streaming_stats.py).
+The profiles are saved in profile_cache.parquet next to their hashes; on the
+next run only years whose hash changed (usually the latest one, after new
+chart weeks) are profiled again, and the dataset-level profile is the merge of
+all the yearly ones. The yearly profiles also give a drift table: how far each
+year's feature means are from the whole dataset's.
+
+Merged quartiles come from the sketches, so like the --chunk-size mode they
+are within streaming_stats.rank_error() of the exact ones; the merge always
+runs in year order, so the numbers don't depend on which years came from the
+cache.
+"""
+
+import hashlib
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from storage import PROCESSED_DIR
+from streaming_stats import DEFAULT_K, QuantileSketch, StreamingProfile
+
+PROFILE_CACHE_PATH = PROCESSED_DIR / "profile_cache.parquet"
+
+# Bump when the cached statistics change so old caches are ignored
+PROFILE_CACHE_VERSION = 1
+
+# Partition label for rows without a chart date
+UNKNOWN_YEAR = -1
+
+
+def chart_years(df: pd.DataFrame) -> pd.Series:
+    """Chart year of every row (UNKNOWN_YEAR where Date is missing)"""
+    return df["Date"].dt.year.fillna(UNKNOWN_YEAR).astype(np.int32)
+
+
+def partition_hashes(df: pd.DataFrame, years: pd.Series) -> dict:
+    """
+    year -> sha256 of that year's rows: the column names and dtypes plus a
+    64-bit hash of every row's values (by content, also for categoricals),
+    all rows hashed in one go
+    """
+    header = repr([(col, str(df[col].dtype)) for col in df.columns]).encode()
+    row_hashes = pd.util.hash_pandas_object(df, index=False).to_numpy()
+    hashes = {}
+    for year, rows in pd.Series(row_hashes).groupby(years.to_numpy(), sort=True).indices.items():
+        digest = hashlib.sha256(header)
+        digest.update(row_hashes[rows].tobytes())
+        hashes[int(year)] = digest.hexdigest()
+    return hashes
+
+
+def save_profiles(profiles: dict, hashes: dict, path: Path = PROFILE_CACHE_PATH):
+    """Write the yearly profiles, one row per year and column (sketch levels concatenated, with their sizes)"""
+    rows = []
+    for year in sorted(profiles):
+        stream = profiles[year]
+        numeric = {col: i for i, col in enumerate(stream.numeric)}
+        for j, col in enumerate(stream.columns):
+            row = {"year": year, "hash": hashes[year], "rows": stream.rows, "column": col, "nulls": int(stream.nulls[j])}
+            if col in numeric:
+                i = numeric[col]
+                sketch = stream.sketches[i]
+                row.update({
+                    "count": int(stream.count[i]), "mean": float(stream.mean[i]), "m2": float(stream.m2[i]),
+                    "min": float(sketch.min), "max": float(sketch.max),
+                    "values": np.concatenate(sketch.levels).tolist(),
+                    "level_sizes": [len(values) for values in sketch.levels],
+                })
+            rows.append(row)
+
+    schema = pa.schema([
+        ("year", pa.int32()), ("hash", pa.string()), ("rows", pa.int64()), ("column", pa.string()),
+        ("nulls", pa.int64()), ("count", pa.int64()), ("mean", pa.float64()), ("m2", pa.float64()),
+        ("min", pa.float64()), ("max", pa.float64()),
+        ("values", pa.list_(pa.float64())), ("level_sizes", pa.list_(pa.int32())),
+    ], metadata={"version": str(PROFILE_CACHE_VERSION), "k": str(DEFAULT_K)})
+    table = pa.Table.from_pylist(rows, schema=schema)
+    Path(path).parent.mkdir(parents=True, exist_ok=True)
+    pq.write_table(table, path)
+
+
+def load_profiles(path: Path = PROFILE_CACHE_PATH):
+    """The cached (profiles, hashes) by year, both empty if there is no usable cache"""
+    path = Path(path)
+    if not path.exists():
+        return {}, {}
+    table = pq.read_table(path)
+    metadata = {k.decode(): v.decode() for k, v in (table.schema.metadata or {}).items()}
+    if metadata.get("version") != str(PROFILE_CACHE_VERSION) or metadata.get("k") != str(DEFAULT_K):
+        print("Profile cache was written by another version, profiling every year again")
+        return {}, {}
+
+    # Sketch values as one flat array, row i's values from offsets[i] to offsets[i + 1]
+    values = table.column("values").combine_chunks()
+    offsets = values.offsets.to_numpy()
+    flat = values.values.to_numpy()
+    columns = {name: table.column(name).to_numpy(zero_copy_only=False) for name in table.column_names if name != "values"}
+    has_sketch = table.column("level_sizes").is_valid().to_numpy(zero_copy_only=False)
+
+    # Rows are saved year by year, so every year is one slice
+    years, starts = np.unique(columns["year"], return_index=True)
+    ends = list(starts[1:]) + [table.num_rows]
+    profiles, hashes = {}, {}
+    for year, first, last in zip(years, starts, ends):
+        rows = np.arange(first, last)
+        numeric = rows[has_sketch[first:last]]
+        stream = StreamingProfile()
+        stream.columns = list(columns["column"][rows])
+        stream.numeric = list(columns["column"][numeric])
+        stream.rows = int(columns["rows"][first])
+        stream.nulls = columns["nulls"][rows].astype(np.int64)
+        stream.count = columns["count"][numeric].astype(np.int64)
+        stream.mean = columns["mean"][numeric].astype(np.float64)
+        stream.m2 = columns["m2"][numeric].astype(np.float64)
+        stream.sketches = [
+            QuantileSketch.from_levels(
+                np.split(flat[offsets[row]:offsets[row + 1]], np.cumsum(columns["level_sizes"][row])[:-1]),
+                columns["min"][row], columns["max"][row], seed=i,
+            )
+            for i, row in enumerate(numeric)
+        ]
+        profiles[int(year)] = stream
+        hashes[int(year)] = columns["hash"][first]
+    return profiles, hashes
+
+
+def yearly_profiles(df: pd.DataFrame, path: Path = PROFILE_CACHE_PATH) -> dict:
+    """
+    StreamingProfile of every chart year of df, from the cache where the
+    year's content hash is unchanged. Saves the updated cache.
+    """
+    start = time.perf_counter()
+    cached, cached_hashes = load_profiles(path)
+    years = chart_years(df)
+    hashes = partition_hashes(df, years)
+    profiles = {}
+    reprofiled = []
+    for year, rows in df.groupby(years, sort=True).indices.items():
+        year = int(year)
+        if cached_hashes.get(year) == hashes[year] and cached[year].columns == list(df.columns):
+            profiles[year] = cached[year]
+            continue
+        profiles[year] = StreamingProfile()
+        profiles[year].update(df.iloc[rows])
+        reprofiled.append(year)
+
+    if reprofiled or set(cached_hashes) != set(hashes):
+        save_profiles(profiles, hashes, path)
+    changed = ", ".join(str(y) for y in reprofiled[:10]) + (", ..." if len(reprofiled) > 10 else "")
+    print(f"Profile cache: {len(reprofiled)} of {len(profiles)} chart years profiled"
+          + (f" ({changed})" if reprofiled else "")
+          + f", {len(profiles) - len(reprofiled)} from cache, {time.perf_counter() - start:.2f}s")
+    return profiles
+
+
+def merge_profiles(profiles: dict) -> StreamingProfile:
+    """The dataset-level profile: all the yearly ones merged in year order"""
+    merged = StreamingProfile()
+    merged.merge(*[profiles[year] for year in sorted(profiles)])
+    return merged
+
+
+def drift_table(profiles: dict, merged: StreamingProfile, columns: list) -> pd.DataFrame:
+    """
+    One row per chart year: its rows, missing cells (%), the mean of each of
+    `columns`, and the largest shift of those means from the dataset mean in
+    dataset standard deviations (with the column it is in).
+    """
+    # Only the moments are needed, straight from the profiles (no quantile queries)
+    positions = [merged.numeric.index(col) for col in columns]
+    overall_mean = pd.Series(merged.mean[positions], index=columns)
+    overall_std = pd.Series(np.sqrt(merged.m2[positions] / np.maximum(merged.count[positions] - 1, 1)), index=columns).replace(0, np.nan)
+
+    rows = []
+    for year in sorted(profiles):
+        stream = profiles[year]
+        means = pd.Series(np.where(stream.count[positions] > 0, stream.mean[positions], np.nan), index=columns)
+        shift = ((means - overall_mean) / overall_std).abs()
+        rows.append({
+            "year": year,
+            "rows": stream.rows,
+            "missing_pct": round(stream.nulls.sum() / (stream.rows * len(stream.columns)) * 100, 2),
+            **means.round(4).to_dict(),
+            "max_shift": round(shift.max(), 3),
+            "most_shifted": shift.idxmax() if shift.notna().any() else None,
+        })
+    return pd.DataFrame(rows).set_index("year")
@@ -0,0 +1,163 @@
+"""
+Single-pass column profiler for the quality stage.
+
+assess_quality() used to scan the table once per statistic: isnull() for the
+missing values (three times), one comparison per range check, describe(),
+and two quantile() calls per column for the IQR outliers. profile() gets all
+of it from one NumPy block per dtype instead (columns contiguous, so each
+reduction runs down a column the way it does on a single Series), plus one
+sort of the block for the order statistics:
+
+- null counts for every column
+- count, mean, std, min, quartiles and max (the describe() statistics)
+- rows outside an expected [low, high] range
+- IQR fences and the number of rows outside them
+
+Sums and quartiles are taken in each column's own dtype with the same NumPy
+reductions pandas uses, so the numbers match describe() and quantile() exactly
+and the quality report doesn't change.
+"""
+
+import numpy as np
+import pandas as pd
+
+# Statistics describe() reports, in its order
+DESCRIBE_STATS = ["count", "mean", "std", "min", "25%", "50%", "75%", "max"]
+
+QUARTILES = [25, 50, 75]
+
+# Rows further than this many IQRs below Q1 or above Q3 count as outliers
+IQR_FACTOR = 1.5
+
+
+def numeric_blocks(df: pd.DataFrame):
+    """
+    Numeric columns of df grouped into 2D blocks, one per float dtype.
+
+    float32 and float64 columns keep their dtype, integer columns go in the
+    float64 block (exact for the small ints the pipeline uses) with missing
+    values as NaN. Blocks are Fortran-ordered so every column is contiguous.
+    Yields (column names, block) pairs.
+    """
+    groups = {}
+    for col in df.columns:
+        dtype = df[col].dtype
+        if pd.api.types.is_bool_dtype(dtype) or not pd.api.types.is_numeric_dtype(dtype):
+            continue
+        target = np.dtype(np.float32) if dtype == np.float32 else np.dtype(np.float64)
+        groups.setdefault(target, []).append(col)
+
+    for dtype, cols in groups.items():
+        block = np.empty((len(df), len(cols)), dtype=dtype, order="F")
+        for i, col in enumerate(cols):
+            block[:, i] = df[col].to_numpy(dtype=dtype, na_value=np.nan)
+        yield cols, block
+
+
+def sorted_percentiles(ordered: np.ndarray, count: np.ndarray, percentiles) -> np.ndarray:
+    """
+    np.percentile() of each row of `ordered`, whose first count[i] values are
+    row i's values in ascending order. Same linear interpolation, step for
+    step, so the results are identical; shape (len(percentiles), rows).
+    """
+    q = np.true_divide(percentiles, 100)
+    virtual = (count[:, None] - 1) * q
+    previous = np.floor(virtual)
+    gamma = virtual - previous
+    previous = np.clip(previous, 0, None).astype(np.intp)
+    following = np.clip(np.minimum(previous + 1, count[:, None] - 1), 0, None)
+
+    rows = np.arange(len(ordered))[:, None]
+    low, high = ordered[rows, previous], ordered[rows, following]
+    diff = high - low
+    result = low + diff * gamma
+    upper = gamma >= 0.5
+    result[upper] = (high - diff * (1 - gamma))[upper]
+    result[count == 0] = np.nan
+    return result.T
+
+
+def profile_block(block: np.ndarray, low: np.ndarray, high: np.ndarray) -> dict:
+    """All the profile statistics for the columns of one block, as arrays"""
+    n = block.shape[0]
+    missing = np.isnan(block)
+    nulls = missing.sum(axis=0)
+    count = n - nulls
+    has_values = count > 0
+
+    # Moments the way pandas' nanmean / nanstd compute them: the sum in the column dtype for the mean,
+    # a float64 sum and squared deviations for the variance, the result cast back to the column dtype
+    size = count.astype(block.dtype)
+    filled = np.where(missing, 0, block) if nulls.any() else block
+    with np.errstate(invalid="ignore", divide="ignore"):
+        mean = filled.sum(axis=0) / size
+        center = filled.sum(axis=0, dtype=np.float64) / size
+        squares = (center - filled) ** 2
+        if nulls.any():
+            squares[missing] = 0
+        variance = squares.sum(axis=0, dtype=np.float64) / (size - 1)
+        std = np.sqrt(variance.astype(block.dtype))
+
+    # Order statistics from one sort per column (rows of the transposed block, missing values sort last)
+    ordered = np.sort(block.T, axis=1)
+    quartiles = sorted_percentiles(ordered, count, QUARTILES)
+    last = np.maximum(count - 1, 0)
+
+    iqr = quartiles[2] - quartiles[0]
+    lower_fence = quartiles[0] - IQR_FACTOR * iqr
+    upper_fence = quartiles[2] + IQR_FACTOR * iqr
+    if block.dtype == np.float32 and nulls.any():
+        # pandas returns the quantiles of a float32 column with missing values as float32 (without
+        # any, as float64), so those quartiles and the fences taken from them are float32 arithmetic
+        rounded = nulls > 0
+        q = quartiles[:, rounded].astype(np.float32)
+        quartiles[:, rounded] = q
+        lower_fence[rounded] = q[0] - np.float32(IQR_FACTOR) * (q[2] - q[0])
+        upper_fence[rounded] = q[2] + np.float32(IQR_FACTOR) * (q[2] - q[0])
+
+    return {
+        "count": count.astype(np.float64),
+        "mean": np.where(has_values, mean, np.nan),
+        "std": np.where(count > 1, std, np.nan),
+        "min": np.where(has_values, ordered[:, 0], np.nan),
+        "25%": quartiles[0],
+        "50%": quartiles[1],
+        "75%": quartiles[2],
+        "max": np.where(has_values, ordered[np.arange(len(count)), last], np.nan),
+        "range_violations": ((block < low) | (block > high)).sum(axis=0),
+        "lower_fence": lower_fence,
+        "upper_fence": upper_fence,
+        "outliers": ((block < lower_fence) | (block > upper_fence)).sum(axis=0),
+        "nulls": nulls,
+    }
+
+
+def profile(df: pd.DataFrame, ranges: dict | None = None) -> pd.DataFrame:
+    """
+    Profile every column of df in one pass per dtype.
+
+    `ranges` maps column names to their expected (low, high) bounds. Returns
+    one row per column: `nulls` for every column, and for numeric columns the
+    describe() statistics, `range_violations`, the IQR fences and `outliers`
+    (NaN statistics and zero counts for non-numeric columns).
+    """
+    ranges = ranges or {}
+    stats = []
+    for cols, block in numeric_blocks(df):
+        low = np.array([ranges.get(c, (np.nan, np.nan))[0] for c in cols], dtype=np.float64)
+        high = np.array([ranges.get(c, (np.nan, np.nan))[1] for c in cols], dtype=np.float64)
+        stats.append(pd.DataFrame(profile_block(block, low, high), index=cols))
+
+    numeric = [c for s in stats for c in s.index]
+    others = [c for c in df.columns if c not in numeric]
+    stats.append(pd.DataFrame({"nulls": [int(df[c].isna().sum()) for c in others]}, index=others))
+
+    result = pd.concat(stats).reindex(df.columns)
+    # pandas takes the std of a nullable integer column over its values without the missing ones,
+    # a sum in another order than down the zero-filled block, so those few columns get pandas' own
+    for col in numeric:
+        if isinstance(df[col].array, pd.arrays.IntegerArray) and result.loc[col, "nulls"] > 0:
+            result.loc[col, "std"] = df[col].std()
+    for col in ["nulls", "range_violations", "outliers"]:
+        result[col] = result[col].fillna(0).astype(np.int64)
+    return result
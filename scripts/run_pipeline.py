@@ -0,0 +1,106 @@
+"""
+Run the pipeline stages 02 to 05 in one process, passing the tables between them in memory.
+
+Run one after another, every script writes its whole output table and the next
+one reads it back: 03_data_quality and 04_data_cleaning both read
+integrated_data.parquet, 05_data_analysis reads cleaned_data.parquet.
+run_pipeline() imports the stage functions instead and hands each stage the
+DataFrame the previous one returned, so each table is built once and only
+written to disk when asked for. The reports and logs of every stage
+(integration_summary.txt, quality_report.txt/.json, cleaning_log.txt and
+results/) are written as usual, and so is everything needed to use the
+trained models later: the saved models, the cleaning plan and the duplicate
+index. The normalization cache and artist index of integration are caches
+and are kept up to date too.
+
+Run from the project root after 01_data_retrieval.py:
+    python scripts/run_pipeline.py                        # 02 -> 05 in memory
+    python scripts/run_pipeline.py --save-intermediates   # also write integrated_data and cleaned_data
+    python scripts/run_pipeline.py --from-integrated      # skip 02, load integrated_data.parquet once and
+                                                          # run quality and cleaning off that one frame
+"""
+
+import argparse
+import importlib
+import time
+
+from storage import PROCESSED_DIR, read_table
+from fuzzy_matching import DEFAULT_THRESHOLD
+
+integration = importlib.import_module("02_data_integration")
+quality = importlib.import_module("03_data_quality")
+cleaning = importlib.import_module("04_data_cleaning")
+analysis = importlib.import_module("05_data_analysis")
+
+
+def run_pipeline(save_intermediates=False, from_integrated=False, export_csv=False, fuzzy=False,
+                 fuzzy_threshold=DEFAULT_THRESHOLD, workers=1, profile_cache=False, cores=None,
+                 retrain=False):
+    """
+    Integrate, assess, clean and analyze with the tables kept in memory.
+    Returns the analysis results and the time each stage took
+    """
+    timings = {}
+
+    def timed(stage, func, *args, **kwargs):
+        start = time.perf_counter()
+        result = func(*args, **kwargs)
+        timings[stage] = time.perf_counter() - start
+        return result
+
+    if from_integrated:
+        integrated = timed("load integrated data", read_table, PROCESSED_DIR / "integrated_data.parquet")
+    else:
+        integrated = timed(
+            "integration", integration.integrate_data,
+            export_csv=export_csv, fuzzy=fuzzy, fuzzy_threshold=fuzzy_threshold, workers=workers,
+            save=save_intermediates,
+        )
+
+    #Quality and cleaning both work off the same integrated frame (neither changes it)
+    timed("quality", quality.assess_quality, profile_cache=profile_cache, df=integrated)
+    cleaned = timed("cleaning", cleaning.clean_data, export_csv=export_csv, df=integrated, save=save_intermediates)
+    results = timed("analysis", analysis.analyze_data, df=cleaned, cores=cores, retrain=retrain)
+
+    print("\nPipeline stage times:")
+    for stage, seconds in timings.items():
+        print(f"  {stage:<22}{seconds:>8.2f}s")
+    print(f"  {'total':<22}{sum(timings.values()):>8.2f}s")
+    if not save_intermediates:
+        print("Intermediate tables were kept in memory only (use --save-intermediates to write them); "
+              "the models, cleaning plan and duplicate index were saved")
+    return results, timings
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run integration, quality, cleaning and analysis in one process")
+    parser.add_argument("--save-intermediates", action="store_true",
+                        help="also write integrated_data.parquet and cleaned_data.parquet")
+    parser.add_argument("--from-integrated", action="store_true",
+                        help="skip integration, load the saved integrated_data.parquet once for quality and cleaning")
+    parser.add_argument("--csv", action="store_true", help="also export the intermediates as CSV (with --save-intermediates)")
+    parser.add_argument("--fuzzy", action="store_true", help="also match songs whose title or artist differ slightly")
+    parser.add_argument("--fuzzy-threshold", type=float, default=DEFAULT_THRESHOLD,
+                        help=f"minimum similarity for a fuzzy match (default {DEFAULT_THRESHOLD})")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="match hash partitions of the data in this many processes (default 1)")
+    parser.add_argument("--profile-cache", action="store_true",
+                        help="merge the quality profile from per chart year profiles cached between runs")
+    parser.add_argument("--cores", type=int, default=None,
+                        help="cores to train the analysis models with (default: all)")
+    parser.add_argument("--retrain", action="store_true",
+                        help="train every analysis model again instead of loading the ones saved in models/")
+    args = parser.parse_args()
+    if args.csv and not args.save_intermediates:
+        parser.error("--csv needs --save-intermediates")
+    run_pipeline(
+        save_intermediates=args.save_intermediates,
+        from_integrated=args.from_integrated,
+        export_csv=args.csv,
+        fuzzy=args.fuzzy,
+        fuzzy_threshold=args.fuzzy_threshold,
+        workers=args.workers,
+        profile_cache=args.profile_cache,
+        cores=args.cores,
+        retrain=args.retrain,
+    )
@@ -0,0 +1,141 @@
+"""
+Compact in-memory dtypes for the integrated and cleaned tables.
+
+Integration, quality, cleaning and analysis all call compact() on the tables
+they hold, so every stage keeps the same small representation:
+
+- repeated strings (Song, Artist, ...) as categoricals
+- the bounded [0, 1] audio features as float32
+- rank, key, mode and the other small counts as int8/int16
+- Date as a native datetime
+
+Unbounded measurements (loudness, tempo) stay float64, since cleaning caps
+them at percentiles and float32 would move those cut points.
+
+On disk the tables keep plain types (categoricals are written as strings, see
+storage.py), so files written in one piece or in chunks read back the same.
+"""
+
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+# Features Spotify defines on [0, 1]
+BOUNDED_FEATURES = ['acousticness', 'danceability', 'energy', 'instrumentalness',
+                    'liveness', 'speechiness', 'valence']
+
+# Target dtype per column. Integer columns get the nullable version (Int8, ...) when
+# they have missing values, and a wider type if their values don't fit.
+COLUMN_DTYPES = {
+    "Date": "datetime64",
+    "Song": "category",
+    "Artist": "category",
+    "release_date": "category",
+    "Rank": "int8",
+    "Last Week": "int8",
+    "Peak Position": "int8",
+    "Weeks in Charts": "int16",
+    "duration_ms": "int32",
+    "year": "int16",
+    "popularity": "int8",
+    "mode": "int8",
+    "key": "int8",
+    "explicit": "int8",
+    "reached_top_10": "int8",
+    "reached_top_1": "int8",
+    "match_confidence": "float32",
+    **{feature: "float32" for feature in BOUNDED_FEATURES},
+    "loudness": "float64",
+    "tempo": "float64",
+}
+
+INT_TYPES = ["int8", "int16", "int32", "int64"]
+
+
+def smallest_int(values: pd.Series, dtype: str) -> str:
+    """`dtype`, or the next wider integer type if the values don't fit in it"""
+    if values.notna().any():
+        low, high = values.min(), values.max()
+        for candidate in INT_TYPES[INT_TYPES.index(dtype):]:
+            info = np.iinfo(candidate)
+            if info.min <= low and high <= info.max:
+                dtype = candidate
+                break
+        else:
+            dtype = "int64"
+    return dtype if not values.isna().any() else dtype.capitalize()
+
+
+def compact_column(values: pd.Series, dtype: str) -> pd.Series:
+    """Cast one column to its compact dtype"""
+    is_text = pd.api.types.is_string_dtype(values) or pd.api.types.is_object_dtype(values)
+
+    if dtype == "datetime64":
+        return values if pd.api.types.is_datetime64_any_dtype(values) else pd.to_datetime(values)
+    if dtype == "category" or (dtype in INT_TYPES and is_text):
+        # Integer columns that still hold text (e.g. '-' in Last Week before cleaning) are repeated strings too
+        return values.astype("category") if is_text else values
+    if dtype in INT_TYPES:
+        if pd.api.types.is_float_dtype(values) and not (values.dropna() % 1 == 0).all():
+            return values
+        return values.astype(smallest_int(values, dtype))
+    return values.astype(dtype)
+
+
+def compact(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Return df with every known column in its compact dtype.
+
+    Columns not in COLUMN_DTYPES are left alone, except text columns with
+    mostly repeated values, which become categoricals.
+    Columns are replaced, never changed in place, so the copy is shallow:
+    columns already in their compact dtype are shared with the input.
+    """
+    df = df.copy(deep=False)
+    for col in df.columns:
+        if isinstance(df[col].dtype, pd.CategoricalDtype):
+            continue
+        if col in COLUMN_DTYPES:
+            df[col] = compact_column(df[col], COLUMN_DTYPES[col])
+        elif pd.api.types.is_string_dtype(df[col]) and df[col].nunique() < len(df) / 2:
+            df[col] = df[col].astype("category")
+    return df
+
+
+def memory_mb(df: pd.DataFrame) -> float:
+    """Memory a frame holds, in MB, counting the strings themselves"""
+    return df.memory_usage(deep=True).sum() / 1024 ** 2
+
+
+def memory_report(stage: str, before_mb: float, after_mb: float) -> str:
+    """One line comparing a stage's memory before and after compact()"""
+    saved = (1 - after_mb / before_mb) * 100 if before_mb else 0.0
+    return f"Memory ({stage}): {before_mb:.1f} MB -> {after_mb:.1f} MB ({saved:.0f}% less)"
+
+
+def process_memory_mb():
+    """
+    (current, peak) resident memory of this process in MB. Either is None
+    where the OS doesn't report it (current is read from /proc on Linux, the
+    peak from getrusage, which Windows doesn't have)
+    """
+    current = peak = None
+    try:
+        with open("/proc/self/statm") as f:
+            current = int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 1024 ** 2
+    except (OSError, ValueError, AttributeError):
+        pass
+    if resource is not None:
+        # ru_maxrss is in KB on Linux, bytes on macOS
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / (1024 ** 2 if sys.platform == "darwin" else 1024)
+        if current is not None:
+            # The two are sampled differently, the peak can't be below what is in use now
+            peak = max(peak, current)
+    return current, peak
@@ -0,0 +1,126 @@
+"""
+Score every track of the Spotify catalog with a trained analysis model.
+
+Loads a model saved by 05_data_analysis.py (see model_store.py) with its
+scaler and feature columns, and reads the catalog in chunks. Each chunk is
+cleaned with the saved cleaning plan (fill medians, outlier caps, [0,1]
+clipping, as the training rows were), gets the engineered features of
+features.py, and is scored for the probability of reaching the Top 10.
+The result is written as a two-column Parquet table: track id and probability.
+Tracks missing an audio feature the cleaning treats as critical (danceability,
+energy, loudness) get a missing probability instead of an invented one.
+
+With --workers N the chunks are scored in N processes. At most two chunks per
+worker are read ahead, and results are written in catalog order as they come
+back, so memory depends on the chunk size and not on the catalog size.
+
+Run from the project root after 05_data_analysis.py:
+    python scripts/score_catalog.py
+    python scripts/score_catalog.py --model "Gradient Boosting Classifier" --workers 4 --chunk-size 50000
+"""
+
+import argparse
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+from threadpoolctl import threadpool_limits
+
+from storage import RAW_DIR, TableWriter, iter_table, table_columns
+from schema import process_memory_mb
+from cleaning_plan import CleaningPlan
+from features import add_features
+from model_store import MODEL_DIR, load_artifact
+
+CATALOG_PATH = RAW_DIR / "spotify_songs.parquet"
+SCORES_PATH = Path("results/catalog_scores.parquet")
+
+# Chunks read ahead per worker before the oldest one has to come back
+CHUNKS_IN_FLIGHT = 2
+
+# The model, scaler, feature columns and cleaning plan of a scoring process
+_scorer = None
+
+
+def _load_scorer(label, model_dir, workers):
+    """Load the model artifact and the cleaning plan once per process"""
+    global _scorer
+    artifact = load_artifact(label, model_dir)
+    model = artifact["model"]
+    if workers > 1 and "n_jobs" in model.get_params():
+        # Chunks are already spread over the processes, one thread each
+        model.set_params(n_jobs=1)
+    _scorer = (model, artifact["scaler"], artifact["feature_cols"], CleaningPlan.load(), workers)
+
+
+def score_chunk(chunk: pd.DataFrame) -> pd.DataFrame:
+    """Track ids of a catalog chunk with their top-10 probability (missing for tracks that can't be cleaned)"""
+    model, scaler, feature_cols, plan, workers = _scorer
+    probability = np.full(len(chunk), np.nan)
+    cleaned = plan.transform(chunk.reset_index(drop=True))
+    if len(cleaned):
+        X = scaler.transform(add_features(cleaned)[feature_cols])
+        with threadpool_limits(limits=1 if workers > 1 else None):
+            probability[cleaned.index.to_numpy()] = model.predict_proba(X)[:, 1]
+    return pd.DataFrame({"id": chunk["id"].to_numpy(), "probability": probability})
+
+
+def score_catalog(label="Random Forest", input_path=CATALOG_PATH, output_path=SCORES_PATH,
+                  chunk_size=100_000, workers=1, model_dir=MODEL_DIR):
+    """
+    Score the catalog chunk by chunk with the saved model `label` and write
+    id -> probability to output_path. Returns the number of tracks scored per second
+    """
+    _load_scorer(label, model_dir, workers)
+    _, _, feature_cols, plan, _ = _scorer
+    print(f"Scoring {input_path} with the saved {label} ({len(feature_cols)} features), "
+          f"{chunk_size:,} tracks per chunk, {workers} worker{'s' if workers > 1 else ''}")
+    # Only the columns the cleaning plan or the model use are read
+    needed = {"id", *plan.medians, *plan.bounds, *feature_cols}
+    columns = [col for col in table_columns(input_path) if col in needed]
+
+    start = time.perf_counter()
+    tracks = unscored = 0
+    with TableWriter(output_path) as writer:
+        def write(scores):
+            nonlocal tracks, unscored
+            writer.write(scores)
+            tracks += len(scores)
+            unscored += int(scores["probability"].isna().sum())
+
+        if workers == 1:
+            for chunk in iter_table(input_path, columns=columns, chunk_size=chunk_size):
+                write(score_chunk(chunk))
+        else:
+            with ProcessPoolExecutor(max_workers=workers, initializer=_load_scorer,
+                                     initargs=(label, model_dir, workers)) as pool:
+                pending = []
+                for chunk in iter_table(input_path, columns=columns, chunk_size=chunk_size):
+                    pending.append(pool.submit(score_chunk, chunk))
+                    # Keep the read-ahead bounded, writing the oldest chunk first so the output stays in catalog order
+                    if len(pending) >= workers * CHUNKS_IN_FLIGHT:
+                        write(pending.pop(0).result())
+                for future in pending:
+                    write(future.result())
+    seconds = time.perf_counter() - start
+
+    current, peak = process_memory_mb()
+    print(f"Scored {tracks - unscored:,} of {tracks:,} tracks in {seconds:.2f}s "
+          f"({tracks / max(seconds, 1e-9):,.0f} tracks/s), {unscored:,} missing a critical audio feature")
+    print(f"Peak memory of this process: {peak:.0f} MB" if peak is not None else "Peak memory: n/a")
+    print(f"Scores saved to: {output_path}")
+    return tracks / max(seconds, 1e-9)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Score the Spotify catalog for top-10 probability with a saved model")
+    parser.add_argument("--model", default="Random Forest",
+                        help="label of the saved model to score with (default: Random Forest)")
+    parser.add_argument("--input", default=CATALOG_PATH, help=f"catalog to score (default {CATALOG_PATH})")
+    parser.add_argument("--output", default=SCORES_PATH, help=f"where to write id -> probability (default {SCORES_PATH})")
+    parser.add_argument("--chunk-size", type=int, default=100_000, help="tracks scored at a time (default 100000)")
+    parser.add_argument("--workers", type=int, default=1, help="score chunks in this many processes (default 1)")
+    args = parser.parse_args()
+    score_catalog(args.model, args.input, args.output, chunk_size=args.chunk_size, workers=args.workers)
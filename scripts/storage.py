@@ -0,0 +1,383 @@
+"""
+Shared storage helpers for the pipeline.
+
+The stages pass tables to each other as Parquet files instead of CSV, so
+dtypes are stored once (no re-inferring, no re-parsing dates) and each stage
+can read only the columns it needs. CSV export is still available for
+anyone who wants to open the data in a spreadsheet.
+
+Tables that may not fit in memory can be read with iter_table() and written
+with TableWriter one chunk at a time. A table that rows get appended to
+(append_table()) becomes a directory of part files under the same name; the
+read helpers take either form.
+"""
+
+import operator
+import shutil
+from pathlib import Path
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+
+RAW_DIR = Path("data/raw")
+PROCESSED_DIR = Path("data/processed")
+
+# Smallest slice merge_sorted_runs() reads from one run at a time
+MIN_MERGE_BATCH = 1024
+
+# Row filter operators read_table() understands, the same ones pyarrow's Parquet filters take
+FILTER_OPS = {
+    "==": operator.eq, "!=": operator.ne, "<": operator.lt,
+    "<=": operator.le, ">": operator.gt, ">=": operator.ge,
+}
+
+# Bump when RAW_SCHEMAS changes so retrieval rebuilds the raw Parquet files
+STORAGE_VERSION = 1
+
+# Explicit dtypes for the raw Kaggle files, so they are parsed the same way every time.
+# Integer columns use pandas' nullable Int64 so a stray blank value doesn't break the load.
+RAW_SCHEMAS = {
+    "billboard_hot_100.csv": {
+        "dtypes": {
+            "rank": "Int64",
+            "song": str,
+            "artist": str,
+            "peak-rank": "Int64",
+            "weeks-on-board": "Int64",
+        },
+        # last-week is left to pandas: it can hold '-' for new entries, which cleaning turns into 0
+        "dates": ["date"],
+        "na_values": {},
+    },
+    "spotify_songs.csv": {
+        "dtypes": {
+            "id": str,
+            "name": str,
+            "artists": str,
+            "id_artists": str,
+            "release_date": str,
+            "popularity": "Int64",
+            "duration_ms": "Int64",
+            "explicit": "Int64",
+            "year": "Int64",
+            "key": "Int64",
+            "mode": "Int64",
+            "time_signature": "Int64",
+            "acousticness": "float64",
+            "danceability": "float64",
+            "energy": "float64",
+            "instrumentalness": "float64",
+            "liveness": "float64",
+            "loudness": "float64",
+            "speechiness": "float64",
+            "tempo": "float64",
+            "valence": "float64",
+        },
+        "dates": [],
+        "na_values": {},
+    },
+}
+
+
+def read_raw_csv(csv_path: Path, columns: list | None = None, chunk_size: int | None = None) -> pd.DataFrame:
+    """Read one of the raw Kaggle CSVs using its explicit schema (as an iterator of chunks if chunk_size is given)"""
+    csv_path = Path(csv_path)
+    schema = RAW_SCHEMAS.get(csv_path.name, {"dtypes": {}, "dates": [], "na_values": {}})
+
+    header = list(pd.read_csv(csv_path, nrows=0).columns)
+    usecols = [c for c in header if columns is None or c in columns]
+
+    return pd.read_csv(
+        csv_path,
+        usecols=usecols,
+        dtype={c: t for c, t in schema["dtypes"].items() if c in usecols},
+        parse_dates=[c for c in schema["dates"] if c in usecols],
+        na_values={c: v for c, v in schema["na_values"].items() if c in usecols},
+        chunksize=chunk_size,
+    )
+
+
+def convert_raw_to_parquet(csv_path: Path) -> Path:
+    """Convert a raw CSV into a typed Parquet file next to it and return its path"""
+    csv_path = Path(csv_path)
+    parquet_path = csv_path.with_suffix(".parquet")
+    read_raw_csv(csv_path).to_parquet(parquet_path, index=False)
+    return parquet_path
+
+
+def table_parts(parquet_path: Path) -> list:
+    """
+    The Parquet files of a stored table in row order: the file itself, or the
+    part files of a table append_table() turned into a directory
+    """
+    if parquet_path.is_dir():
+        return sorted(parquet_path.glob("part-*.parquet"))
+    return [parquet_path]
+
+
+def table_schema(parquet_path: Path) -> pa.Schema:
+    """Schema that holds the rows of every part (parts can compact a column to different types)"""
+    schemas = [pq.read_schema(part) for part in table_parts(parquet_path)]
+    if len(schemas) == 1:
+        return schemas[0]
+    return pa.unify_schemas(schemas, promote_options="permissive")
+
+
+def remove_table(parquet_path: Path):
+    """Delete a stored Parquet table before it is written again, part files and all"""
+    if parquet_path.is_dir():
+        shutil.rmtree(parquet_path)
+
+
+def cast_to(table: pa.Table, schema: pa.Schema) -> pa.Table:
+    """Cast the columns of `table` to their type in `schema`"""
+    return table.cast(pa.schema([schema.field(name) for name in table.column_names], metadata=schema.metadata))
+
+
+def table_columns(path: Path) -> list:
+    """Column names of a stored table, read from the Parquet footer (or the CSV header)"""
+    path = Path(path)
+    parquet_path = path.with_suffix(".parquet")
+    if parquet_path.exists():
+        return list(pq.read_schema(table_parts(parquet_path)[0]).names)
+    return list(pd.read_csv(path.with_suffix(".csv"), nrows=0).columns)
+
+
+def read_table(path: Path, columns: list | None = None, filters: list | None = None) -> pd.DataFrame:
+    """
+    Read a pipeline table, loading only `columns` if given.
+
+    `filters` keeps only the rows matching every (column, op, value) in it,
+    e.g. [("date", ">", cutoff)]; Parquet skips row groups that can't match.
+    Uses the Parquet file when it exists and falls back to the CSV with the
+    same name (e.g. processed data downloaded as CSV from Box).
+    """
+    path = Path(path)
+    parquet_path = path.with_suffix(".parquet")
+    if parquet_path.is_dir():
+        schema = table_schema(parquet_path)
+        parts = [pq.read_table(part, columns=columns, filters=filters) for part in table_parts(parquet_path)]
+        return pa.concat_tables([cast_to(part, schema) for part in parts]).to_pandas()
+    if parquet_path.exists():
+        return pd.read_parquet(parquet_path, columns=columns, filters=filters)
+
+    csv_path = path.with_suffix(".csv")
+    filter_cols = [c for c, _, _ in filters or []]
+    read_cols = None if columns is None else columns + [c for c in filter_cols if c not in columns]
+    if csv_path.parent == RAW_DIR:
+        df = read_raw_csv(csv_path, columns=read_cols)
+    else:
+        df = pd.read_csv(csv_path, usecols=read_cols)
+    for col, op, value in filters or []:
+        df = df[FILTER_OPS[op](df[col], value)]
+    return df if columns is None else df[[c for c in df.columns if c in columns]]
+
+
+def plain_types(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Categorical columns turned back into their plain values for writing.
+
+    Category sets depend on which rows a frame holds, so storing them would
+    make a table written in chunks read back differently from one written in
+    one piece. schema.compact() recreates them after reading.
+    """
+    categorical = {c: df[c].cat.categories.dtype for c in df.columns if isinstance(df[c].dtype, pd.CategoricalDtype)}
+    return df.astype(categorical) if categorical else df
+
+
+def write_table(df: pd.DataFrame, path: Path, export_csv: bool = False) -> Path:
+    """Write a pipeline table as Parquet (and optionally as CSV too) and return the Parquet path"""
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    parquet_path = path.with_suffix(".parquet")
+    df = plain_types(df)
+    remove_table(parquet_path)
+    df.to_parquet(parquet_path, index=False)
+    if export_csv:
+        df.to_csv(path.with_suffix(".csv"), index=False)
+    return parquet_path
+
+
+def append_table(df: pd.DataFrame, path: Path, export_csv: bool = False) -> Path:
+    """
+    Add rows to the end of a pipeline table and return the Parquet path.
+
+    A Parquet file can't be extended in place, so the table becomes a directory
+    of part files under the same name: the first append moves the single file
+    in as part-00000.parquet, and every append writes `df` as the next part.
+    The stored rows are never copied, and reading the directory gives them
+    back in order (see read_table()). The CSV copy is appended to directly; it
+    is written in full if export_csv asks for one that doesn't exist yet.
+    """
+    path = Path(path)
+    parquet_path = path.with_suffix(".parquet")
+    if not parquet_path.exists():
+        return write_table(df, path, export_csv=export_csv)
+
+    if not parquet_path.is_dir():
+        moved = parquet_path.with_name(parquet_path.stem + "_part.parquet")
+        parquet_path.replace(moved)
+        parquet_path.mkdir()
+        moved.replace(parquet_path / "part-00000.parquet")
+    part = parquet_path / f"part-{len(table_parts(parquet_path)):05d}.parquet"
+    plain_types(df).to_parquet(part, index=False)
+
+    csv_path = path.with_suffix(".csv")
+    if csv_path.exists():
+        plain_types(df).to_csv(csv_path, mode="a", header=False, index=False)
+    elif export_csv:
+        read_table(parquet_path).to_csv(csv_path, index=False)
+    return parquet_path
+
+
+def iter_table(path: Path, columns: list | None = None, chunk_size: int = 100_000):
+    """Like read_table(), but yields the table in chunks of at most `chunk_size` rows"""
+    path = Path(path)
+    parquet_path = path.with_suffix(".parquet")
+    if parquet_path.exists():
+        schema = table_schema(parquet_path)
+        for part in table_parts(parquet_path):
+            for batch in pq.ParquetFile(part).iter_batches(batch_size=chunk_size, columns=columns):
+                yield cast_to(pa.Table.from_batches([batch]), schema).to_pandas()
+        return
+
+    csv_path = path.with_suffix(".csv")
+    if csv_path.parent == RAW_DIR:
+        yield from read_raw_csv(csv_path, columns=columns, chunk_size=chunk_size)
+    else:
+        yield from pd.read_csv(csv_path, usecols=columns, chunksize=chunk_size)
+
+
+class TableWriter:
+    """
+    Write a pipeline table chunk by chunk, as Parquet (and optionally as CSV too).
+
+    Chunks are cast to the schema of the chunks written so far. A chunk that
+    doesn't fit it (a column that was all missing so far, integers that
+    compacted to a wider type) widens the schema to one that holds both, and
+    the rows already written are rewritten with it. The files come out the
+    same as write_table() on all the chunks concatenated.
+    """
+
+    def __init__(self, path: Path, export_csv: bool = False):
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self.parquet_path = path.with_suffix(".parquet")
+        self.csv_path = path.with_suffix(".csv") if export_csv else None
+        self.writer = None
+        self.rows = 0
+
+    def write(self, df):
+        """Append a chunk, either a DataFrame or an Arrow table read from another pipeline table"""
+        if isinstance(df, pa.Table):
+            table = df
+            df = table.to_pandas() if self.csv_path is not None else None
+        else:
+            df = plain_types(df)
+            table = pa.Table.from_pandas(df, preserve_index=False)
+        if self.writer is None:
+            remove_table(self.parquet_path)
+            self.writer = pq.ParquetWriter(self.parquet_path, table.schema)
+        elif not table.schema.equals(self.writer.schema):
+            schema = pa.unify_schemas([self.writer.schema, table.schema], promote_options="permissive")
+            if not schema.equals(self.writer.schema):
+                self.widen(schema)
+        self.writer.write_table(table.cast(self.writer.schema))
+
+        if self.csv_path is not None:
+            df.to_csv(self.csv_path, mode="w" if self.rows == 0 else "a", header=self.rows == 0, index=False)
+        self.rows += table.num_rows
+
+    def widen(self, schema: pa.Schema):
+        """Rewrite the rows written so far with a wider schema, and keep writing with it"""
+        self.writer.close()
+        written = self.parquet_path.with_name(self.parquet_path.stem + "_widen.parquet")
+        self.parquet_path.replace(written)
+        self.writer = pq.ParquetWriter(self.parquet_path, schema)
+        for batch in pq.ParquetFile(written).iter_batches():
+            self.writer.write_table(pa.Table.from_batches([batch]).cast(schema))
+        written.unlink()
+
+    def close(self) -> Path:
+        if self.writer is not None:
+            self.writer.close()
+        return self.parquet_path
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def merge_sorted_runs(run_paths: list, output_path: Path, key: str, chunk_size: int = 100_000,
+                      export_csv: bool = False) -> Path:
+    """
+    Merge Parquet files that are each sorted by `key` into one sorted table.
+
+    Rows with the same key keep the order of run_paths and then their order
+    inside each run, so the result is what a stable sort of all the runs
+    concatenated would give. Only about `chunk_size` rows (or MIN_MERGE_BATCH
+    per run, if that is more) are held at a time.
+    """
+    if not run_paths:
+        raise ValueError(f"No sorted runs to merge into {output_path}")
+    files = [pq.ParquetFile(p) for p in run_paths]
+    # Each run is read in slices of its share of chunk_size, but not so small that the merge loop dominates
+    batch_rows = max(MIN_MERGE_BATCH, chunk_size // len(files))
+    batches = [f.iter_batches(batch_size=batch_rows) for f in files]
+    # Runs written from different chunks can hold a column in different (compacted) types
+    schema = pa.unify_schemas([f.schema_arrow for f in files], promote_options="permissive")
+
+    current = [pa.Table.from_batches([], schema=schema) for _ in files]
+    done = [False] * len(files)
+
+    def extend(i):
+        batch = next(batches[i], None)
+        if batch is None:
+            done[i] = True
+        else:
+            current[i] = pa.concat_tables([current[i], pa.Table.from_batches([batch]).cast(schema)])
+
+    for i in range(len(files)):
+        extend(i)
+
+    with TableWriter(output_path, export_csv=export_csv) as writer:
+        pending = []
+        pending_rows = 0
+        while True:
+            # Every run still being read has all its rows below its last loaded key in memory,
+            # so rows below the smallest of those keys can go out now
+            open_runs = [i for i in range(len(files)) if not done[i]]
+            if open_runs:
+                bound = pc.min(pa.chunked_array([current[i][key][-1:] for i in open_runs], type=schema.field(key).type))
+                cut = [pc.sum(pc.less(current[i][key], bound)).as_py() or 0 for i in range(len(files))]
+            else:
+                cut = [current[i].num_rows for i in range(len(files))]
+
+            ready = pa.concat_tables([current[i].slice(0, cut[i]) for i in range(len(files))])
+            current = [current[i].slice(cut[i]).combine_chunks() for i in range(len(files))]
+            if ready.num_rows:
+                # Arrow's sort is stable, so equal keys stay in run order
+                pending.append(ready.take(pc.sort_indices(ready, sort_keys=[(key, "ascending")])))
+                pending_rows += ready.num_rows
+
+            if pending_rows >= chunk_size or (not open_runs and pending):
+                writer.write(pa.concat_tables(pending))
+                pending = []
+                pending_rows = 0
+
+            if not open_runs:
+                break
+            # Runs whose loaded rows all hold the bound key (or missing keys) may have more of it in the next batch
+            for i in open_runs:
+                last = current[i][key][-1:]
+                if len(last) == 0 or last.null_count or pc.equal(last, bound)[0].as_py() is not False:
+                    extend(i)
+
+        if writer.rows == 0:
+            # Write an empty table with the right columns when every run was empty
+            writer.write(schema.empty_table())
+    return writer.parquet_path
@@ -0,0 +1,291 @@
+"""
+Mergeable statistics for tables read in chunks.
+
+Quality and cleaning need quartiles and 1st/99th percentiles, which exactly
+would need whole columns in memory. In streaming mode they keep these
+per-column summaries instead, updated one chunk at a time and mergeable (two
+summaries of different chunks combine into the summary of both):
+
+- null counts, min and max (exact)
+- count, mean and variance as running moments (exact up to float rounding,
+  merged with Chan et al.'s parallel update)
+- a KLL quantile sketch (Karnin, Lang & Liberty 2016) for the quantiles
+
+Error bound: QuantileSketch.quantile(q) returns a value whose rank is
+within eps * n of q * n, where eps ~= 2.3 / k ** 0.97 with 99% probability
+(the bound DataSketches measures for KLL). For the default k = 1000 that is
+about 0.3% of the rows: the estimated median lies between the true 49.7th
+and 50.3rd percentiles, the 99th percentile between the 98.7th and 99.3rd.
+bench_streaming_stats.py measures it against the exact values. Memory is
+about 3k values per column whatever the number of rows, and the sketch is
+seeded so reruns give the same numbers.
+"""
+
+import numpy as np
+import pandas as pd
+
+from dedup_index import DedupIndex
+from profiler import DESCRIBE_STATS, IQR_FACTOR, QUARTILES
+
+# Sketch size: larger k means smaller quantile error and more memory (about 3 * k values per column)
+DEFAULT_K = 1000
+
+# Each lower level of the sketch holds this fraction of the level above it
+CAPACITY_RATIO = 2 / 3
+
+
+def rank_error(k: int = DEFAULT_K) -> float:
+    """Quantile rank error bound (fraction of rows, 99% probability) of a sketch of size k"""
+    return 2.3 / k ** 0.97
+
+
+class QuantileSketch:
+    """
+    KLL sketch of a stream of numbers, for approximate quantiles.
+
+    Values are kept in levels; a value on level h stands for 2**h values of
+    the stream. When the sketch grows past its capacity, the lowest full level
+    is sorted and every other value (starting at a random one of the first
+    two) moves up a level with double the weight.
+    """
+
+    def __init__(self, k: int = DEFAULT_K, seed: int = 0):
+        self.k = k
+        self.levels = [np.empty(0)]
+        self.count = 0
+        self.min = np.inf
+        self.max = -np.inf
+        self.seed = seed
+        self.rng = None
+
+    @classmethod
+    def from_levels(cls, levels: list, minimum: float, maximum: float, k: int = DEFAULT_K, seed: int = 0) -> "QuantileSketch":
+        """Rebuild a saved sketch from its levels (lowest first) and its exact min and max"""
+        sketch = cls(k, seed)
+        sketch.levels = [np.asarray(values, dtype=np.float64) for values in levels] or [np.empty(0)]
+        sketch.count = int(sum(len(values) * 2 ** h for h, values in enumerate(sketch.levels)))
+        sketch.min = minimum if sketch.count else np.inf
+        sketch.max = maximum if sketch.count else -np.inf
+        return sketch
+
+    def capacity(self, level: int) -> int:
+        depth = len(self.levels) - level - 1
+        return max(int(np.ceil(self.k * CAPACITY_RATIO ** depth)), 2)
+
+    def update(self, values):
+        """Add values (NaNs are skipped)"""
+        values = np.asarray(values, dtype=np.float64)
+        values = values[~np.isnan(values)]
+        if len(values) == 0:
+            return
+        self.count += len(values)
+        self.min = min(self.min, values.min())
+        self.max = max(self.max, values.max())
+        self.levels[0] = np.concatenate([self.levels[0], values])
+        self.compress()
+
+    def merge(self, *others: "QuantileSketch"):
+        """Fold other sketches into this one (compressing once at the end)"""
+        depth = max([len(self.levels)] + [len(other.levels) for other in others])
+        self.levels += [np.empty(0)] * (depth - len(self.levels))
+        for level in range(depth):
+            self.levels[level] = np.concatenate(
+                [self.levels[level]] + [other.levels[level] for other in others if level < len(other.levels)]
+            )
+        for other in others:
+            self.count += other.count
+            self.min = min(self.min, other.min)
+            self.max = max(self.max, other.max)
+        self.compress()
+
+    def compress(self):
+        while sum(len(values) for values in self.levels) > sum(self.capacity(h) for h in range(len(self.levels))):
+            level = next(h for h in range(len(self.levels)) if len(self.levels[h]) > self.capacity(h))
+            if level + 1 == len(self.levels):
+                self.levels.append(np.empty(0))
+            values = np.sort(self.levels[level])
+            # With an odd number of values, one stays behind so the total weight is kept exactly
+            leftover = values[:len(values) % 2]
+            values = values[len(values) % 2:]
+            if self.rng is None:
+                self.rng = np.random.default_rng(self.seed)
+            promoted = values[self.rng.integers(2)::2]
+            self.levels[level + 1] = np.concatenate([self.levels[level + 1], promoted])
+            self.levels[level] = leftover
+
+    def __len__(self):
+        return sum(len(values) for values in self.levels)
+
+    def quantile(self, q) -> np.ndarray:
+        """Approximate q-quantiles (q in [0, 1]), NaN for an empty sketch"""
+        q = np.atleast_1d(np.asarray(q, dtype=np.float64))
+        if self.count == 0:
+            return np.full(len(q), np.nan)
+        values = np.concatenate(self.levels)
+        weights = np.concatenate([np.full(len(v), 2.0 ** h) for h, v in enumerate(self.levels)])
+        order = np.argsort(values, kind="stable")
+        values = values[order]
+        cumulative = np.cumsum(weights[order])
+        # The value at rank q * (n - 1), the same rank np.percentile interpolates at
+        positions = np.searchsorted(cumulative, q * (self.count - 1), side="right")
+        result = values[np.minimum(positions, len(values) - 1)]
+        result = np.where(q <= 0, self.min, np.where(q >= 1, self.max, result))
+        return np.clip(result, self.min, self.max)
+
+
+class StreamingProfile:
+    """
+    The per-column statistics of profiler.profile(), built one chunk at a time.
+
+    update() adds a chunk, merge() folds in the profile of other chunks and
+    result() gives the same frame layout as profile(), with the quartiles
+    estimated by QuantileSketch. Outlier counts need the fences first, so
+    they take a second pass: count_outliers() on every chunk, then
+    result(outliers=...).
+    """
+
+    def __init__(self, k: int = DEFAULT_K):
+        self.k = k
+        self.rows = 0
+        self.columns = None
+        self.numeric = None
+        self.nulls = None
+        self.count = None
+        self.mean = None
+        self.m2 = None
+        self.sketches = None
+
+    def start(self, columns: list, numeric: list):
+        """Fix the profiled columns (from the first chunk or the profile merged in)"""
+        self.columns = list(columns)
+        self.numeric = list(numeric)
+        self.nulls = np.zeros(len(self.columns), dtype=np.int64)
+        self.count = np.zeros(len(self.numeric), dtype=np.int64)
+        self.mean = np.zeros(len(self.numeric))
+        self.m2 = np.zeros(len(self.numeric))
+        self.sketches = [QuantileSketch(self.k, seed=i) for i in range(len(self.numeric))]
+
+    def numeric_block(self, chunk: pd.DataFrame) -> np.ndarray:
+        block = np.empty((len(chunk), len(self.numeric)), dtype=np.float64, order="F")
+        for i, col in enumerate(self.numeric):
+            block[:, i] = chunk[col].to_numpy(dtype=np.float64, na_value=np.nan)
+        return block
+
+    def update(self, chunk: pd.DataFrame):
+        if self.columns is None:
+            self.start(chunk.columns, [
+                c for c in chunk.columns
+                if pd.api.types.is_numeric_dtype(chunk[c].dtype) and not pd.api.types.is_bool_dtype(chunk[c].dtype)
+            ])
+        self.rows += len(chunk)
+        self.nulls += chunk[self.columns].isna().sum().to_numpy()
+
+        block = self.numeric_block(chunk)
+        present = ~np.isnan(block)
+        count = present.sum(axis=0)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            mean = np.where(count > 0, np.nansum(block, axis=0) / count, 0.0)
+        m2 = np.nansum((block - mean) ** 2, axis=0)
+        self.merge_moments(count, mean, m2)
+
+        for i, sketch in enumerate(self.sketches):
+            sketch.update(block[present[:, i], i])
+
+    def merge_moments(self, count, mean, m2):
+        """Chan et al.'s update of running counts, means and sums of squared deviations"""
+        total = self.count + count
+        with np.errstate(invalid="ignore", divide="ignore"):
+            delta = mean - self.mean
+            self.mean = np.where(total > 0, self.mean + delta * count / total, 0.0)
+            self.m2 = np.where(total > 0, self.m2 + m2 + delta ** 2 * self.count * count / total, 0.0)
+        self.count = total
+
+    def merge(self, *others: "StreamingProfile"):
+        """Fold in the profiles of other chunks of the same table"""
+        others = [other for other in others if other.columns is not None]
+        if not others:
+            return
+        if self.columns is None:
+            self.start(others[0].columns, others[0].numeric)
+        for other in others:
+            if other.columns != self.columns or other.numeric != self.numeric:
+                raise ValueError("Can only merge profiles of the same columns")
+            self.rows += other.rows
+            self.nulls += other.nulls
+            self.merge_moments(other.count, other.mean, other.m2)
+        for i, sketch in enumerate(self.sketches):
+            sketch.merge(*[other.sketches[i] for other in others])
+
+    def count_outliers(self, chunk: pd.DataFrame, fences: pd.DataFrame) -> np.ndarray:
+        """Values of each numeric column of a chunk outside the IQR fences of result()"""
+        block = self.numeric_block(chunk)
+        lower = fences.loc[self.numeric, "lower_fence"].to_numpy(dtype=np.float64)
+        upper = fences.loc[self.numeric, "upper_fence"].to_numpy(dtype=np.float64)
+        return ((block < lower) | (block > upper)).sum(axis=0)
+
+    def result(self, outliers=None) -> pd.DataFrame:
+        """Same layout as profiler.profile(): one row per column"""
+        quantiles = np.array([
+            sketch.quantile(np.true_divide(QUARTILES, 100)) for sketch in self.sketches
+        ]).reshape(len(self.numeric), len(QUARTILES))
+        with np.errstate(invalid="ignore", divide="ignore"):
+            std = np.where(self.count > 1, np.sqrt(self.m2 / (self.count - 1)), np.nan)
+        iqr = quantiles[:, 2] - quantiles[:, 0]
+
+        numeric = pd.DataFrame({
+            "count": self.count.astype(np.float64),
+            "mean": np.where(self.count > 0, self.mean, np.nan),
+            "std": std,
+            "min": [s.min if s.count else np.nan for s in self.sketches],
+            "25%": quantiles[:, 0],
+            "50%": quantiles[:, 1],
+            "75%": quantiles[:, 2],
+            "max": [s.max if s.count else np.nan for s in self.sketches],
+            "range_violations": 0,
+            "lower_fence": quantiles[:, 0] - IQR_FACTOR * iqr,
+            "upper_fence": quantiles[:, 2] + IQR_FACTOR * iqr,
+            "outliers": 0 if outliers is None else outliers,
+        }, index=self.numeric)
+
+        result = numeric.reindex(self.columns)
+        result["nulls"] = self.nulls
+        for col in ["range_violations", "outliers"]:
+            result[col] = result[col].fillna(0).astype(np.int64)
+        return result[DESCRIBE_STATS + ["range_violations", "lower_fence", "upper_fence", "outliers", "nulls"]]
+
+
+class DuplicateFilter:
+    """
+    df.duplicated(subset) for a table read in chunks: marks the rows that
+    repeat an earlier row over `columns`, the first occurrence not counted.
+
+    Pipeline tables are sorted by Date, so when the columns include Date a
+    row can only repeat rows of its own week, and only the rows of the latest
+    week seen are carried over to the next chunk (memory stays one week). For
+    other column sets the rows go through a DedupIndex, which keeps every
+    distinct row seen (so memory grows with them) and compares the values of
+    rows whose fingerprints match, so a hash collision never marks a row.
+    """
+
+    def __init__(self, columns: list | None = None, date_col: str = "Date"):
+        self.columns = columns
+        self.date_col = date_col
+        self.carry = None
+        self.index = None
+
+    def duplicated(self, chunk: pd.DataFrame) -> np.ndarray:
+        columns = self.columns or list(chunk.columns)
+        rows = chunk[columns]
+        if self.date_col in columns:
+            if self.carry is not None and len(rows) and rows[self.date_col].min() < self.carry[self.date_col].max():
+                raise ValueError(f"DuplicateFilter needs chunks sorted by {self.date_col}")
+            combined = rows if self.carry is None else pd.concat([self.carry, rows], ignore_index=True)
+            combined = combined.astype({c: object for c in columns if isinstance(combined[c].dtype, pd.CategoricalDtype)})
+            duplicated = combined.duplicated().to_numpy()[len(combined) - len(rows):]
+            if len(combined):
+                self.carry = combined[combined[self.date_col] == combined[self.date_col].max()]
+            return duplicated
+
+        if self.index is None:
+            self.index = DedupIndex(columns)
+        return self.index.duplicated(rows, step=f"chunk {len(self.index.stats) + 1}")
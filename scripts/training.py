@@ -0,0 +1,107 @@
+"""
+Train several models at once within a core budget.
+
+analyze_data() fits each of its models on the same training set. train_models()
+fits them concurrently, one process per model, and gives the cores left over
+to the models that can spread one fit over several cores (forests build their
+trees in n_jobs threads, histogram gradient boosting runs OpenMP threads).
+Every process is held to its share with threadpoolctl (installed with
+scikit-learn), so processes times threads never goes over the budget.
+
+Each model keeps its random_state, and scikit-learn's results don't depend on
+n_jobs or on the process a model is fitted in, so the fitted models and every
+metric are the same whatever the budget. With a budget of one core the models
+are fitted one after another in this process, as before. A model's n_jobs is
+set back to 1 once it is fitted, so predictions and the saved model don't
+carry the training budget.
+"""
+
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from threadpoolctl import threadpool_limits
+
+# Estimators that can use more than one core for a single fit
+THREADED_ESTIMATORS = ("RandomForestClassifier", "ExtraTreesClassifier", "HistGradientBoostingClassifier")
+
+# Training data of a worker process, set once by the pool's initializer instead of sent with every model
+_training_data = None
+
+
+def core_budget(cores=None) -> int:
+    """Cores to train with: `cores`, or all the cores this process may run on"""
+    if cores is not None:
+        return max(1, cores)
+    return len(os.sched_getaffinity(0)) if hasattr(os, "sched_getaffinity") else (os.cpu_count() or 1)
+
+
+def assign_cores(models: dict, budget: int):
+    """
+    Number of processes and the cores of each model: one per model running at
+    once, the cores left over shared out among the threaded estimators
+    """
+    processes = min(len(models), budget)
+    cores = {name: 1 for name in models}
+    threaded = [name for name, model in models.items() if type(model).__name__ in THREADED_ESTIMATORS]
+    spare = budget - processes
+    for i, name in enumerate(threaded):
+        cores[name] += spare // len(threaded) + (1 if i < spare % len(threaded) else 0)
+    return processes, cores
+
+
+def _set_training_data(X, y):
+    global _training_data
+    _training_data = (X, y)
+
+
+def _fit(name, model, cores):
+    """Fit one model on the training data with `cores` threads at most, returns it with its fit time"""
+    X, y = _training_data
+    threaded = type(model).__name__ in THREADED_ESTIMATORS and "n_jobs" in model.get_params()
+    if threaded:
+        model.set_params(n_jobs=cores)
+    start = time.perf_counter()
+    with threadpool_limits(limits=cores):
+        model.fit(X, y)
+    seconds = time.perf_counter() - start
+    if threaded:
+        # The cores were only for fitting: predicting and the saved model use one thread
+        model.set_params(n_jobs=1)
+    return name, model, seconds
+
+
+def train_models(models: dict, X, y, cores=None):
+    """
+    Fit every model in `models` (name -> unfitted estimator) on X, y within the
+    core budget. Returns the fitted models (in the same order) and a dict of
+    name -> (cores, fit seconds)
+    """
+    budget = core_budget(cores)
+    processes, model_cores = assign_cores(models, budget)
+    print(f"\nTraining {len(models)} model{'s' if len(models) > 1 else ''} with a budget of {budget} core{'s' if budget > 1 else ''} "
+          f"({processes} process{'es' if processes > 1 else ''})")
+
+    start = time.perf_counter()
+    fitted = {}
+    if processes == 1:
+        _set_training_data(X, y)
+        try:
+            for name, model in models.items():
+                fitted[name] = _fit(name, model, model_cores[name])
+        finally:
+            _set_training_data(None, None)
+    else:
+        with ProcessPoolExecutor(max_workers=processes, initializer=_set_training_data, initargs=(X, y)) as pool:
+            futures = [pool.submit(_fit, name, model, model_cores[name]) for name, model in models.items()]
+            for future in as_completed(futures):
+                name, model, seconds = future.result()
+                fitted[name] = (name, model, seconds)
+    wall = time.perf_counter() - start
+
+    timings = {name: (model_cores[name], fitted[name][2]) for name in models}
+    print(f"  {'Model':<28}{'Cores':>6}{'Fit time':>11}")
+    for name, (used, seconds) in timings.items():
+        print(f"  {name:<28}{used:>6}{seconds:>10.2f}s")
+    print(f"  Wall time {wall:.2f}s, {sum(seconds for _, seconds in timings.values()):.2f}s of fitting in total")
+    return {name: fitted[name][1] for name in models}, timings
@@ -0,0 +1,322 @@
+"""
+Declarative validation rules for the quality stage.
+
+The checks live in validation_rules.yaml instead of in code. load_rules()
+reads them and expands every entry into one rule per checked column.
+validate() then compiles the rules into as few vectorized passes as it can:
+
+- every range rule: one comparison of a block holding all range-checked
+  columns against per-column bounds
+- every not_null rule: one isna() over all the columns involved
+- compare rules: one comparison of a left and a right block per operator
+- allowed rules: one lookup per column (against the categories only, for
+  categorical columns)
+- unique rules: one duplicated() per column subset
+
+Each pass leaves a boolean violation mask per rule, which gives the per-rule
+counts and sample rows and is OR-ed into one mask of rows failing any rule.
+Passes are timed, not rules: every rule lists the time of the pass it was
+checked in. Range and compare rules on a column that doesn't hold numbers
+are skipped and reported as such.
+"""
+
+import operator
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import yaml
+
+from streaming_stats import DuplicateFilter
+
+RULES_PATH = Path("validation_rules.yaml")
+
+RULE_TYPES = ["range", "allowed", "not_null", "unique", "compare"]
+
+COMPARE_OPS = {
+    "==": operator.eq, "!=": operator.ne, "<": operator.lt,
+    "<=": operator.le, ">": operator.gt, ">=": operator.ge,
+}
+
+# Offending rows kept per rule for the report
+SAMPLE_SIZE = 5
+
+
+def default_message(rule: dict) -> str:
+    """Issue text for a rule without its own message (matches the old hard-coded range checks)"""
+    columns = rule["columns"]
+    column = columns[0][0].upper() + columns[0][1:]
+    if rule["type"] == "range":
+        if "min" in rule and "max" in rule:
+            return f"{column} values outside [{rule['min']},{rule['max']}] range"
+        if "min" in rule:
+            return f"{column} values below {rule['min']}"
+        return f"{column} values above {rule['max']}"
+    if rule["type"] == "allowed":
+        return f"{column} values not in {rule['values']}"
+    if rule["type"] == "not_null":
+        return f"{column} has missing values"
+    if rule["type"] == "unique":
+        return f"Duplicate rows over {columns}"
+    return f"Rows where {columns[0]} {rule['op']} {columns[1]} does not hold"
+
+
+def load_rules(path: Path = RULES_PATH) -> list:
+    """
+    Rules declared in a YAML file, as a list of dicts with `name`, `type`,
+    `columns`, `message` and the type's own fields (min/max, values, op).
+    Raises ValueError for unknown rule types or missing fields.
+    """
+    with open(path) as f:
+        spec = yaml.safe_load(f) or {}
+
+    rules = []
+    for entry in spec.get("rules", []):
+        rule_type = entry.get("type")
+        if rule_type not in RULE_TYPES:
+            raise ValueError(f"Unknown validation rule type {rule_type!r} in {path}, expected one of {RULE_TYPES}")
+
+        if rule_type == "compare":
+            if entry.get("op") not in COMPARE_OPS or "left" not in entry or "right" not in entry:
+                raise ValueError(f"compare rules need left, right and an op in {list(COMPARE_OPS)}: {entry}")
+            groups = [[entry["left"], entry["right"]]]
+        elif "columns" not in entry:
+            raise ValueError(f"{rule_type} rules need a list of columns: {entry}")
+        elif rule_type == "unique":
+            groups = [list(entry["columns"])]
+        else:
+            groups = [[column] for column in entry["columns"]]
+
+        if rule_type == "range" and "min" not in entry and "max" not in entry:
+            raise ValueError(f"range rules need a min, a max or both: {entry}")
+        if rule_type == "allowed" and "values" not in entry:
+            raise ValueError(f"allowed rules need a list of values: {entry}")
+
+        for columns in groups:
+            rule = {k: v for k, v in entry.items() if k not in ["name", "message", "columns", "left", "right"]}
+            rule["columns"] = columns
+            name = entry.get("name") or f"{rule_type}_{'_'.join(columns)}"
+            if entry.get("name") and len(groups) > 1:
+                name = f"{name}_{columns[0]}"
+            rule["name"] = name.lower().replace(" ", "_")
+            rule["message"] = entry.get("message") or default_message(rule)
+            rules.append(rule)
+
+    names = [rule["name"] for rule in rules]
+    duplicated = sorted({n for n in names if names.count(n) > 1})
+    if duplicated:
+        raise ValueError(f"Validation rule names must be unique, repeated: {duplicated}")
+    return rules
+
+
+def rule_ranges(rules: list) -> dict:
+    """column -> (min, max) for the range rules (a missing bound is -inf / inf)"""
+    return {
+        rule["columns"][0]: (rule.get("min", -np.inf), rule.get("max", np.inf))
+        for rule in rules if rule["type"] == "range"
+    }
+
+
+def numeric_column(values: pd.Series) -> bool:
+    """Whether float_block() can hold a column: numbers or booleans (also as categories), or nothing but missing values"""
+    if isinstance(values.dtype, pd.CategoricalDtype):
+        return pd.api.types.is_numeric_dtype(values.cat.categories) or values.isna().all()
+    return pd.api.types.is_numeric_dtype(values) or values.isna().all()
+
+
+def skip_reasons(df: pd.DataFrame, rules: list) -> dict:
+    """rule name -> why it can't be checked against df (a column is missing, or isn't numeric for a range or compare rule)"""
+    reasons = {}
+    for rule in rules:
+        missing = [c for c in rule["columns"] if c not in df.columns]
+        if missing:
+            reasons[rule["name"]] = "skipped, column not found"
+            continue
+        if rule["type"] in ("range", "compare"):
+            text = [c for c in rule["columns"] if not numeric_column(df[c])]
+            if text:
+                reasons[rule["name"]] = f"skipped, {', '.join(text)} not numeric ({df[text[0]].dtype})"
+    return reasons
+
+
+def float_block(df: pd.DataFrame, columns: list) -> np.ndarray:
+    """Columns of df side by side as one float64 block, missing values as NaN"""
+    block = np.empty((len(df), len(columns)), dtype=np.float64, order="F")
+    for i, column in enumerate(columns):
+        block[:, i] = df[column].to_numpy(dtype=np.float64, na_value=np.nan)
+    return block
+
+
+def range_pass(df, rules):
+    """Values outside [min, max], all range rules in one comparison"""
+    block = float_block(df, [rule["columns"][0] for rule in rules])
+    low = np.array([rule.get("min", -np.inf) for rule in rules], dtype=np.float64)
+    high = np.array([rule.get("max", np.inf) for rule in rules], dtype=np.float64)
+    return (block < low) | (block > high)
+
+
+def not_null_pass(df, rules):
+    """Missing values, all not_null rules in one isna()"""
+    return df[[rule["columns"][0] for rule in rules]].isna().to_numpy()
+
+
+def compare_pass(df, rules):
+    """Rows where `left op right` is false, one comparison per operator (rows with a missing side are skipped)"""
+    mask = np.zeros((len(df), len(rules)), dtype=bool)
+    for op in {rule["op"] for rule in rules}:
+        same_op = [i for i, rule in enumerate(rules) if rule["op"] == op]
+        left = float_block(df, [rules[i]["columns"][0] for i in same_op])
+        right = float_block(df, [rules[i]["columns"][1] for i in same_op])
+        mask[:, same_op] = ~COMPARE_OPS[op](left, right) & ~np.isnan(left) & ~np.isnan(right)
+    return mask
+
+
+def allowed_mask(values: pd.Series, allowed: list) -> np.ndarray:
+    """Values present but not in `allowed`; categoricals only check their categories"""
+    if isinstance(values.dtype, pd.CategoricalDtype):
+        codes = values.cat.codes.to_numpy()
+        bad_category = np.append(~values.cat.categories.isin(allowed), False)
+        return bad_category[codes]
+    return ~values.isin(allowed).to_numpy() & values.notna().to_numpy()
+
+
+def allowed_pass(df, rules):
+    """Values outside each rule's allowed set"""
+    return np.column_stack([allowed_mask(df[rule["columns"][0]], rule["values"]) for rule in rules])
+
+
+def unique_pass(df, rules):
+    """Repeats of an earlier row over each rule's columns (the first occurrence is not a violation)"""
+    return np.column_stack([df.duplicated(subset=rule["columns"]).to_numpy() for rule in rules])
+
+
+def validate(df: pd.DataFrame, rules: list, sample_size: int = SAMPLE_SIZE):
+    """
+    Check every rule against df.
+
+    Returns a frame with one row per rule (type, columns, violations, percent
+    of rows, time in ms of the pass that checked it and message; rules whose
+    columns are missing from df, or aren't numeric for a range or compare
+    rule, are marked skipped with the reason), a dict of sample offending
+    rows per failing rule and the boolean mask of rows failing any rule.
+    """
+    skipped = skip_reasons(df, rules)
+    checked = [rule for rule in rules if rule["name"] not in skipped]
+    passes = [
+        (range_pass, [rule for rule in checked if rule["type"] == "range"]),
+        (not_null_pass, [rule for rule in checked if rule["type"] == "not_null"]),
+        (compare_pass, [rule for rule in checked if rule["type"] == "compare"]),
+    ]
+    # Rules that can't share a pass get one each
+    passes += [(allowed_pass, [rule]) for rule in checked if rule["type"] == "allowed"]
+    passes += [(unique_pass, [rule]) for rule in checked if rule["type"] == "unique"]
+
+    masks = {}
+    times = {}
+    for run_pass, pass_rules in passes:
+        if not pass_rules:
+            continue
+        start = time.perf_counter()
+        mask = run_pass(df, pass_rules)
+        elapsed = (time.perf_counter() - start) * 1000
+        for i, rule in enumerate(pass_rules):
+            masks[rule["name"]] = mask[:, i]
+            times[rule["name"]] = elapsed
+
+    failing = np.zeros(len(df), dtype=bool)
+    samples = {}
+    for rule in rules:
+        mask = masks.get(rule["name"])
+        if mask is None:
+            continue
+        failing |= mask
+        if mask.any():
+            samples[rule["name"]] = df.iloc[np.flatnonzero(mask)[:sample_size]][rule["columns"]]
+
+    violations = {name: int(mask.sum()) for name, mask in masks.items()}
+    return rule_table(rules, violations, times, len(df), skipped), samples, failing
+
+
+def rule_table(rules: list, violations: dict, times: dict, n_rows: int, skipped: dict | None = None) -> pd.DataFrame:
+    """
+    The per-rule results frame; rules missing from `violations` are marked
+    skipped, with the reason from `skipped` if there is one
+    """
+    skipped = skipped or {}
+    rows = []
+    for rule in rules:
+        name = rule["name"]
+        row = {"type": rule["type"], "columns": ", ".join(rule["columns"])}
+        if name not in violations:
+            message = skipped.get(name, "skipped, column not found")
+            rows.append({**row, "violations": -1, "percent": np.nan, "pass_ms": np.nan, "message": message})
+            continue
+        rows.append({
+            **row,
+            "violations": violations[name],
+            "percent": round(violations[name] / n_rows * 100, 2) if n_rows else 0.0,
+            "pass_ms": round(times[name], 3),
+            "message": rule["message"],
+        })
+    return pd.DataFrame(rows, index=pd.Index([rule["name"] for rule in rules], name="rule"))
+
+
+class ValidationTally:
+    """
+    validate() for a table read in chunks.
+
+    Add the chunks in order with update(); results() then gives what
+    validate() gives on the whole table, with the number of failing rows
+    instead of the mask. Rules other than unique only look at one row at a
+    time, so their counts just add up; unique rules go through a
+    DuplicateFilter so repeats across chunk boundaries are found too.
+    """
+
+    def __init__(self, rules: list, sample_size: int = SAMPLE_SIZE):
+        self.rules = rules
+        self.sample_size = sample_size
+        self.row_rules = [rule for rule in rules if rule["type"] != "unique"]
+        self.filters = {rule["name"]: DuplicateFilter(rule["columns"]) for rule in rules if rule["type"] == "unique"}
+        self.violations = {}
+        self.times = {}
+        self.samples = {}
+        self.skipped = {}
+        self.failing = 0
+        self.rows = 0
+
+    def update(self, chunk: pd.DataFrame):
+        results, samples, failing = validate(chunk, self.row_rules, self.sample_size)
+        checked = results[results["violations"] >= 0]
+        for name, row in checked.iterrows():
+            self.violations[name] = self.violations.get(name, 0) + int(row["violations"])
+            self.times[name] = self.times.get(name, 0.0) + row["pass_ms"]
+        for name, row in results[results["violations"] < 0].iterrows():
+            self.skipped.setdefault(name, row["message"])
+
+        for rule in self.rules:
+            name = rule["name"]
+            if name not in self.filters or not all(c in chunk.columns for c in rule["columns"]):
+                continue
+            start = time.perf_counter()
+            mask = self.filters[name].duplicated(chunk)
+            self.times[name] = self.times.get(name, 0.0) + (time.perf_counter() - start) * 1000
+            self.violations[name] = self.violations.get(name, 0) + int(mask.sum())
+            failing |= mask
+            if mask.any():
+                samples[name] = chunk.iloc[np.flatnonzero(mask)[:self.sample_size]][rule["columns"]]
+
+        for name, sample in samples.items():
+            kept = self.samples.get(name)
+            if kept is None:
+                self.samples[name] = sample
+            elif len(kept) < self.sample_size:
+                self.samples[name] = pd.concat([kept, sample]).head(self.sample_size)
+        self.failing += int(failing.sum())
+        self.rows += len(chunk)
+
+    def results(self):
+        """(results frame, sample rows per failing rule, number of rows failing any rule)"""
+        samples = {rule["name"]: self.samples[rule["name"]] for rule in self.rules if rule["name"] in self.samples}
+        skipped = {name: reason for name, reason in self.skipped.items() if name not in self.violations}
+        return rule_table(self.rules, self.violations, self.times, self.rows, skipped), samples, self.failing
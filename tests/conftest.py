@@ -0,0 +1,124 @@
+"""
+Shared setup of the tests.
+
+The scripts import each other by name and read and write relative data/
+paths, so scripts/ goes on sys.path and every test that touches data runs
+in its own temporary project directory with a small synthetic copy of the
+raw Kaggle tables (the same columns and CSV layout as the real ones).
+
+Run from the project root:
+    python -m pytest -q tests
+"""
+
+import importlib
+import random
+import shutil
+import sys
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pytest
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT / "scripts"))
+
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.preprocessing import StandardScaler
+
+from storage import PROCESSED_DIR, RAW_DIR, convert_raw_to_parquet, read_table
+from features import add_features, feature_cols
+from model_store import train_or_load
+
+WORDS = ["love", "night", "baby", "heart", "fire", "dance", "dream", "girl", "boy", "time",
+         "rain", "sun", "moon", "star", "crazy", "happy", "blue", "sweet", "wild", "home"]
+
+SPOTIFY_TRACKS = 400
+CHART_WEEKS = 30
+CHART_SIZE = 40
+
+
+def make_raw_csvs(raw_dir: Path, seed: int = 1):
+    """Write synthetic spotify_songs.csv and billboard_hot_100.csv, every chart row taken from a Spotify track"""
+    rng = np.random.default_rng(seed)
+    picker = random.Random(seed)
+    artists = [f"{picker.choice(['The ', ''])}{picker.choice(WORDS).title()} "
+               f"{picker.choice(['Band', 'Kids', 'Smith', 'Jones', 'Lee'])}" for _ in range(60)]
+
+    tracks = []
+    for i in range(SPOTIFY_TRACKS):
+        year = int(rng.integers(1958, 2021))
+        credits = picker.sample(artists, picker.choice([1, 1, 1, 2]))
+        tracks.append({
+            "id": f"id{i}", "name": " ".join(picker.sample(WORDS, picker.randint(1, 3))).title(),
+            "popularity": int(rng.integers(0, 100)), "duration_ms": int(rng.integers(90_000, 400_000)),
+            "explicit": int(rng.integers(0, 2)), "artists": str(credits),
+            "release_date": f"{year}-0{rng.integers(1, 9)}-1{rng.integers(0, 9)}",
+            "danceability": rng.random(), "energy": rng.random(), "key": int(rng.integers(0, 12)),
+            "loudness": -rng.gamma(2, 4), "mode": int(rng.integers(0, 2)), "speechiness": rng.random() * 0.5,
+            "acousticness": rng.random(), "instrumentalness": rng.random() ** 4, "liveness": rng.random(),
+            "valence": rng.random(), "tempo": rng.normal(120, 25), "year": year,
+        })
+    spotify = pd.DataFrame(tracks)
+    # A few missing values, as in the real catalog
+    for column in ["tempo", "valence", "popularity"]:
+        spotify.loc[spotify.sample(frac=0.02, random_state=2).index, column] = np.nan
+
+    chart = []
+    for date in pd.date_range("1990-01-06", periods=CHART_WEEKS, freq="7D"):
+        for rank, i in enumerate(rng.choice(SPOTIFY_TRACKS, CHART_SIZE, replace=False), 1):
+            track = spotify.iloc[i]
+            credits = eval(track["artists"])
+            chart.append({
+                "date": date.strftime("%Y-%m-%d"), "rank": rank,
+                "song": track["name"] if rng.random() > 0.05 else track["name"] + "!",
+                "artist": credits[0] if len(credits) == 1 else f"{credits[0]} Featuring {credits[1]}",
+                "last-week": "-" if rng.random() < 0.2 else int(rng.integers(1, 101)),
+                "peak-rank": int(rng.integers(1, rank + 1)), "weeks-on-board": int(rng.integers(1, 60)),
+            })
+    chart = pd.DataFrame(chart).sort_values(["date", "rank"], ascending=[False, True])
+
+    raw_dir.mkdir(parents=True, exist_ok=True)
+    spotify.to_csv(raw_dir / "spotify_songs.csv", index=False)
+    chart.to_csv(raw_dir / "billboard_hot_100.csv", index=False)
+
+
+@pytest.fixture
+def project(tmp_path, monkeypatch):
+    """
+    A temporary project directory holding the synthetic raw tables as CSV and
+    typed Parquet, and the project's rule and model configuration files
+    """
+    monkeypatch.chdir(tmp_path)
+    for name in ["validation_rules.yaml", "analysis_models.yaml"]:
+        shutil.copy(ROOT / name, tmp_path / name)
+    make_raw_csvs(RAW_DIR)
+    for name in ["spotify_songs.csv", "billboard_hot_100.csv"]:
+        convert_raw_to_parquet(RAW_DIR / name)
+    return tmp_path
+
+
+@pytest.fixture
+def integrated(project):
+    """The project once 02_data_integration has run, returns the integrated table"""
+    importlib.import_module("02_data_integration").integrate_data()
+    return read_table(PROCESSED_DIR / "integrated_data.parquet")
+
+
+@pytest.fixture
+def trained(integrated):
+    """
+    The project with a saved cleaning plan and a small forest trained on the
+    cleaned table, returns the Spotify catalog with a few tracks missing a
+    critical audio feature (also saved as data/raw/catalog.parquet)
+    """
+    cleaned = add_features(importlib.import_module("04_data_cleaning").clean_data())
+    scaler = StandardScaler().fit(cleaned[feature_cols])
+    model = RandomForestClassifier(n_estimators=25, max_depth=10, random_state=42)
+    train_or_load({"Random Forest": model}, scaler.transform(cleaned[feature_cols]), cleaned["reached_top_10"],
+                  feature_cols, scaler, cores=1)
+
+    catalog = pd.read_parquet(RAW_DIR / "spotify_songs.parquet")
+    catalog.loc[[3, 50, 51], "energy"] = np.nan
+    catalog.to_parquet(RAW_DIR / "catalog.parquet", index=False)
+    return catalog
@@ -0,0 +1,55 @@
+import numpy as np
+import pandas as pd
+
+from artist_index import ArtistIndex, split_artist_list, split_credit
+
+
+def random_entries(seed=0, n=2000):
+    rng = np.random.default_rng(seed)
+    titles = rng.choice([f"title {i}" for i in range(80)], n)
+    artists = rng.choice([f"artist {i}" for i in range(30)], n)
+    row_ids = rng.integers(0, 500, n)
+    return row_ids, titles, artists
+
+
+def test_lookup_matches_a_dict():
+    row_ids, titles, artists = random_entries()
+    index = ArtistIndex.build(row_ids, titles, artists)
+
+    expected = {}
+    for row, title, artist in zip(row_ids, titles, artists):
+        expected.setdefault((title, artist), set()).add(int(row))
+    assert len(index) == len(expected)
+
+    probe_titles = [f"title {i}" for i in range(90)] * 3
+    probe_artists = [f"artist {i % 35}" for i in range(270)]
+    probe, rows = index.rows(index.lookup(probe_titles, probe_artists))
+    found = []
+    for i, (title, artist) in enumerate(zip(probe_titles, probe_artists)):
+        found += [(i, row) for row in sorted(expected.get((title, artist), ()))]
+    # In probe order, then row order, nothing for keys never indexed
+    assert list(zip(probe.tolist(), rows.tolist())) == found
+    assert index.find("title 1", "artist 1").tolist() == sorted(expected.get(("title 1", "artist 1"), ()))
+    assert len(index.find("title 99", "artist 1")) == 0
+
+
+def test_saved_index_loads_back(tmp_path):
+    index = ArtistIndex.build(*random_entries(1))
+    path = tmp_path / "processed" / "artist_index.parquet"
+    index.save(path, {"spotify data": "abc"})
+
+    loaded = ArtistIndex.load(path, {"spotify data": "abc"})
+    assert loaded.keys.equals(index.keys)
+    assert np.array_equal(loaded.offsets, index.offsets)
+    assert np.array_equal(loaded.row_ids, index.row_ids)
+    # Saved for other data, or never saved
+    assert ArtistIndex.load(path, {"spotify data": "def"}) is None
+    assert ArtistIndex.load(tmp_path / "missing.parquet") is None
+
+
+def test_credits_split_into_artists():
+    credits = pd.Series(["A Featuring B & C", "A feat. B", "A, B With C", "Solo", None])
+    assert split_credit(credits).tolist() == [["A", "B", "C"], ["A", "B"], ["A", "B", "C"], ["Solo"], [""]]
+
+    lists = pd.Series(["['A', 'B']", "[\"Guns N' Roses\", 'C']", "['Solo']"])
+    assert split_artist_list(lists).tolist() == [["['A", "B']"], ["[\"Guns N' Roses", "C']"], ["['Solo']"]]
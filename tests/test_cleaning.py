@@ -0,0 +1,106 @@
+import importlib
+
+import numpy as np
+import pandas as pd
+
+from storage import PROCESSED_DIR, read_table, write_table
+from schema import compact
+from cleaning_plan import CRITICAL_COLS, CleaningPlan
+from dedup_index import DEDUP_INDEX_PATH, DedupIndex
+from streaming_stats import rank_error
+
+cleaning = importlib.import_module("04_data_cleaning")
+
+INTEGRATED_PATH = PROCESSED_DIR / "integrated_data.parquet"
+
+
+def messy(df):
+    """The integrated table with missing values, repeated rows and outliers, still sorted by Date"""
+    df = df.copy()
+    rng = np.random.default_rng(5)
+    for col, n in [("energy", 15), ("tempo", 30), ("popularity", 25), ("valence", 10)]:
+        df.loc[rng.choice(len(df), n, replace=False), col] = None
+    df.loc[rng.choice(len(df), 5, replace=False), "tempo"] = 900.0
+    df.loc[rng.choice(len(df), 3, replace=False), "danceability"] = 1.2
+    repeats = df.iloc[rng.choice(len(df), 12, replace=False)]
+    return pd.concat([df, repeats], ignore_index=True).sort_values("Date", kind="stable", ignore_index=True)
+
+
+def reference_clean(df):
+    """The cleaning steps written out plainly, one pandas call after another"""
+    df_clean = df.dropna(subset=cleaning.CRITICAL_COLS)
+    for col in df_clean.select_dtypes(include=[np.number]).columns:
+        if df_clean[col].isnull().sum() > 0:
+            df_clean[col] = df_clean[col].fillna(df_clean[col].median())
+    df_clean = df_clean.drop_duplicates()
+    for column in ["tempo", "loudness", "duration_ms"]:
+        df_clean[column] = df_clean[column].clip(df_clean[column].quantile(0.01), df_clean[column].quantile(0.99))
+    for column in ["acousticness", "danceability", "energy", "instrumentalness", "liveness", "speechiness", "valence"]:
+        df_clean[column] = df_clean[column].clip(0, 1)
+    for column in ["Last Week", "Weeks in Charts"]:
+        df_clean[column] = pd.to_numeric(df_clean[column], errors="coerce").fillna(0).astype(int)
+    for col in ["Rank", "Peak Position", "year", "mode", "key", "explicit"]:
+        df_clean[col] = df_clean[col].astype(int)
+    return compact(df_clean)
+
+
+def test_clean_data_matches_plain_pandas(integrated):
+    df = compact(messy(integrated))
+    write_table(df, INTEGRATED_PATH)
+    cleaned = cleaning.clean_data()
+
+    expected = reference_clean(df)
+    assert len(expected) < len(df) - 12
+    pd.testing.assert_frame_equal(cleaned, expected)
+    pd.testing.assert_frame_equal(compact(pd.read_parquet(PROCESSED_DIR / "cleaned_data.parquet")), expected.reset_index(drop=True))
+
+    # A frame handed in is cleaned the same and left as it was
+    pd.testing.assert_frame_equal(cleaning.clean_data(df=df, save=False), expected)
+    pd.testing.assert_frame_equal(df, compact(messy(integrated)))
+    log = (PROCESSED_DIR / "cleaning_log.txt").read_text()
+    assert f"Duplicate Song Rows before removal: {df.dropna(subset=cleaning.CRITICAL_COLS).duplicated().sum()}" in log
+    assert "Step resources" in log
+
+
+def test_plan_matches_clean_data(integrated):
+    df = compact(messy(integrated))
+    write_table(df, INTEGRATED_PATH)
+    cleaned = cleaning.clean_data()
+    saved = CleaningPlan.load()
+
+    # fit() learns the plan clean_data() saved, and transform() cleans the table the same way with it
+    plan = CleaningPlan.fit(df)
+    assert plan.to_dict() == saved.to_dict()
+    pd.testing.assert_frame_equal(saved.transform(df, DedupIndex()), cleaned)
+    assert saved.counts["kept"] == len(cleaned)
+    assert saved.counts["duplicates"] == df.dropna(subset=CRITICAL_COLS).duplicated().sum()
+
+    # New rows are cleaned against the saved duplicate index: rows seen before are dropped
+    index = DedupIndex.load()
+    new_rows = messy(integrated).iloc[-50:].assign(Date=lambda rows: rows["Date"] + pd.Timedelta(days=7))
+    batch = pd.concat([new_rows, df.iloc[:20]], ignore_index=True)
+    result = saved.transform(batch, index)
+    expected = saved.transform(new_rows, DedupIndex())
+    # (category sets depend on the rows in the batch)
+    pd.testing.assert_frame_equal(result.reset_index(drop=True), expected.reset_index(drop=True), check_categorical=False)
+
+
+def test_streaming_clean_follows_its_plan(integrated, tmp_path):
+    df = compact(messy(integrated))
+    write_table(df, INTEGRATED_PATH)
+
+    # Chunks smaller than a chart week
+    cleaning.clean_data(chunk_size=25)
+    plan = CleaningPlan.load()
+    streamed = compact(read_table(PROCESSED_DIR / "cleaned_data.parquet"))
+
+    # Medians and bounds come from sketches, within their rank error of the exact ones
+    kept = df.dropna(subset=CRITICAL_COLS)
+    for col, median in plan.medians.items():
+        low, high = kept[col].quantile([0.5 - rank_error(), 0.5 + rank_error()], interpolation="nearest")
+        assert low <= median <= high, col
+    # and cleaning with the saved plan gives the table the stream wrote, with the same duplicate index
+    index = DedupIndex()
+    pd.testing.assert_frame_equal(plan.transform(df, index).reset_index(drop=True), streamed)
+    index.save(tmp_path / "dedup_index.parquet")
+    pd.testing.assert_frame_equal(read_table(DEDUP_INDEX_PATH), read_table(tmp_path / "dedup_index.parquet"))
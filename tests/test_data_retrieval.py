@@ -0,0 +1,58 @@
+import hashlib
+import importlib
+
+import pandas as pd
+import pytest
+
+retrieval = importlib.import_module("01_data_retrieval")
+
+ROWS = [
+    "Song,Artist,Rank",
+    '"Hello, Again",Adele,1',
+    '"Two\nLines",The Band,2',
+    "",
+    '"Say ""Hi""",Someone,3',
+]
+
+
+@pytest.mark.parametrize("chunk_size", [1, 3, 7, 1024])
+@pytest.mark.parametrize("ending", ["\n", "\r\n", ""])
+def test_scan_file_matches_pandas(tmp_path, chunk_size, ending):
+    path = tmp_path / "chart.csv"
+    path.write_bytes(((ending or "\n").join(ROWS) + ending).encode())
+    scan = retrieval.scan_file(path, chunk_size=chunk_size)
+
+    # Quoted newlines, quoted commas and blank lines count the way read_csv counts them
+    expected = pd.read_csv(path)
+    assert scan["rows"] == len(expected)
+    assert scan["columns"] == len(expected.columns)
+    assert scan["header"] == list(expected.columns)
+    assert scan["size_bytes"] == path.stat().st_size
+    assert scan["checksum"] == hashlib.sha256(path.read_bytes()).hexdigest()
+
+
+def test_empty_file(tmp_path):
+    path = tmp_path / "empty.csv"
+    path.write_bytes(b"")
+    scan = retrieval.scan_file(path)
+    assert scan["rows"] == 0 and scan["columns"] == 0
+
+
+
+def test_manifest_and_write_if_changed(tmp_path):
+    manifest_path = tmp_path / "data_manifest.json"
+    assert retrieval.load_manifest(manifest_path) == {"version": retrieval.MANIFEST_VERSION, "files": {}}
+
+    # Old versions and broken files are ignored
+    manifest_path.write_text('{"version": 0, "files": {"a.csv": {}}}')
+    assert retrieval.load_manifest(manifest_path)["files"] == {}
+    manifest_path.write_text("{not json")
+    assert retrieval.load_manifest(manifest_path)["files"] == {}
+
+    path = tmp_path / "data_sources.txt"
+    assert retrieval.write_if_changed(path, "sources\n")
+    mtime = path.stat().st_mtime_ns
+    assert not retrieval.write_if_changed(path, "sources\n")
+    assert path.stat().st_mtime_ns == mtime
+    assert retrieval.write_if_changed(path, "other\n")
+    assert path.read_text() == "other\n"
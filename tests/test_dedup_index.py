@@ -0,0 +1,95 @@
+import numpy as np
+import pandas as pd
+import pyarrow.parquet as pq
+import pytest
+
+from dedup_index import DedupIndex, DedupIndexWriter
+from schema import compact
+
+
+def chart_rows(n=3000, seed=0):
+    """Chart-like rows with plenty of repeats over Song, Artist and Date"""
+    rng = np.random.default_rng(seed)
+    return compact(pd.DataFrame({
+        "Date": pd.Timestamp("2000-01-01") + pd.to_timedelta(np.sort(rng.integers(0, 30, n)) * 7, unit="D"),
+        "Song": rng.choice([f"song {i}" for i in range(50)], n),
+        "Artist": rng.choice(["a", "b", "c", None], n),
+        "Rank": rng.integers(1, 100, n),
+        "energy": rng.choice([0.25, 0.5, np.nan], n),
+    }))
+
+
+class TruncatedIndex(DedupIndex):
+    """8-bit fingerprints, so most rows share theirs with other rows"""
+
+    def fingerprint(self, keys):
+        return super().fingerprint(keys) & np.uint64(0xFF)
+
+
+@pytest.mark.parametrize("cls", [DedupIndex, TruncatedIndex])
+@pytest.mark.parametrize("columns", [None, ["Song", "Artist", "Date"], ["Artist", "energy"]])
+def test_duplicated_matches_pandas(cls, columns):
+    df = chart_rows()
+    index = cls(columns)
+    assert np.array_equal(index.duplicated(df), df.duplicated(columns).to_numpy())
+    if cls is TruncatedIndex:
+        assert index.stats[-1]["collisions"] > 0
+
+    # Later batches are checked against the rows of the earlier ones too
+    index = cls(columns)
+    found = np.concatenate([index.duplicated(df.iloc[start:start + 400]) for start in range(0, len(df), 400)])
+    assert np.array_equal(found, df.duplicated(columns).to_numpy())
+
+
+@pytest.mark.parametrize("cls", [DedupIndex, TruncatedIndex])
+def test_saved_index_matches_rescan(tmp_path, cls):
+    df = chart_rows()
+    history, latest = df.iloc[:2500], df.iloc[2500:]
+    # Rows of earlier weeks sent again, so the saved key values are compared
+    load = pd.concat([latest, history.sample(300, random_state=1)], ignore_index=True)
+    expected = pd.concat([history, load], ignore_index=True).duplicated().to_numpy()[len(history):]
+
+    built = cls()
+    built.duplicated(history)
+    built.save(tmp_path / "dedup_index.parquet")
+    index = cls.load(path=tmp_path / "dedup_index.parquet")
+    assert len(index) == len(built)
+    assert np.array_equal(index.duplicated(load), expected)
+
+    # Saved again with the new rows, the next load sees all of them
+    index.save(tmp_path / "dedup_index.parquet")
+    again = cls.load(path=tmp_path / "dedup_index.parquet")
+    assert again.duplicated(load).all()
+    # An index of other columns isn't used
+    assert len(cls.load(["Song"], path=tmp_path / "dedup_index.parquet")) == 0
+
+
+def test_fingerprints_ignore_dtypes():
+    df = chart_rows()
+    plain = df.astype({"Song": object, "Rank": np.int64, "energy": np.float64})
+    index = DedupIndex()
+    index.duplicated(df)
+    assert index.duplicated(plain).all()
+
+    # -0.0 and 0.0 are the same value to duplicated(), so to the index too
+    zeros = pd.DataFrame({"value": [0.0, -0.0, 1.0]})
+    assert DedupIndex().duplicated(zeros).tolist() == zeros.duplicated().tolist() == [False, True, False]
+
+
+def test_writer_matches_save(tmp_path):
+    df = chart_rows()
+    columns = ["Song", "Artist", "Date"]
+    index = DedupIndex(columns)
+    new = ~index.duplicated(df)
+    index.save(tmp_path / "saved.parquet")
+
+    # The distinct rows of each chunk, as the streaming cleaning adds them
+    with DedupIndexWriter(columns, tmp_path / "written.parquet", chunk_size=100) as writer:
+        for start in range(0, len(df), 700):
+            writer.add(df.iloc[start:start + 700], new[start:start + 700])
+    assert writer.rows == new.sum()
+
+    saved, written = pq.read_table(tmp_path / "saved.parquet"), pq.read_table(tmp_path / "written.parquet")
+    assert written.equals(saved, check_metadata=True)
+    # No runs left behind
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["saved.parquet", "written.parquet"]
@@ -0,0 +1,55 @@
+import numpy as np
+import pytest
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.datasets import make_classification
+from sklearn.linear_model import LogisticRegression
+from sklearn.preprocessing import StandardScaler
+
+from cleaning_plan import CleaningPlan
+from features import add_features, base_feature_cols
+from model_store import load_artifact
+from export_forest import export_forest
+from forest_predictor import CompiledForest, compile_forest
+
+
+def test_compiled_forest_matches_the_forest(trained):
+    export_forest()
+    forest = CompiledForest.load()
+    artifact = load_artifact("Random Forest")
+    model, scaler = artifact["model"], artifact["scaler"]
+
+    cleaned = add_features(CleaningPlan.load().transform(trained))
+    X = cleaned[artifact["feature_cols"]]
+    expected = model.predict_proba(scaler.transform(X))[:, 1]
+    assert np.array_equal(forest.predict_proba(X.to_numpy(dtype=np.float64)), expected)
+
+    # One raw track at a time, cleaned by the predictor, as the cleaning plan and the forest score it
+    by_track = np.array([forest.predict_track(track) for track in trained[base_feature_cols].to_dict("records")])
+    pipeline = np.full(len(trained), np.nan)
+    pipeline[cleaned.index.to_numpy()] = expected
+    assert np.array_equal(by_track, pipeline, equal_nan=True)
+    assert np.isnan(by_track).sum() == 3
+
+
+def test_values_on_the_thresholds():
+    X, y = make_classification(n_samples=400, n_features=5, random_state=3)
+    # Unlimited depth, so leaves end at many different depths
+    model = RandomForestClassifier(n_estimators=15, random_state=0).fit(X, y)
+    # A scaler that leaves the values as they are, so the rows below reach the trees unchanged
+    scaler = StandardScaler().fit(X)
+    scaler.mean_, scaler.scale_ = np.zeros(5), np.ones(5)
+    forest = CompiledForest(compile_forest(model, scaler, [f"x{i}" for i in range(5)], CleaningPlan()))
+
+    # Rows holding the split thresholds themselves and their float32 neighbours
+    thresholds = np.concatenate([tree.tree_.threshold[tree.tree_.feature >= 0] for tree in model.estimators_])
+    values = np.concatenate([thresholds, np.nextafter(thresholds.astype(np.float32), np.float32(np.inf))])
+    rows = np.resize(values, (len(values) // 5) * 5).reshape(-1, 5).astype(np.float64)
+    rows = np.vstack([rows, X])
+    assert np.array_equal(forest.predict_proba(rows), model.predict_proba(rows)[:, 1])
+    assert forest.predict_proba(rows[:1])[0] == model.predict_proba(rows[:1])[0, 1]
+
+
+def test_only_forests_compile():
+    X, y = make_classification(n_samples=100, n_features=4, random_state=0)
+    with pytest.raises(ValueError):
+        compile_forest(LogisticRegression().fit(X, y), StandardScaler().fit(X), list("abcd"), CleaningPlan())
@@ -0,0 +1,103 @@
+import random
+
+import numpy as np
+import pandas as pd
+
+from fuzzy_matching import (ARTIST_WEIGHT, TITLE_WEIGHT, artist_similarity, blocking_tokens, candidate_pairs,
+                            fuzzy_match, title_core, title_similarity)
+
+WORDS = ["love", "night", "baby", "heart", "fire", "dance", "dream", "girl", "time", "rain"]
+ARTISTS = ["the kids", "smith", "jones and lee", "wild band", "sun lee"]
+
+
+def keys(pairs):
+    df = pd.DataFrame(pairs, columns=["song", "artist"])
+    df["match_key"] = df["song"] + "_" + df["artist"]
+    return df.drop_duplicates("match_key", ignore_index=True)
+
+
+def sample_keys(seed=0):
+    """Spotify keys, and chart keys that are some of them written a little differently"""
+    picker = random.Random(seed)
+    spotify = [(" ".join(picker.sample(WORDS, picker.randint(1, 3))), picker.choice(ARTISTS)) for _ in range(150)]
+    chart = []
+    for song, artist in picker.sample(spotify, 60):
+        variant = picker.choice([
+            (song, artist), (song + " remastered 2009", artist), (song, artist + " featuring smith"),
+            (song + "s", artist), (song, "the " + artist),
+        ])
+        chart.append(variant)
+    chart += [("unknown song", "nobody"), ("love", "someone else")]
+    return keys(chart), keys(spotify)
+
+
+def test_candidates_share_a_block():
+    billboard, spotify = sample_keys()
+    rows, cols = candidate_pairs(billboard, spotify)
+
+    billboard_blocks = [set(blocking_tokens(t, a).split()) for t, a in zip(billboard["song"], billboard["artist"])]
+    spotify_blocks = [set(blocking_tokens(t, a).split()) for t, a in zip(spotify["song"], spotify["artist"])]
+    expected = {(i, j) for i, b in enumerate(billboard_blocks) for j, s in enumerate(spotify_blocks) if b & s}
+    assert set(zip(rows.tolist(), cols.tolist())) == expected
+    assert len(rows) == len(expected)
+
+
+def test_fuzzy_match_is_the_best_scored_candidate():
+    billboard, spotify = sample_keys(1)
+    result = fuzzy_match(billboard, spotify, threshold=0.8).set_index("match_key")
+
+    # Every candidate pair scored, the best one per chart key kept (ties to the first Spotify key)
+    spotify = spotify.sort_values("match_key", ignore_index=True)
+    rows, cols = candidate_pairs(billboard, spotify)
+    score = (TITLE_WEIGHT * title_similarity(billboard["song"].map(title_core), spotify["song"].map(title_core), rows, cols)
+             + ARTIST_WEIGHT * artist_similarity(billboard["artist"], spotify["artist"], rows, cols))
+    expected = {}
+    for row, col, value in sorted(zip(rows, cols, score), key=lambda pair: (pair[0], -pair[2], pair[1])):
+        if row not in expected:
+            expected[row] = (spotify["match_key"][col], round(float(value), 4))
+    expected = {billboard["match_key"][row]: best for row, best in expected.items() if best[1] >= 0.8}
+
+    assert {key: (row.spotify_key, row.match_confidence) for key, row in result.iterrows()} == expected
+    # Remaster suffixes and featured artists still find their song
+    assert len(result) >= 50
+
+
+def test_row_order_does_not_matter():
+    billboard, spotify = sample_keys(2)
+    expected = fuzzy_match(billboard, spotify)
+    shuffled = fuzzy_match(billboard.sample(frac=1, random_state=0), spotify.sample(frac=1, random_state=1))
+    pd.testing.assert_frame_equal(shuffled.sort_values("match_key", ignore_index=True),
+                                  expected.sort_values("match_key", ignore_index=True))
+    assert fuzzy_match(billboard.iloc[:0], spotify).empty
+
+
+def test_match_does_not_depend_on_the_batch():
+    billboard, spotify = sample_keys(3)
+    # Only the last chart key brings a Spotify credit with "bob" into the scored keys; "sun bob" shares one
+    # of its two tokens with "sun lee"
+    spotify = pd.concat([spotify, keys([("fire", "bob")])], ignore_index=True)
+    billboard = pd.concat([billboard, keys([("heart night time", "sun bob"), ("fire", "bob")])], ignore_index=True)
+    batch = fuzzy_match(billboard, spotify, threshold=0.5)
+    batch = {row.match_key: (row.spotify_key, row.match_confidence) for row in batch.itertuples()}
+
+    # Each key on its own gets the same Spotify key and confidence as in the whole batch
+    for i in range(len(billboard)):
+        alone = fuzzy_match(billboard.iloc[[i]], spotify, threshold=0.5)
+        alone = {row.match_key: (row.spotify_key, row.match_confidence) for row in alone.itertuples()}
+        key = billboard["match_key"][i]
+        assert alone == ({key: batch[key]} if key in batch else {})
+
+
+def test_unshared_artist_token_lowers_the_score():
+    spotify = keys([("hello world", "alice carol"), ("hello world", "alice"), ("goodbye", "bob")])
+    rows, cols = np.array([0, 0]), np.array([0, 1])
+
+    # "bob" isn't a token of the first Spotify credit, so only one of the two tokens is shared
+    score = artist_similarity(pd.Series(["alice bob"]), spotify["artist"].iloc[:2], rows, cols)
+    assert score.tolist() == [0.5, 1.0]
+    # Other Spotify credits holding "bob" don't change it
+    score = artist_similarity(pd.Series(["alice bob"]), spotify["artist"], rows, cols)
+    assert score.tolist() == [0.5, 1.0]
+
+    alone = fuzzy_match(keys([("hello world", "alice bob")]), spotify.iloc[[0]], threshold=0)
+    assert alone["match_confidence"].tolist() == [TITLE_WEIGHT + ARTIST_WEIGHT * 0.5]
@@ -0,0 +1,166 @@
+import importlib
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from storage import PROCESSED_DIR, RAW_DIR, iter_table, read_table
+
+integration = importlib.import_module("02_data_integration")
+
+OUTPUT_PATH = PROCESSED_DIR / "integrated_data.parquet"
+
+
+def integrate(**options):
+    """Run integrate_data() with the options and return the integrated table it wrote"""
+    integration.integrate_data(**options)
+    return read_table(OUTPUT_PATH)
+
+
+def add_fuzzy_songs():
+    """
+    Rewrite the raw tables so some chart songs are only found by fuzzy matching: a typo or a
+    remaster suffix in some titles, and a newest-week song credited to one of its artists and "Zed",
+    a token scored only through an oldest-week song by Zed, whatever batch each is matched in
+    """
+    chart_path = RAW_DIR / "billboard_hot_100.parquet"
+    spotify_path = RAW_DIR / "spotify_songs.parquet"
+    chart = pd.read_parquet(chart_path)
+    spotify = pd.read_parquet(spotify_path)
+
+    titles = pd.Series(chart["song"].unique())
+    picked = titles.iloc[::5]
+    variants = dict(zip(picked, [t[:-1] if i % 2 else t + " (Remastered 2009)" for i, t in enumerate(picked)]))
+    chart["song"] = chart["song"].replace(variants)
+
+    newest = chart.index[chart["date"] == chart["date"].max()][0]
+    oldest = chart.index[chart["date"] == chart["date"].min()][0]
+    chart.loc[newest, "song"] = chart.loc[newest, "song"][:-1]
+    chart.loc[newest, "artist"] = chart.loc[newest, "artist"].split()[-1] + " Zed"
+    chart.loc[oldest, ["song", "artist"]] = ["Xylophone Dream", "Zed"]
+    zed = spotify.iloc[[0]].assign(id="zed", name="Xylophone Dreams", artists="['Zed']")
+
+    chart.to_parquet(chart_path, index=False)
+    pd.concat([spotify, zed], ignore_index=True).to_parquet(spotify_path, index=False)
+
+
+def test_cached_keys_match_uncached(project):
+    expected = integrate(use_cache=False)
+    assert len(expected) > 0
+    assert not (PROCESSED_DIR / "normalization_cache.parquet").exists()
+
+    # The first cached run fills the cache, the second one reads every key from it
+    pd.testing.assert_frame_equal(integrate(), expected)
+    assert (PROCESSED_DIR / "normalization_cache.parquet").exists()
+    pd.testing.assert_frame_equal(integrate(), expected)
+
+
+def test_chunked_matches_in_memory(project):
+    expected = integrate(export_csv=True)
+    expected_csv = (PROCESSED_DIR / "integrated_data.csv").read_text()
+
+    # Chunks smaller than a chart week, so songs and weeks are spread over several runs
+    pd.testing.assert_frame_equal(integrate(chunk_size=25, export_csv=True), expected)
+    assert (PROCESSED_DIR / "integrated_data.csv").read_text() == expected_csv
+
+    # With fuzzy matching each chunk's new songs are matched as their own batch
+    add_fuzzy_songs()
+    expected = integrate(fuzzy=True)
+    assert (expected["match_confidence"] < 1).any()
+    pd.testing.assert_frame_equal(integrate(chunk_size=25, fuzzy=True), expected)
+
+
+def test_partitioned_matches_serial(project):
+    expected = integrate(use_cache=False)
+    for workers in [2, 3]:
+        pd.testing.assert_frame_equal(integrate(use_cache=False, workers=workers), expected)
+
+    expected = integrate(use_cache=False, fuzzy=True)
+    pd.testing.assert_frame_equal(integrate(use_cache=False, fuzzy=True, workers=2), expected)
+
+
+def test_partitioned_rejects_chunks(project):
+    with pytest.raises(ValueError):
+        integration.integrate_data(workers=2, chunk_size=100)
+
+
+def test_incremental_matches_full_rebuild(project, capsys):
+    chart_path = RAW_DIR / "billboard_hot_100.parquet"
+    chart = pd.read_parquet(chart_path)
+    # A last week that repeats the songs of the one before, so it holds no new song
+    repeat = chart[chart["date"] == chart["date"].max()].assign(date=chart["date"].max() + pd.Timedelta(days=7))
+    chart = pd.concat([repeat, chart], ignore_index=True)
+    weeks = sorted(chart["date"].unique())
+
+    # All but the last two weeks, then one more week, then the rest
+    chart[chart["date"] <= weeks[-3]].to_parquet(chart_path, index=False)
+    integrate(export_csv=True)
+    chart[chart["date"] <= weeks[-2]].to_parquet(chart_path, index=False)
+    integrate(incremental=True)
+    chart.to_parquet(chart_path, index=False)
+    capsys.readouterr()
+    incremental = integrate(incremental=True)
+    assert "Incremental run: 40 chart rows" in capsys.readouterr().out
+    incremental_csv = (PROCESSED_DIR / "integrated_data.csv").read_text()
+    chunks = pd.concat(list(iter_table(OUTPUT_PATH, chunk_size=100)), ignore_index=True)
+
+    # Each run appended its weeks as a part file
+    assert OUTPUT_PATH.is_dir()
+    assert len(list(OUTPUT_PATH.glob("part-*.parquet"))) == 3
+    # Nothing newer, nothing to do
+    assert integration.integrate_data(incremental=True) is None
+
+    expected = integrate(export_csv=True)
+    pd.testing.assert_frame_equal(incremental, expected)
+    pd.testing.assert_frame_equal(chunks, expected)
+    assert (PROCESSED_DIR / "integrated_data.csv").read_text() == incremental_csv
+    # The full rebuild replaced the part files with one file
+    assert OUTPUT_PATH.is_file()
+
+
+def test_incremental_fuzzy_matches_full_rebuild(project):
+    add_fuzzy_songs()
+    chart_path = RAW_DIR / "billboard_hot_100.parquet"
+    chart = pd.read_parquet(chart_path)
+
+    # The newest week's unseen songs are fuzzy matched on their own, apart from the songs before them
+    chart[chart["date"] < chart["date"].max()].to_parquet(chart_path, index=False)
+    integrate(fuzzy=True)
+    chart.to_parquet(chart_path, index=False)
+    incremental = integrate(fuzzy=True, incremental=True)
+    assert OUTPUT_PATH.is_dir()
+
+    expected = integrate(fuzzy=True)
+    assert (expected["match_confidence"] < 1).any()
+    pd.testing.assert_frame_equal(incremental, expected)
+
+
+def test_one_track_per_chart_row(integrated):
+    chart = pd.read_parquet(RAW_DIR / "billboard_hot_100.parquet")
+    # Songs with several Spotify versions don't multiply their chart weeks
+    assert len(integrated) == len(chart)
+    assert not integrated.duplicated(["Date", "Rank"]).any()
+
+
+def test_canonical_track_rule():
+    rng = np.random.default_rng(4)
+    n = 300
+    spotify = pd.DataFrame({
+        "popularity": pd.array(rng.choice([10, 50, 90, None], n), dtype="Int64"),
+        "release_date": rng.choice(["1990-01-01", "1985-06-01", "1990", None], n),
+    })
+    song_ids = rng.integers(0, 40, 500)
+    rows = rng.integers(0, n, 500)
+    track, versions = integration.pick_canonical_tracks(song_ids, rows, spotify, 45)
+
+    for song in range(45):
+        candidates = sorted(set(rows[song_ids == song].tolist()))
+        if not candidates:
+            assert track[song] == -1 and versions[song] == 0
+            continue
+        # Highest popularity, then earliest release date, then the first row
+        popularity = spotify["popularity"].fillna(-1)
+        released = spotify["release_date"].fillna("9999")
+        best = min(candidates, key=lambda row: (-popularity[row], released[row], row))
+        assert track[song] == best
+        assert versions[song] == (song_ids == song).sum()
@@ -0,0 +1,41 @@
+import pytest
+from sklearn.datasets import make_classification
+
+from model_registry import MODEL_REGISTRY, REPORT_MODELS, build_models, compare_models, load_model_config
+from training import train_models
+
+
+def test_default_config_trains_the_report_models(project):
+    # The shipped config, and no config at all
+    assert list(load_model_config()) == REPORT_MODELS
+    assert list(load_model_config(project / "missing.yaml")) == REPORT_MODELS
+    assert list(build_models(load_model_config())) == [MODEL_REGISTRY[name]["label"] for name in REPORT_MODELS]
+
+
+def test_config_adds_backends_and_overrides(tmp_path):
+    path = tmp_path / "models.yaml"
+    path.write_text("models:\n  - hist_gradient_boosting:\n      max_iter: 50\n  - random_forest:\n      n_estimators: 10\n")
+    models = build_models(load_model_config(path))
+
+    # Report models first, the extra backend after them, whatever the config order
+    assert list(models) == ["Random Forest", "Logistic Regression", "Gradient Boosting Classifier", "Histogram Gradient Boosting"]
+    assert models["Histogram Gradient Boosting"].max_iter == 50
+    assert models["Random Forest"].n_estimators == 10
+    # The other defaults are kept
+    assert models["Random Forest"].max_depth == MODEL_REGISTRY["random_forest"]["params"]["max_depth"]
+
+    path.write_text("models:\n  - xgboost\n")
+    with pytest.raises(ValueError):
+        load_model_config(path)
+
+
+def test_compare_models(tmp_path):
+    path = tmp_path / "models.yaml"
+    path.write_text("models:\n  - random_forest:\n      n_estimators: 10\n  - gradient_boosting:\n      n_estimators: 10\n")
+    X, y = make_classification(n_samples=300, n_features=8, random_state=0)
+    models, times = train_models(build_models(load_model_config(path)), X[:200], y[:200], cores=1)
+
+    comparison = compare_models(models, times, X[200:], y[200:])
+    assert list(comparison["model"]) == list(models)
+    assert list(comparison.columns) == ["model", "cores", "fit_seconds", "predict_seconds", "roc_auc"]
+    assert comparison["roc_auc"].between(0, 1).all()
@@ -0,0 +1,56 @@
+import numpy as np
+from sklearn.datasets import make_classification
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.linear_model import LogisticRegression
+from sklearn.preprocessing import StandardScaler
+
+from model_store import load_artifact, read_manifest, train_or_load
+
+FEATURES = [f"feature_{i}" for i in range(6)]
+
+
+def models(n_estimators=20):
+    return {
+        "Random Forest": RandomForestClassifier(n_estimators=n_estimators, max_depth=5, random_state=42),
+        "Logistic Regression": LogisticRegression(max_iter=500, random_state=42),
+    }
+
+
+def test_unchanged_models_are_loaded(tmp_path):
+    X, y = make_classification(n_samples=300, n_features=len(FEATURES), random_state=0)
+    scaler = StandardScaler().fit(X)
+    model_dir = tmp_path / "models"
+
+    trained, times, loaded = train_or_load(models(), X, y, FEATURES, scaler, cores=1, model_dir=model_dir)
+    assert loaded == set()
+    again, again_times, loaded = train_or_load(models(), X, y, FEATURES, scaler, cores=1, model_dir=model_dir)
+    assert loaded == {"Random Forest", "Logistic Regression"}
+    assert again_times == times
+    for label, model in trained.items():
+        assert np.array_equal(again[label].predict_proba(X), model.predict_proba(X))
+
+    artifact = load_artifact("Random Forest", model_dir)
+    assert artifact["feature_cols"] == FEATURES
+    assert np.array_equal(artifact["model"].predict_proba(X), trained["Random Forest"].predict_proba(X))
+
+    # Other hyperparameters retrain that model alone, and its old artifact goes
+    old_file = read_manifest(model_dir)["Random Forest"]["file"]
+    _, _, loaded = train_or_load(models(n_estimators=30), X, y, FEATURES, scaler, cores=1, model_dir=model_dir)
+    assert loaded == {"Logistic Regression"}
+    assert not (model_dir / old_file).exists()
+    assert len(list(model_dir.glob("*.joblib"))) == 2
+
+    # So do new training rows, and retrain fits everything again
+    _, _, loaded = train_or_load(models(n_estimators=30), X[1:], y[1:], FEATURES, scaler, cores=1, model_dir=model_dir)
+    assert loaded == set()
+    _, _, loaded = train_or_load(models(n_estimators=30), X[1:], y[1:], FEATURES, scaler, cores=1, retrain=True, model_dir=model_dir)
+    assert loaded == set()
+
+
+def test_n_jobs_does_not_change_the_key(tmp_path):
+    X, y = make_classification(n_samples=200, n_features=len(FEATURES), random_state=1)
+    scaler = StandardScaler().fit(X)
+    train_or_load(models(), X, y, FEATURES, scaler, cores=1, model_dir=tmp_path)
+    threaded = models()
+    threaded["Random Forest"].set_params(n_jobs=4)
+    assert train_or_load(threaded, X, y, FEATURES, scaler, cores=1, model_dir=tmp_path)[2] == {"Random Forest", "Logistic Regression"}
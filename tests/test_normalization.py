@@ -0,0 +1,68 @@
+import random
+
+import numpy as np
+import pandas as pd
+
+from storage import RAW_DIR, read_table
+import normalization
+from normalization import NormalizationCache, clean_string, normalize_artists, normalize_text
+
+
+def original_artists(values):
+    """The per-value loop normalize_artists() replaced"""
+    return [clean_string(str(artist).replace("[", "").replace("]", "").replace("'", "")) for artist in values]
+
+
+def test_normalize_text_matches_clean_string():
+    picker = random.Random(0)
+    alphabet = [chr(i) for i in range(128)] * 3 + list("éÉßİ \u0085 Ωж日本́½²_")
+    values = ["".join(picker.choice(alphabet) for _ in range(picker.randint(0, 12))) for _ in range(5000)]
+    values += [None, np.nan, 12, 3.5, "", "   ", " a ", "a  b", "x -", "Beyoncé & JAY-Z", "P!nk", "Ke$ha"]
+    values = pd.Series(values, dtype=object)
+
+    assert list(normalize_text(values)) == [clean_string(value) for value in values]
+    # A slice keeps its index, the keys have to line up with it
+    part = values.iloc[100:600]
+    result = normalize_text(part)
+    assert list(result) == [clean_string(value) for value in part]
+    assert result.index.equals(part.index)
+
+
+def test_normalize_text_empty_column():
+    assert list(normalize_text(pd.Series([], dtype=object))) == []
+    assert list(normalize_text(pd.Series(["", "  "], dtype=object))) == ["", ""]
+
+
+def test_match_keys_identical_on_raw_tables(project):
+    billboard = read_table(RAW_DIR / "billboard_hot_100.parquet", columns=["song", "artist"])
+    spotify = read_table(RAW_DIR / "spotify_songs.parquet", columns=["name", "artists"])
+
+    assert list(normalize_text(billboard["song"])) == list(billboard["song"].apply(clean_string))
+    assert list(normalize_text(billboard["artist"])) == list(billboard["artist"].apply(clean_string))
+    assert list(normalize_text(spotify["name"])) == list(spotify["name"].apply(clean_string))
+    assert list(normalize_artists(spotify["artists"])) == original_artists(spotify["artists"])
+
+
+def test_cache_matches_normalize_text(tmp_path):
+    values = pd.Series(["Hello, World!", "hello world", None, "Beyoncé", "Hello, World!", "", "P!nk"] * 3, dtype=object)
+    cache = NormalizationCache(tmp_path / "cache.parquet")
+    result = cache.normalize(values)
+    assert list(result) == list(normalize_text(values))
+    assert result.index.equals(values.index)
+    assert cache.misses == len(pd.unique(values.fillna("")))
+
+    # Saved and loaded, only the unseen strings are normalized again
+    assert cache.save()
+    loaded = NormalizationCache.load(tmp_path / "cache.parquet")
+    more = pd.Series(["hello world", "New Song", "Beyoncé"], dtype=object)
+    assert list(loaded.normalize(more)) == list(normalize_text(more))
+    assert (loaded.hits, loaded.misses) == (2, 1)
+    assert list(loaded.normalize(more, na_value="nan")) == list(normalize_artists(more))
+
+
+def test_cache_ignores_other_rules(tmp_path, monkeypatch):
+    cache = NormalizationCache(tmp_path / "cache.parquet")
+    cache.normalize(pd.Series(["A b", "c"], dtype=object))
+    cache.save()
+    monkeypatch.setattr(normalization, "RULES_VERSION", normalization.RULES_VERSION + 1)
+    assert len(NormalizationCache.load(tmp_path / "cache.parquet")) == 0
@@ -0,0 +1,68 @@
+import numpy as np
+import pandas as pd
+
+import profile_cache
+from profile_cache import load_profiles, merge_profiles, yearly_profiles
+from profiler import profile
+from schema import compact
+
+
+def chart_table(seed=0, n=6000):
+    """Chart-like rows over five years, a few without a date"""
+    rng = np.random.default_rng(seed)
+    df = pd.DataFrame({
+        "Date": pd.Timestamp("2015-01-03") + pd.to_timedelta(np.sort(rng.integers(0, 260, n)) * 7, unit="D"),
+        "Song": rng.choice([f"song {i}" for i in range(300)], n),
+        "Rank": rng.integers(1, 101, n),
+        "energy": rng.random(n),
+        "loudness": -rng.gamma(2, 4, n),
+        "popularity": pd.array(rng.integers(0, 100, n), dtype="Int8"),
+    })
+    df.loc[rng.random(n) < 0.03, "energy"] = None
+    df.loc[[0, 1], "Date"] = None
+    return compact(df)
+
+
+def merged_result(df, path):
+    return merge_profiles(yearly_profiles(df, path)).result()
+
+
+def test_cached_profile_matches_uncached(tmp_path, capsys):
+    df = chart_table()
+    path = tmp_path / "profile_cache.parquet"
+    expected = merged_result(df, path)
+    assert "6 of 6 chart years profiled" in capsys.readouterr().out
+
+    # Every year from the cache, the same numbers
+    pd.testing.assert_frame_equal(merged_result(df, path), expected)
+    assert "0 of 6 chart years profiled" in capsys.readouterr().out
+
+    # Counts are exact whichever way the profile was built
+    exact = profile(df)
+    assert (expected["nulls"] == exact["nulls"]).all()
+    numeric = ["Rank", "energy", "loudness", "popularity"]
+    for stat in ["count", "min", "max"]:
+        assert np.array_equal(expected.loc[numeric, stat], exact.loc[numeric, stat].astype(np.float64))
+
+
+def test_changed_year_is_profiled_again(tmp_path, capsys):
+    df = chart_table()
+    path = tmp_path / "profile_cache.parquet"
+    merged_result(df, path)
+
+    changed = df.copy()
+    changed.loc[changed["Date"].dt.year == 2019, "energy"] = 0.5
+    capsys.readouterr()
+    result = merged_result(changed, path)
+    assert "1 of 6 chart years profiled (2019)" in capsys.readouterr().out
+    pd.testing.assert_frame_equal(result, merged_result(changed, tmp_path / "fresh.parquet"))
+
+
+def test_cache_of_another_version_is_ignored(tmp_path, monkeypatch):
+    df = chart_table()
+    path = tmp_path / "profile_cache.parquet"
+    merged_result(df, path)
+    assert len(load_profiles(path)[0]) == 6
+
+    monkeypatch.setattr(profile_cache, "PROFILE_CACHE_VERSION", profile_cache.PROFILE_CACHE_VERSION + 1)
+    assert load_profiles(path) == ({}, {})
@@ -0,0 +1,65 @@
+import importlib
+
+import numpy as np
+import pandas as pd
+
+from schema import compact
+from profiler import DESCRIBE_STATS, profile
+from validation import RULES_PATH, load_rules, rule_ranges
+
+quality = importlib.import_module("03_data_quality")
+
+
+def with_gaps(df):
+    """The integrated table with some missing values and out-of-range values added"""
+    df = df.copy()
+    rng = np.random.default_rng(3)
+    for col in ["danceability", "loudness", "Peak Position", "Song"]:
+        df.loc[rng.choice(len(df), 20, replace=False), col] = None
+    df.loc[[0, 5], "energy"] = 1.5
+    return compact(df)
+
+
+def test_profile_matches_pandas(integrated):
+    df = with_gaps(integrated)
+    ranges = rule_ranges(load_rules(RULES_PATH))
+    column_profile = profile(df, ranges=ranges)
+
+    pd.testing.assert_series_equal(column_profile["nulls"], df.isnull().sum(), check_names=False)
+
+    stats = column_profile.loc[quality.NUMERIC_COLS, DESCRIBE_STATS].T
+    expected = df[quality.NUMERIC_COLS].describe()
+    assert stats.to_string() == expected.to_string()
+    assert np.array_equal(stats.to_numpy(), expected.to_numpy(), equal_nan=True)
+
+    for col in quality.NUMERIC_COLS:
+        q1, q3 = df[col].quantile(0.25), df[col].quantile(0.75)
+        outliers = ((df[col] < q1 - 1.5 * (q3 - q1)) | (df[col] > q3 + 1.5 * (q3 - q1))).sum()
+        assert column_profile.loc[col, "outliers"] == outliers
+
+    for col, (low, high) in ranges.items():
+        if col in df.columns and pd.api.types.is_numeric_dtype(df[col]):
+            assert column_profile.loc[col, "range_violations"] == ((df[col] < low) | (df[col] > high)).sum()
+    assert column_profile.loc["energy", "range_violations"] == 2
+
+
+def test_profile_matches_pandas_with_missing_values():
+    rng = np.random.default_rng(7)
+    for _ in range(20):
+        n = int(rng.integers(5, 400))
+        df = pd.DataFrame({
+            "f32": rng.normal(0, 1, n).astype(np.float32),
+            "f64": rng.standard_cauchy(n),
+            "ints": pd.array(rng.integers(-5, 100, n), dtype="Int16"),
+        })
+        for col in df.columns:
+            df.loc[rng.random(n) < 0.1, col] = None
+        column_profile = profile(df)
+
+        expected = df.describe()
+        assert np.array_equal(column_profile.loc[df.columns, DESCRIBE_STATS].T.to_numpy(dtype=float),
+                              expected.to_numpy(dtype=float), equal_nan=True)
+        for col in df.columns:
+            q1, q3 = df[col].quantile(0.25), df[col].quantile(0.75)
+            outliers = ((df[col] < q1 - 1.5 * (q3 - q1)) | (df[col] > q3 + 1.5 * (q3 - q1))).sum()
+            assert column_profile.loc[col, "outliers"] == outliers
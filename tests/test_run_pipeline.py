@@ -0,0 +1,69 @@
+import importlib
+import json
+from pathlib import Path
+
+import pandas as pd
+
+from storage import PROCESSED_DIR, read_table
+from run_pipeline import run_pipeline
+
+integration = importlib.import_module("02_data_integration")
+quality = importlib.import_module("03_data_quality")
+cleaning = importlib.import_module("04_data_cleaning")
+analysis = importlib.import_module("05_data_analysis")
+
+TABLES = [PROCESSED_DIR / "integrated_data.parquet", PROCESSED_DIR / "cleaned_data.parquet"]
+
+
+def outputs():
+    """What the stages leave behind, without the timings in them"""
+    report = json.loads(Path("data/processed/quality_report.json").read_text())
+    for rule in report["validation"].values():
+        rule.pop("pass_ms")
+    results = Path("results/analysis_results.txt").read_text()
+    return {
+        "quality_report": report,
+        "cleaning_plan": Path("data/processed/cleaning_plan.json").read_text(),
+        "dedup_index": read_table(PROCESSED_DIR / "dedup_index.parquet"),
+        # Everything up to the training times
+        "analysis_results": results[:results.index("6. Model Training Times")],
+        "models": Path("models/manifest.json").read_text(),
+    }
+
+
+def assert_same(left, right):
+    for name in left:
+        if isinstance(left[name], pd.DataFrame):
+            pd.testing.assert_frame_equal(left[name], right[name])
+        else:
+            assert left[name] == right[name], name
+
+
+def test_pipeline_matches_separate_stages(project):
+    # One script after another, each reading what the one before wrote
+    integration.integrate_data()
+    quality.assess_quality()
+    cleaning.clean_data()
+    expected_results = analysis.analyze_data()
+    expected = outputs()
+    tables = [read_table(path) for path in TABLES]
+
+    for path in TABLES:
+        path.unlink()
+    results, timings = run_pipeline()
+    assert list(timings) == ["integration", "quality", "cleaning", "analysis"]
+    # Kept in memory only
+    assert not any(path.exists() for path in TABLES)
+    assert_same(outputs(), expected)
+    for name in ["Random Forest Accuracy", "Logistic Regression Accuracy", "Gradient Boosting Classifier Accuracy"]:
+        assert results[name] == expected_results[name]
+    pd.testing.assert_frame_equal(results["Feature Comparison"], expected_results["Feature Comparison"])
+
+    run_pipeline(save_intermediates=True)
+    assert_same(outputs(), expected)
+    for path, table in zip(TABLES, tables):
+        pd.testing.assert_frame_equal(read_table(path), table)
+
+    results, timings = run_pipeline(from_integrated=True)
+    assert list(timings) == ["load integrated data", "quality", "cleaning", "analysis"]
+    assert_same(outputs(), expected)
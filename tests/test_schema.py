@@ -0,0 +1,46 @@
+import numpy as np
+import pandas as pd
+
+from storage import read_table, write_table
+from schema import compact
+
+
+def sample_table():
+    return pd.DataFrame({
+        "Date": ["2020-01-04", "2020-01-04", "2020-01-11", "2020-01-11"],
+        "Song": ["a", "b", "a", "b"],
+        "Rank": [1, 2, 1, 2],
+        "Last Week": ["-", "1", "2", "1"],
+        "Peak Position": [1, 2, np.nan, 1],
+        "duration_ms": [200_000, 3_000_000_000, 180_000, 210_000],
+        "danceability": [0.1, 0.2, 0.3, 0.4],
+        "loudness": [-5.25, -7.5, -6.125, -4.0],
+    })
+
+
+def test_compact_keeps_values():
+    df = sample_table()
+    compacted = compact(df)
+
+    assert compacted["Rank"].dtype == "int8"
+    # A missing value needs the nullable type, a value too large for int32 the next wider one
+    assert compacted["Peak Position"].dtype == "Int8"
+    assert compacted["duration_ms"].dtype == "int64"
+    assert isinstance(compacted["Song"].dtype, pd.CategoricalDtype)
+    assert isinstance(compacted["Last Week"].dtype, pd.CategoricalDtype)
+    assert compacted["danceability"].dtype == "float32"
+    assert compacted["loudness"].dtype == "float64"
+
+    for col in ["Song", "Rank", "Last Week", "duration_ms", "loudness"]:
+        assert list(compacted[col].astype(object)) == list(df[col])
+    assert compacted["Peak Position"].isna().tolist() == df["Peak Position"].isna().tolist()
+    assert np.array_equal(compacted["danceability"], df["danceability"].astype(np.float32))
+    # The input is left as it was
+    assert df["Rank"].dtype == "int64"
+
+
+def test_compact_survives_parquet(tmp_path):
+    compacted = compact(sample_table())
+    write_table(compacted, tmp_path / "table.parquet")
+    pd.testing.assert_frame_equal(compact(read_table(tmp_path / "table.parquet")), compacted)
+    pd.testing.assert_frame_equal(compact(compacted), compacted)
@@ -0,0 +1,33 @@
+import numpy as np
+import pandas as pd
+
+from storage import RAW_DIR, read_table
+from cleaning_plan import CleaningPlan
+from features import add_features
+from model_store import load_artifact
+from score_catalog import score_catalog
+
+
+def test_scores_match_the_model(trained, tmp_path):
+    score_catalog(input_path=RAW_DIR / "catalog.parquet", output_path=tmp_path / "scores.parquet", chunk_size=1000)
+    scores = read_table(tmp_path / "scores.parquet")
+
+    # The plan, the features and the model applied to the whole catalog at once
+    artifact = load_artifact("Random Forest")
+    cleaned = CleaningPlan.load().transform(trained)
+    X = artifact["scaler"].transform(add_features(cleaned)[artifact["feature_cols"]])
+    expected = np.full(len(trained), np.nan)
+    expected[cleaned.index] = artifact["model"].predict_proba(X)[:, 1]
+
+    assert scores["id"].tolist() == trained["id"].tolist()
+    assert np.array_equal(scores["probability"].to_numpy(), expected, equal_nan=True)
+    assert scores["probability"].isna().sum() == 3
+
+
+def test_chunks_and_workers_give_the_same_scores(trained, tmp_path):
+    score_catalog(input_path=RAW_DIR / "catalog.parquet", output_path=tmp_path / "whole.parquet", chunk_size=1000)
+    expected = read_table(tmp_path / "whole.parquet")
+    for chunk_size, workers in [(37, 1), (37, 2), (150, 3)]:
+        score_catalog(input_path=RAW_DIR / "catalog.parquet", output_path=tmp_path / "scores.parquet",
+                      chunk_size=chunk_size, workers=workers)
+        pd.testing.assert_frame_equal(read_table(tmp_path / "scores.parquet"), expected)
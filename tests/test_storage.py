@@ -0,0 +1,94 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from storage import (RAW_DIR, RAW_SCHEMAS, TableWriter, append_table, iter_table, merge_sorted_runs, read_raw_csv,
+                     read_table, table_columns, write_table)
+
+
+def test_table_writer_widens_schema(tmp_path):
+    chunks = [
+        pd.DataFrame({"key": np.array([1, 2], dtype="int8"), "note": [None, None], "value": [0.5, 1.5]}),
+        pd.DataFrame({"key": np.array([300, 70000], dtype="int32"), "note": ["a", None], "value": [2.5, np.nan]}),
+        pd.DataFrame({"key": np.array([3], dtype="int8"), "note": ["b"], "value": [3.5]}),
+    ]
+    with TableWriter(tmp_path / "chunked.parquet", export_csv=True) as writer:
+        for chunk in chunks:
+            writer.write(chunk)
+    write_table(pd.concat(chunks, ignore_index=True), tmp_path / "whole.parquet", export_csv=True)
+
+    assert writer.rows == 5
+    pd.testing.assert_frame_equal(read_table(tmp_path / "chunked.parquet"), read_table(tmp_path / "whole.parquet"))
+    assert (tmp_path / "chunked.csv").read_text() == (tmp_path / "whole.csv").read_text()
+
+
+def test_merge_sorted_runs_is_a_stable_sort(tmp_path):
+    rng = np.random.default_rng(0)
+    runs = []
+    for i in range(4):
+        run = pd.DataFrame({"key": np.sort(rng.integers(0, 50, 3000)), "run": i, "row": np.arange(3000)})
+        if i == 2:
+            # Runs written from other chunks can compact a column to another type
+            run["row"] = run["row"].astype("int16")
+        runs.append(tmp_path / f"run_{i}.parquet")
+        run.to_parquet(runs[-1], index=False)
+
+    merge_sorted_runs(runs, tmp_path / "merged.parquet", key="key", chunk_size=1000)
+    expected = pd.concat([pd.read_parquet(run) for run in runs], ignore_index=True).sort_values("key", kind="stable")
+    pd.testing.assert_frame_equal(read_table(tmp_path / "merged.parquet"), expected.reset_index(drop=True))
+
+
+def test_merge_sorted_runs_empty(tmp_path):
+    with pytest.raises(ValueError):
+        merge_sorted_runs([], tmp_path / "merged.parquet", key="key")
+
+    empty = tmp_path / "empty.parquet"
+    pd.DataFrame({"key": pd.Series([], dtype="int64"), "value": pd.Series([], dtype="float64")}).to_parquet(empty)
+    merge_sorted_runs([empty, empty], tmp_path / "merged.parquet", key="key")
+    merged = read_table(tmp_path / "merged.parquet")
+    assert merged.empty and list(merged.columns) == ["key", "value"]
+
+
+def test_append_table_writes_parts(tmp_path):
+    weeks = [
+        pd.DataFrame({"week": [1, 1], "rank": np.array([1, 2], dtype="int8"), "note": [None, None]}),
+        pd.DataFrame({"week": [2], "rank": np.array([300], dtype="int16"), "note": ["x"]}),
+        pd.DataFrame({"week": [3, 3], "rank": np.array([1, 2], dtype="int8"), "note": ["y", None]}),
+    ]
+    path = tmp_path / "table.parquet"
+    for week in weeks:
+        append_table(week, path, export_csv=True)
+    write_table(pd.concat(weeks, ignore_index=True), tmp_path / "whole.parquet", export_csv=True)
+    whole = read_table(tmp_path / "whole.parquet")
+
+    # The first file became part 0, each append its own part
+    assert [part.name for part in sorted(path.iterdir())] == [f"part-0000{i}.parquet" for i in range(3)]
+    pd.testing.assert_frame_equal(read_table(path), whole)
+    pd.testing.assert_frame_equal(pd.concat(list(iter_table(path, chunk_size=1)), ignore_index=True), whole)
+    pd.testing.assert_frame_equal(read_table(path, columns=["week"], filters=[("week", ">", 1)]),
+                                  whole.loc[whole["week"] > 1, ["week"]].reset_index(drop=True))
+    assert table_columns(path) == ["week", "rank", "note"]
+    assert (tmp_path / "table.csv").read_text() == (tmp_path / "whole.csv").read_text()
+
+    # Writing the table again replaces the parts with one file
+    write_table(whole, path)
+    assert path.is_file()
+    pd.testing.assert_frame_equal(read_table(path), whole)
+
+
+def test_raw_parquet_matches_csv(project):
+    for name in ["billboard_hot_100.csv", "spotify_songs.csv"]:
+        csv_path = RAW_DIR / name
+        typed = read_raw_csv(csv_path)
+        pd.testing.assert_frame_equal(pd.read_parquet(csv_path.with_suffix(".parquet")), typed)
+
+        # Same values as a plain CSV read, only with the schema's types
+        plain = pd.read_csv(csv_path, parse_dates=RAW_SCHEMAS[name]["dates"])
+        pd.testing.assert_frame_equal(typed, plain, check_dtype=False)
+        for col, dtype in RAW_SCHEMAS[name]["dtypes"].items():
+            if col in typed.columns and dtype != str:
+                assert typed[col].dtype == dtype, col
+
+        columns = list(typed.columns[::2])
+        chunks = pd.concat(read_raw_csv(csv_path, columns=columns, chunk_size=97), ignore_index=True)
+        pd.testing.assert_frame_equal(chunks, typed[columns])
@@ -0,0 +1,116 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from profiler import profile
+from schema import compact
+from streaming_stats import DuplicateFilter, QuantileSketch, StreamingProfile, rank_error
+
+
+def random_table(n=20_000, seed=0):
+    """Columns of several dtypes and shapes, with missing values, more rows than a sketch keeps"""
+    rng = np.random.default_rng(seed)
+    df = pd.DataFrame({
+        "normal": rng.normal(0, 1, n),
+        "skewed": rng.lognormal(0, 2, n).astype(np.float32),
+        "ints": pd.array(rng.integers(0, 100, n), dtype="Int16"),
+        "steps": rng.integers(0, 5, n).astype(np.int8),
+        "text": rng.choice(["a", "b", None], n),
+    })
+    for col in ["normal", "skewed", "ints"]:
+        df.loc[rng.random(n) < 0.05, col] = None
+    return df
+
+
+def rank_errors(values, estimates, probes):
+    """How far (as a fraction of the rows) the rank of each estimate is from its q * (n - 1)"""
+    ordered = np.sort(values[~np.isnan(values)])
+    low = np.searchsorted(ordered, estimates, side="left")
+    high = np.searchsorted(ordered, estimates, side="right") - 1
+    target = np.asarray(probes) * (len(ordered) - 1)
+    return np.maximum(0, np.maximum(low - target, target - high)) / len(ordered)
+
+
+def test_streaming_profile_matches_profile():
+    df = random_table()
+    exact = profile(df)
+
+    stream = StreamingProfile()
+    for start in range(0, len(df), 3000):
+        stream.update(df.iloc[start:start + 3000])
+    streamed = stream.result()
+
+    assert list(streamed.index) == list(df.columns)
+    assert stream.numeric == ["normal", "skewed", "ints", "steps"]
+    assert (streamed["nulls"] == exact["nulls"]).all()
+    numeric = exact.loc[stream.numeric]
+    for stat in ["count", "min", "max"]:
+        assert np.array_equal(streamed.loc[stream.numeric, stat], numeric[stat].astype(np.float64))
+    for stat in ["mean", "std"]:
+        assert np.allclose(streamed.loc[stream.numeric, stat], numeric[stat].astype(np.float64), rtol=1e-6)
+
+    # The quartiles come from the sketches, within their error bound
+    for col in stream.numeric:
+        values = df[col].to_numpy(dtype=np.float64, na_value=np.nan)
+        errors = rank_errors(values, streamed.loc[col, ["25%", "50%", "75%"]].to_numpy(dtype=np.float64), [0.25, 0.5, 0.75])
+        assert errors.max() <= rank_error(), col
+
+
+def test_merged_profiles_match_one_stream():
+    df = random_table(seed=1)
+    whole = StreamingProfile()
+    whole.update(df)
+
+    parts = [StreamingProfile() for _ in range(3)]
+    for part, rows in zip(parts, np.array_split(np.arange(len(df)), 3)):
+        part.update(df.iloc[rows])
+    merged = StreamingProfile()
+    merged.merge(*parts)
+
+    expected, result = whole.result(), merged.result()
+    assert (result["nulls"] == expected["nulls"]).all()
+    for stat in ["count", "min", "max"]:
+        assert np.array_equal(result[stat], expected[stat], equal_nan=True)
+    assert np.allclose(result.loc[whole.numeric, ["mean", "std"]], expected.loc[whole.numeric, ["mean", "std"]], rtol=1e-9)
+
+    # Profiles of other columns don't merge
+    other = StreamingProfile()
+    other.update(df[["normal"]])
+    with pytest.raises(ValueError):
+        merged.merge(other)
+
+
+def test_sketch_quantiles_within_bound():
+    rng = np.random.default_rng(2)
+    probes = [0.01, 0.05, 0.25, 0.5, 0.75, 0.95, 0.99]
+    for values in [rng.normal(0, 1, 50_000), rng.pareto(1.5, 50_000), rng.integers(0, 10, 50_000).astype(float)]:
+        sketch = QuantileSketch()
+        for chunk in np.array_split(values, 17):
+            sketch.update(chunk)
+        assert sketch.count == len(values)
+        assert len(sketch) < 4 * sketch.k
+        assert rank_errors(values, sketch.quantile(probes), probes).max() <= rank_error()
+        assert sketch.quantile([0, 1]).tolist() == [values.min(), values.max()]
+
+    assert np.isnan(QuantileSketch().quantile(0.5)).all()
+
+
+def test_duplicate_filter_matches_duplicated():
+    rng = np.random.default_rng(3)
+    n = 5000
+    df = compact(pd.DataFrame({
+        "Date": pd.Timestamp("2000-01-01") + pd.to_timedelta(np.sort(rng.integers(0, 50, n)) * 7, unit="D"),
+        "Song": rng.choice([f"song {i}" for i in range(40)], n),
+        "Rank": rng.integers(1, 30, n),
+    }))
+
+    for columns in [["Date", "Rank"], ["Song", "Rank"], None]:
+        duplicates = DuplicateFilter(columns)
+        found = np.concatenate([duplicates.duplicated(df.iloc[start:start + 333]) for start in range(0, n, 333)])
+        assert np.array_equal(found, df.duplicated(columns).to_numpy()), columns
+
+    # Rows keyed by Date have to come in date order
+    duplicates = DuplicateFilter(["Date", "Rank"])
+    duplicates.duplicated(df.iloc[n // 2:])
+    with pytest.raises(ValueError):
+        duplicates.duplicated(df.iloc[:n // 2])
@@ -0,0 +1,39 @@
+import numpy as np
+from sklearn.datasets import make_classification
+from sklearn.ensemble import GradientBoostingClassifier, HistGradientBoostingClassifier, RandomForestClassifier
+from sklearn.linear_model import LogisticRegression
+
+from training import assign_cores, train_models
+
+
+def small_models():
+    return {
+        "Random Forest": RandomForestClassifier(n_estimators=40, max_depth=6, random_state=42),
+        "Logistic Regression": LogisticRegression(max_iter=500, random_state=42),
+        "Gradient Boosting Classifier": GradientBoostingClassifier(n_estimators=20, max_depth=3, random_state=42),
+        "Histogram Gradient Boosting": HistGradientBoostingClassifier(max_iter=20, random_state=42),
+    }
+
+
+def test_assign_cores():
+    models = small_models()
+    assert assign_cores(models, 1) == (1, {label: 1 for label in models})
+    # One process per model, the spare cores shared by the two threaded estimators
+    processes, cores = assign_cores(models, 9)
+    assert processes == 4
+    assert cores == {"Random Forest": 4, "Logistic Regression": 1,
+                     "Gradient Boosting Classifier": 1, "Histogram Gradient Boosting": 3}
+    assert assign_cores(models, 2)[0] == 2
+
+
+def test_budget_does_not_change_the_models():
+    X, y = make_classification(n_samples=600, n_features=12, random_state=0)
+    serial, serial_times = train_models(small_models(), X, y, cores=1)
+    parallel, parallel_times = train_models(small_models(), X, y, cores=5)
+
+    assert list(parallel) == list(serial)
+    assert parallel_times["Random Forest"][0] == 2
+    for label, model in serial.items():
+        assert np.array_equal(parallel[label].predict_proba(X), model.predict_proba(X)), label
+    # The training cores aren't kept in the fitted model
+    assert parallel["Random Forest"].n_jobs == 1
@@ -0,0 +1,84 @@
+import numpy as np
+import pandas as pd
+
+from schema import compact
+from validation import COMPARE_OPS, RULES_PATH, ValidationTally, load_rules, validate
+
+
+def with_violations(df):
+    """The integrated table with a few rows breaking each kind of rule"""
+    df = df.copy()
+    df.loc[[0, 5], "energy"] = 1.5
+    df.loc[3, "key"] = 13
+    df.loc[[7, 8], "Peak Position"] = None
+    df.loc[9, "Peak Position"] = 100
+    df.loc[11, "Song"] = None
+    df.loc[12, ["Date", "Rank"]] = df.loc[13, ["Date", "Rank"]].to_numpy()
+    return compact(df)
+
+
+def expected_mask(df, rule):
+    """One rule checked column by column with plain pandas"""
+    columns = rule["columns"]
+    if rule["type"] == "range":
+        values = df[columns[0]]
+        return ((values < rule.get("min", -np.inf)) | (values > rule.get("max", np.inf))).fillna(False)
+    if rule["type"] == "allowed":
+        return ~df[columns[0]].isin(rule["values"]) & df[columns[0]].notna()
+    if rule["type"] == "not_null":
+        return df[columns[0]].isna()
+    if rule["type"] == "unique":
+        return df.duplicated(subset=columns)
+    left, right = df[columns[0]], df[columns[1]]
+    return (~COMPARE_OPS[rule["op"]](left, right) & left.notna() & right.notna()).fillna(False)
+
+
+def test_validate_matches_pandas(integrated):
+    df = with_violations(integrated)
+    rules = load_rules(RULES_PATH)
+    results, samples, failing = validate(df, rules)
+
+    expected_failing = np.zeros(len(df), dtype=bool)
+    for rule in rules:
+        mask = expected_mask(df, rule).to_numpy(dtype=bool)
+        expected_failing |= mask
+        assert results.loc[rule["name"], "violations"] == mask.sum(), rule["name"]
+        if mask.any():
+            pd.testing.assert_frame_equal(samples[rule["name"]], df.loc[mask, rule["columns"]].head(5))
+    assert np.array_equal(failing, expected_failing)
+
+    for name in ["range_energy", "allowed_key", "not_null_song", "one_song_per_chart_position", "compare_rank_peak_position"]:
+        assert results.loc[name, "violations"] > 0
+
+
+def test_text_columns_are_skipped(integrated):
+    rules = load_rules(RULES_PATH) + [
+        {"name": "range_song", "type": "range", "columns": ["Song"], "min": 0, "message": "Song below 0"},
+        {"name": "not_null_genre", "type": "not_null", "columns": ["genre"], "message": "genre has missing values"},
+    ]
+    results, samples, failing = validate(integrated, rules)
+
+    assert results.loc["range_song", "violations"] == -1
+    assert results.loc["range_song", "message"].startswith("skipped, Song not numeric")
+    assert results.loc["not_null_genre", "message"] == "skipped, column not found"
+    # The other rules are checked as usual
+    assert (results.drop(["range_song", "not_null_genre"])["violations"] >= 0).all()
+
+
+def test_tally_matches_validate(integrated):
+    df = with_violations(integrated)
+    rules = load_rules(RULES_PATH)
+    results, samples, failing = validate(df, rules)
+
+    # Chunks smaller than a chart week, so the repeated Date/Rank pair lands across chunks too
+    tally = ValidationTally(rules)
+    for start in range(0, len(df), 7):
+        tally.update(df.iloc[start:start + 7])
+    tally_results, tally_samples, tally_failing = tally.results()
+
+    columns = ["type", "columns", "violations", "percent", "message"]
+    pd.testing.assert_frame_equal(tally_results[columns], results[columns])
+    assert tally_failing == failing.sum()
+    assert list(tally_samples) == list(samples)
+    for name, sample in samples.items():
+        pd.testing.assert_frame_equal(tally_samples[name], sample)